@@ -6,7 +6,7 @@ from skrf.plotting import plot_s_smith
 import matplotlib.pyplot as plt
 
 
-import threading, queue, math, os, traceback, json, tempfile
+import threading, queue, math, os, traceback, json, tempfile, csv, time
 from abc import ABC, abstractmethod
 from enum import Enum
 from datetime import datetime
@@ -25,7 +25,18 @@ from reportlab.platypus import (
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
-from skrf.media import DistributedCircuit
+from rf_engine import (
+    SUBSTRATE_MATERIALS, NETWORK_CACHE, canonical_key, transformer_s11, adaptive_frequency_grid,
+    divider_sensitivity, sector_mode_count,
+    sector_to_full_smatrix, divider_s_parameters, divider_s_matrix
+)
+from design_space import monte_carlo_yield, optimize_profile
+from hfss_automation import (get_session, FaceIndex, JobQueue, ResultStore, StageJournal, clean_stale_locks,
+                             recovery_file)
+from aedt_logs import DEFAULT_SETUP, advise_setup, crawl, default_index_path, user_data_dir
+from touchstone_io import load_network, read_touchstone
+from comparison import compare_arrays, divider_theory, format_summary
+from project_file import PROJECT_SUFFIX, load_project_file, save_project_file
 
 # --------------------------------------------------------------------
 # 1. Imports HFSS/AEDT
@@ -55,12 +66,7 @@ class Topology(Enum):
 # --------------------------------------------------------------------
 # 4. Materiais
 # --------------------------------------------------------------------
-SUBSTRATE_MATERIALS = {
-    "Ar": (1.0006, 0.0),
-    "Teflon (PTFE)": (2.1, 0.0002),
-    "FR-4": (4.4, 0.02),
-    "Rogers RO4003C": (3.55, 0.0027),
-}
+# Tabela compartilhada com os módulos sem GUI (ver `rf_engine.SUBSTRATE_MATERIALS`)
 
 
 # --------------------------------------------------------------------
@@ -74,6 +80,7 @@ class RFCalculator(ABC):
         self.s_params_sim = None
         self.project_path = ""
         self.frequencies = np.linspace(params['f_start'], params['f_stop'], 201)
+        self._grid_s11 = (None, None)
 
     @abstractmethod
     def calculate(self):
@@ -82,30 +89,25 @@ class RFCalculator(ABC):
     @abstractmethod
     def calculate_s_parameters(self):
         pass
+    def _cache_key(self, kind):
+        return canonical_key(kind, type(self).__name__, self.params, self.results, frequencies=self.frequencies)
+
     def theoretical_return_loss(self):
         """
-        Retorna S11 teórico via cascata de seções λ/4 Chebyshev.
+        Retorna S11 teórico do divisor: cascata das seções de `results`
+        terminada nas N saídas em paralelo (`rf_engine.transformer_s11`, o
+        mesmo modelo da varredura, do rendimento e do otimizador). O
+        resultado fica no `NETWORK_CACHE` do processo.
         """
-        p = self.params
-        freqs_hz = self.frequencies * 1e6
-        fr = Frequency.from_f(freqs_hz, unit='Hz')
-        sec_len_m = self.results['sec_len_mm'] / 1000.0
-
-        z0    = 50.0
-        z_eff = z0 / p['n_outputs']
-        Zs = [
-            z0 * (z_eff / z0) ** ((2 * i - 1) / (2 * p['n_sections']))
-            for i in range(1, p['n_sections'] + 1)
-        ]
+        return NETWORK_CACHE.get_or_compute(self._cache_key('theoretical_return_loss'),
+                                            self._theoretical_return_loss)
 
-        ntw = None
-        for Z in Zs:
-            media = DistributedCircuit(frequency=fr, z0=Z)
-            seg   = media.line(sec_len_m, unit='m')
-            ntw   = seg if ntw is None else ntw ** seg
+    def _theoretical_return_loss(self):
+        p = self.params
+        er = SUBSTRATE_MATERIALS[p['diel_material']][0]
+        return transformer_s11(self.results['z_sects'], self.results['sec_len_mm'] / 1000.0,
+                               self.frequencies * 1e6, p['n_outputs'], er)
 
-        # S11 contra terminador 50Ω
-        return ntw.s[:, 0, 0]
     def get_geometry_for_viewer(self):
         return {**self.params, **self.results}
 
@@ -115,21 +117,29 @@ class RFCalculator(ABC):
     def get_theoretical_network(self):
         if self.s_params_th is None:
             return None
+        return NETWORK_CACHE.get_or_compute(self._cache_key('theoretical_network'),
+                                            self._build_theoretical_network)
 
+    def _build_theoretical_network(self):
         freq = Frequency.from_f(self.frequencies * 1e6, unit='Hz')
-        num_ports = self.params['n_outputs'] + 1
-        s_matrix = np.zeros((len(self.frequencies), num_ports, num_ports), dtype=complex)
-
-        s_matrix[:, 0, 0] = self.s_params_th.get('S11', 0)
-        s_matrix[:, 1, 1] = self.s_params_th.get('S22', 0)
-        s_matrix[:, 2, 1] = self.s_params_th.get('S32', 0)
-
-        for i in range(self.params['n_outputs']):
-            s_matrix[:, i + 1, 0] = self.s_params_th.get(f'S{i + 2}1', 0)
-            s_matrix[:, 0, i + 1] = self.s_params_th.get(f'S{i + 2}1', 0)
-
+        s_matrix, _ = divider_s_matrix(self.s_params_th, self.params['n_outputs'], len(self.frequencies))
         return Network(frequency=freq, s=s_matrix)
 
+    def compare_with_simulation(self, bands=None):
+        """
+        Métricas numéricas teoria x simulação (ver `comparison`): o modelo
+        analítico é avaliado na grade simulada e a rede é percorrida em
+        trechos. `bands` em Hz; padrão: a faixa de projeto. None sem
+        simulação ou se ela não tiver as N+1 portas do divisor (ex.: o
+        Touchstone de 2 portas de um modo do modelo de setor).
+        """
+        if self.s_params_sim is None or self.s_params_sim.nports != self.params['n_outputs'] + 1:
+            return None
+        if bands is None:
+            bands = [(self.params['f_start'] * 1e6, self.params['f_stop'] * 1e6)]
+        return compare_arrays(self.s_params_sim.f, self.s_params_sim.s,
+                              *divider_theory(self.params, self.results), bands=bands)
+
     def plot_performance(self):
         """
         Gera 3 gráficos de desempenho comparando teoria vs simulação:
@@ -227,48 +237,72 @@ class CoaxialCalculator(RFCalculator):
             'd_out_50ohm': d_out_50,
             'z_sects': z_sects
         }
+        if p.get('adaptive_grid'):
+            self.frequencies, s11 = self._adaptive_frequencies(p.get('grid_tol_db', 0.1))
+            self.results['freq_grid_mhz'] = self.frequencies.tolist()
+            # O S11 amostrado pela grade vale só para estes resultados e esta grade
+            self._grid_s11 = (self._cache_key('s_parameters'), s11)
         self.calculate_s_parameters()
         return True
 
-    def calculate_s_parameters(self):
-        p = self.params
+    def _adaptive_frequencies(self, rl_tol_db):
+        """
+        Grade adaptativa das curvas teóricas, guiada pelo S11 do divisor
+        (`transformer_s11`). Devolve (freqs_mhz, S11 nesses pontos).
+        A tolerância vem do erro admitido na perda de retorno no nível das
+        bordas da banda: um erro δ sobre |S11| = Γ muda a RL em até
+        20·log10(1 + δ/Γ) dB.
+        """
+        p, r = self.params, self.results
+        sec_len_m = r['sec_len_mm'] / 1000.0
         er = SUBSTRATE_MATERIALS[p['diel_material']][0]
 
-        N_freq = len(self.frequencies)
-        freqs_hz = self.frequencies * 1e6
-        fr = Frequency.from_f(freqs_hz, unit='Hz')
-
-        media = DistributedCircuit(frequency=fr, z0=50)
-        ntw_cascade = media.line(0, 'm')
-        for z_val in self.results['z_sects']:
-            sec_media = DistributedCircuit(frequency=fr, z0=z_val)
-            sec_ntw = sec_media.line(self.results['sec_len_mm'] / 1000.0, 'm')
-            ntw_cascade = ntw_cascade ** sec_ntw
+        def model(f_mhz):
+            return transformer_s11(r['z_sects'], sec_len_m, f_mhz * 1e6, p['n_outputs'], er)
 
-        load_ntw = media.resistor(p['n_outputs'] * 50)
-        final_ntw = ntw_cascade ** load_ntw
-        s11 = final_ntw.s[:, 0, 0]
+        edge = np.abs(model(np.array([p['f_start'], p['f_stop']]))).max(axis=-1)
+        tol = np.maximum(edge, 1e-6) * (10 ** (rl_tol_db / 20) - 1)
+        return adaptive_frequency_grid(model, p['f_start'], p['f_stop'], tol=tol)
 
-        Gamma = s11
-        mismatch_loss_db = -10 * np.log10(1 - np.abs(Gamma) ** 2)
-        ideal_split_loss_db = 10 * np.log10(p['n_outputs'])
-        s21_db = -(mismatch_loss_db + ideal_split_loss_db)
+    def calculate_s_parameters(self):
+        cached = NETWORK_CACHE.get_or_compute(self._cache_key('s_parameters'), self._calculate_s_parameters)
+        self.s_params_th = dict(cached)
+        return True
 
-        phase_velocity = 299792458 / np.sqrt(er)
-        physical_length_m = self.results['len_inner_mm'] / 1000.0
-        electrical_length = 2 * np.pi * freqs_hz * physical_length_m / phase_velocity
-        s21 = 10 ** (s21_db / 20) * np.exp(-1j * electrical_length)
+    def _calculate_s_parameters(self):
+        p = self.params
+        er = SUBSTRATE_MATERIALS[p['diel_material']][0]
+        key, s11 = self._grid_s11
+        return divider_s_parameters(self.results['z_sects'], self.results['sec_len_mm'] / 1000.0,
+                                    self.results['len_inner_mm'] / 1000.0, er, p['n_outputs'],
+                                    self.frequencies * 1e6,
+                                    s11=s11 if key == self._cache_key('s_parameters') else None)
 
-        s22 = s11
-        isolation_db = -6
-        s32 = 10 ** (isolation_db / 20) * np.ones(N_freq)
+    def s11_sensitivity(self, metric='worst'):
+        """
+        Gradiente analítico da métrica de perda de retorno em relação a cada
+        diâmetro de `main_diams`, a cada comprimento de seção e a `d_int_tube`
+        (ver `rf_engine.divider_sensitivity`).
+        """
+        p, r = self.params, self.results
+        er = SUBSTRATE_MATERIALS[p['diel_material']][0]
+        return divider_sensitivity(r['main_diams'], r['sec_len_mm'], r['d_int_tube'], er, p['n_outputs'],
+                                   self.frequencies, metric=metric)
 
-        self.s_params_th = {f'S{i + 2}1': s21 for i in range(p['n_outputs'])}
-        self.s_params_th['S11'] = s11
-        self.s_params_th['S22'] = s22
-        self.s_params_th['S32'] = s32
+    def optimize_profile(self, n_starts=16, **kwargs):
+        """
+        Perfil de impedâncias otimizado para o pior |S11| na banda, no formato
+        de `results` (ver `design_space.optimize_profile`).
+        """
+        return optimize_profile(self.params, self.results, n_starts=n_starts, freqs_mhz=self.frequencies, **kwargs)
 
-        return True
+    def manufacturing_yield(self, tolerances, spec_s11_db=-20.0, n_samples=100_000, **kwargs):
+        """
+        Rendimento por Monte Carlo sob tolerâncias de usinagem
+        (ver `design_space.monte_carlo_yield`).
+        """
+        return monte_carlo_yield(self.params, self.results, tolerances, spec_s11_db=spec_s11_db,
+                                 n_samples=n_samples, freqs_mhz=self.frequencies, **kwargs)
 
 
 # --------------------------------------------------------------------
@@ -546,157 +580,445 @@ def launch_pyvista(params, q):
         traceback.print_exc()
 
 
-def generate_hfss_model(params, status_queue):
+# Critério de convergência do Setup1 quando não há histórico
+HFSS_SETUP = {"MaximumPasses": DEFAULT_SETUP['MaximumPasses'], "MaxDeltaS": DEFAULT_SETUP['MaxDeltaS']}
+SWEEP_POINTS = 201
+
+
+def _projects_dir():
+    return os.path.join(os.getcwd(), "HFSS_Projects")
+
+
+def _results_index_path():
+    return default_index_path(_projects_dir())
+
+
+_index_refresh = threading.Lock()
+
+
+def refresh_results_index(status_queue=None):
+    """
+    Atualiza em segundo plano o índice de HFSS_Projects (só projetos novos
+    ou alterados são relidos). Se uma atualização já está em andamento,
+    não faz nada. Devolve a thread iniciada ou None.
+    """
+    if not os.path.isdir(_projects_dir()) or not _index_refresh.acquire(blocking=False):
+        return None
+
+    def worker():
+        try:
+            stats = crawl(_projects_dir(), _results_index_path(), workers=1)
+            if status_queue is not None and stats['scanned']:
+                status_queue.put(f"Índice de resultados atualizado: {stats['scanned']} projetos relidos.")
+        except Exception:
+            traceback.print_exc()
+        finally:
+            _index_refresh.release()
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
+
+
+def advised_hfss_setup(p):
+    """
+    Setup1/Sweep1 sugerido pelos solves anteriores de geometrias parecidas
+    (ver `aedt_logs.advise_setup`), consultando o índice como está; ele é
+    atualizado por `refresh_results_index`, fora do caminho da exportação.
+    """
+    default = {**HFSS_SETUP, 'sweep_type': DEFAULT_SETUP['sweep_type']}
+    n_ports = 2 if _is_sector(p) else p['n_outputs'] + 1
+    try:
+        return advise_setup(_results_index_path(), hfss_design_variables(p), n_ports,
+                            (p['f_start'] + p['f_stop']) / 2.0 * 1e6, default)
+    except Exception:
+        traceback.print_exc()
+        return dict(default, basis=[])
+
+
+def hfss_setup(p):
+    """
+    Setup efetivo de `p`: o fixado em `p['hfss_setup']` ou a sugestão do
+    histórico. Use `with_hfss_setup` para fixá-lo antes de gerar o modelo,
+    assim a chave da solução não muda se o índice crescer no meio do caminho.
+    """
+    return p.get('hfss_setup') or advised_hfss_setup(p)
+
+
+def with_hfss_setup(p, project_path=None):
+    """
+    Cópia de `p` com 'hfss_setup' fixado: o já presente, o registrado no
+    journal de `project_path` (retomada) ou a sugestão do histórico.
+    """
+    if p.get('hfss_setup'):
+        return p
+    recorded = None
+    if project_path and os.path.exists(StageJournal(project_path).path):
+        recorded = (StageJournal(project_path).info("setup") or {}).get('hfss_setup')
+    return {**p, 'hfss_setup': recorded or advised_hfss_setup(p)}
+
+
+def hfss_design_variables(p):
+    """
+    Variáveis do projeto HFSS que mudam de um design para outro (valores
+    numéricos com unidade). As saídas e o perfil são dirigidos por elas, então
+    um mesmo modelo serve para várias linhas de uma varredura paramétrica.
+    """
+    variables = {
+        "comp_total": f"{p['len_outer_mm']}mm",
+        "comp_secoes": f"{p['len_inner_mm']}mm",
+        "comp_sec": f"{p['sec_len_mm']}mm",
+        "dia_int_tubo": f"{p['d_int_tube']}mm",
+        "dia_saida_50": f"{p['d_out_50ohm']}mm",
+    }
+    for i, d in enumerate(p['main_diams']):
+        variables[f"dia_sc{i + 1}"] = f"{d}mm"
+    return variables
+
+
+def _is_sector(p):
+    return bool(p.get('sector_model')) and p['n_outputs'] > 1
+
+
+def _build_divider_model(hfss, p, status_queue, journal=None):
+    """
+    Cria variáveis, geometria, material, portas e Setup1/Sweep1 do divisor
+    no design aberto em `hfss`. Com `p['sector_model']` só um setor 360/N é
+    modelado. A geometria padrão vem de perfis girados
+    (`p['hfss_geometry'] = 'revolve'`); 'cylinders' mantém a construção por
+    cilindros e uniões.
+
+    Com `journal` (ver `StageJournal`) cada etapa concluída é salva no
+    projeto e registrada; etapas já registradas são puladas.
+    """
+    stages = (("geometry", _model_geometry), ("materials", _model_materials),
+              ("ports", _model_ports), ("setup", _model_setup))
+    for name, build in stages:
+        if journal is not None and journal.done(name):
+            status_queue.put(f"Etapa '{name}' já concluída; retomando.")
+            continue
+        build(hfss, p, status_queue)
+        if journal is not None:
+            hfss.save_project()
+            info = {'hfss_setup': hfss_setup(p)} if name == "setup" else {}
+            journal.complete(name, **info)
+
+
+def _model_geometry(hfss, p, status_queue):
+    sector = _is_sector(p)
+    mdl = hfss.modeler
+    if mdl.object_names:
+        # Restos de uma construção interrompida
+        mdl.delete(mdl.object_names)
+
+    # 1. Definir Variáveis no HFSS
+    vm = hfss.variable_manager
+    for name, value in hfss_design_variables(p).items():
+        vm[name] = value
+
+    # Obter o número de saídas para facilitar a leitura
+    num_saidas = p['n_outputs']
+
+    # 1. Definir o diâmetro da saída (dielétrico e condutor) com base no número de saídas
+    if num_saidas > 6:
+        status_queue.put(f"Detectado {num_saidas} saídas (>6). Reduzindo diâmetro para evitar colisão.")
+        # Reduz o diâmetro da porta de saída por um fator de 3
+        vm["dia_saida_diel"] = "dia_int_tubo / 3"
+        # Ajusta o condutor interno para manter 50 ohms (D/d = 2.3 para ar/vácuo)
+        vm["dia_saida_cond"] = "(dia_int_tubo / 3) / 2.3"
+
+    elif num_saidas > 4:
+        status_queue.put(f"Detectado {num_saidas} saídas (>4). Reduzindo diâmetro para evitar colisão.")
+        # Reduz o diâmetro da porta de saída por um fator de 2.2
+        vm["dia_saida_diel"] = "dia_int_tubo / 2.2"
+        vm["dia_saida_cond"] = "(dia_int_tubo / 2.2) / 2.3"
+
+    else:
+        # Mantém o diâmetro padrão para 4 ou menos saídas
+        vm["dia_saida_diel"] = "dia_int_tubo"
+        vm["dia_saida_cond"] = "dia_saida_50"
+
+    # 2. Definir o comprimento da saída
+    #    (Ajustado para 10% do comprimento do transformador, conforme seu último código)
+    vm["comp_saida"] = "comp_secoes * 0.1"
+
+    # 2. Criar Geometrias Individuais
+    revolve = p.get('hfss_geometry', 'revolve') == 'revolve'
+    if revolve:
+        # Dielétrico e condutor como perfis (r, z) girados em torno de Z:
+        # um sólido por corpo, sem booleanas entre as seções
+        sweep_deg = 360.0 / p['n_outputs'] if sector else 360.0
+        diel_principal = _revolve_profile(
+            mdl, "Diel_Principal",
+            [[0, 0, 0], ["dia_int_tubo/2", 0, 0], ["dia_int_tubo/2", 0, "comp_total"], [0, 0, "comp_total"]],
+            sweep_deg)
+
+        inner_profile = [[0, 0, 0]]
+        for i in range(p['n_sections']):
+            inner_profile.append([f"dia_sc{i + 1}/2", 0, f"comp_sec * {i}"])
+            inner_profile.append([f"dia_sc{i + 1}/2", 0, f"comp_sec * {i + 1}"])
+        inner_profile.append([0, 0, f"comp_sec * {p['n_sections']}"])
+        inner_parts = [_revolve_profile(mdl, "Cond_Perfil", inner_profile, sweep_deg)]
+
+        if sector:
+            # Setor -180/N..+180/N em torno da saída 1
+            mdl.rotate([diel_principal.name, inner_parts[0].name], "Z", angle=-sweep_deg / 2)
+    else:
+        diel_principal = mdl.create_cylinder("Z", [0, 0, 0], "dia_int_tubo/2", "comp_total", name="Diel_Principal",
+                                             num_sides=0)
+
+        inner_parts = [
+            mdl.create_cylinder("Z", [0, 0, f"comp_sec * {i}"], f"dia_sc{i + 1}/2", "comp_sec",
+                                name=f"Cond_Sec{i + 1}", num_sides=0)
+            for i in range(p['n_sections'])
+        ]
+
+    # ** APRIMORAMENTO: Usa as novas variáveis de diâmetro **
+    output_outer_1 = mdl.create_cylinder("X", [0, 0, "comp_secoes"], "dia_saida_diel/2", "comp_saida",
+                                         num_sides=0,
+                                         name="Output_Outer_1")
+    output_inner_1 = mdl.create_cylinder("X", [0, 0, "comp_secoes"], "dia_saida_cond/2", "comp_saida",
+                                         num_sides=0,
+                                         name="Output_Inner_1")
+
+    # 3. Duplicar apenas a GEOMETRIA das saídas
+    if p['n_outputs'] > 1 and not sector:
+        mdl.duplicate_around_axis(
+            [output_outer_1.name, output_inner_1.name],
+            axis="Z",
+            angle=f"360deg/{p['n_outputs']}",
+            clones=p['n_outputs']
+        )
+
+    # 4. Unir as partes em dois corpos finais
+    all_outers_names = [diel_principal.name] + [name for name in mdl.object_names if
+                                                name.startswith("Output_Outer_")]
+    united_diel_name = mdl.unite(all_outers_names)
+    final_diel_obj = mdl[united_diel_name]
+    final_diel_obj.name = "Volume_Diel"
+
+    inner_parts_names = [part.name for part in inner_parts]
+    output_inners_names = [name for name in mdl.object_names if
+                           name.startswith("Cond_Saida_") or name.startswith("Output_Inner_")]
+    all_inners_to_unite = inner_parts_names + output_inners_names
+    united_cond_name = mdl.unite(all_inners_to_unite)
+    final_cond_obj = mdl[united_cond_name]
+    final_cond_obj.name = "Condutor_Unico"
+
+    if sector and not revolve:
+        _cut_sector(mdl, [final_diel_obj.name, final_cond_obj.name], p['n_outputs'])
+
+
+def _model_materials(hfss, p, status_queue):
+    mdl = hfss.modeler
+    # 5. Atribuir Materiais aos corpos FINAIS
+    er_val, tand = SUBSTRATE_MATERIALS[p['diel_material']]
+    mat_name = p['diel_material'].replace(' ', '_').replace('(', '').replace(')', '')
+    if mat_name not in hfss.materials:
+        new_mat = hfss.materials.add_material(mat_name)
+        new_mat.permittivity = er_val
+        new_mat.dielectric_loss_tangent = tand
+
+    mdl["Volume_Diel"].material_name = mat_name
+    mdl["Condutor_Unico"].material_name = "pec"
+
+
+def _model_ports(hfss, p, status_queue):
+    sector = _is_sector(p)
+    # 6. Criar Portas nos corpos FINAIS
+    #    Centros das faces lidos uma vez e indexados (ver `FaceIndex`)
+    faces = FaceIndex(hfss.modeler["Volume_Diel"].faces)
+    # No setor a entrada é uma fatia 1/N do coaxial: impedância N·50 Ω
+    # para que a reflexão coincida com a do modelo completo
+    input_impedance = 50 * p['n_outputs'] if sector else 50
+    for face in faces.on_plane(2, 0.0)[:1]:
+        hfss.wave_port(assignment=face.id, name="P1", renormalize=True, impedance=f"{input_impedance}")
+
+    output_port_len_float = p['len_inner_mm'] * 0.1
+    for k in range(1 if sector else p['n_outputs']):
+        angle_rad = math.radians(360 * k / p['n_outputs'])
+        pos_x = output_port_len_float * math.cos(angle_rad)
+        pos_y = output_port_len_float * math.sin(angle_rad)
+        pos_z = p['len_inner_mm']
+
+        face = faces.nearest([pos_x, pos_y, pos_z])
+        if face is not None:
+            hfss.wave_port(assignment=face.id, name=f"P{k + 2}", renormalize=True, impedance="50")
+
+    if sector:
+        # Paredes do setor periódicas com defasagem `fase_setor` (modo azimutal)
+        half = math.pi / p['n_outputs']
+        master = faces.on_half_plane(-half)
+        slave = faces.on_half_plane(half)
+        hfss.variable_manager["fase_setor"] = "0deg"
+        _, slave_bnd = hfss.assign_master_slave(
+            master[0].id, slave[0].id,
+            u_start=[0, 0, 0], u_end=[0, 0, p['len_outer_mm']]
+        )
+        slave_bnd.props["UseScanAngles"] = False
+        slave_bnd.props["Phase"] = "fase_setor"
+        slave_bnd.update()
+
+    rep = faces.report()
+    status_queue.put(f"Portas: {rep['api_calls']} chamadas à API para {rep['faces']} faces "
+                     f"(~{rep['api_calls_saved_estimate']} economizadas, estimativa).")
+
+
+def _model_setup(hfss, p, status_queue):
+    f0_ghz = (p['f_start'] + p['f_stop']) / 2000.0
+
+    # 7. Setup e Sweep
+    setup = hfss.create_setup("Setup1")
+    setup.props["Frequency"] = f"{f0_ghz}GHz"
+    advice = hfss_setup(p)
+    for key, value in advice.items():
+        if key not in ('sweep_type', 'basis'):
+            setup.props[key] = value
+    if advice['basis']:
+        status_queue.put(f"Setup do histórico ({len(advice['basis'])} projetos semelhantes): "
+                         f"{advice['MaximumPasses']} passes, sweep {advice['sweep_type']}"
+                         + (f", lambda-refine {advice['Target']}" if 'Target' in advice else "") + ".")
+
+    sweep = hfss_sweep_definition(p)
+    setup.create_frequency_sweep(
+        unit="MHz",
+
+        start_frequency=sweep['start_mhz'],
+        stop_frequency=sweep['stop_mhz'],
+        num_of_freq_points=sweep['points'],
+        name="Sweep1",
+        sweep_type=sweep['type'],
+        save_fields=False
+    )
+
+    if _is_sector(p):
+        n = p['n_outputs']
+        rows = [{"fase_setor": f"{360.0 * m / n}deg"} for m in range(sector_mode_count(n))]
+        hfss.parametrics.add_from_file(_write_parametric_rows(hfss.project_file, rows), name="Modos")
+        status_queue.put(f"Modelo de setor 1/{n}: {len(rows)} modos azimutais em 'Modos'.")
+
+
+def user_hfss_setup(p):
+    """
+    Setup fixado pelo usuário em `p['hfss_setup']`, ou None se o setup é a
+    sugestão do histórico (marcada com 'basis') ou ainda não foi escolhido.
+    """
+    setup = p.get('hfss_setup')
+    return None if not setup or 'basis' in setup else setup
+
+
+def hfss_sweep_definition(p):
+    """
+    Definição do Sweep1: SWEEP_POINTS pontos do tipo escolhido em
+    `hfss_setup` (Fast ou Interpolating) na banda de projeto. A grade
+    adaptativa serve só às curvas teóricas; no HFSS cada ponto discreto
+    seria uma solução completa.
+    """
+    return {'type': hfss_setup(p)['sweep_type'], 'start_mhz': p['f_start'], 'stop_mhz': p['f_stop'],
+            'points': SWEEP_POINTS}
+
+
+def simulation_key(p):
+    """
+    Chave de conteúdo de uma solução HFSS: variáveis da geometria,
+    topologia, material, modo de construção, banda do sweep e o setup
+    escolhido pelo usuário. A sugestão do histórico fica de fora: ela muda
+    conforme o índice cresce e levaria ao mesmo resultado convergido.
+    """
+    sector = bool(p.get('sector_model')) and p['n_outputs'] > 1
+    return canonical_key("hfss_solution", {
+        'variables': hfss_design_variables(p),
+        'n_sections': p['n_sections'],
+        'n_outputs': p['n_outputs'],
+        'material': SUBSTRATE_MATERIALS[p['diel_material']],
+        'geometry': p.get('hfss_geometry', 'revolve'),
+        'sector_model': sector,
+        'setup': {'user': user_hfss_setup(p), 'frequency_ghz': (p['f_start'] + p['f_stop']) / 2000.0},
+        'sweep': {'start_mhz': p['f_start'], 'stop_mhz': p['f_stop'], 'points': SWEEP_POINTS},
+    })
+
+
+def _result_store():
+    return ResultStore(os.path.join(_projects_dir(), "sim_store"))
+
+
+def _revolve_profile(mdl, name, points, sweep_deg=360.0):
+    """
+    Sólido de revolução: polilinha fechada no plano XZ (x = raio) girada
+    `sweep_deg` em torno de Z a partir de +X.
+    """
+    profile = mdl.create_polyline(points, close_surface=True, cover_surface=True, name=name)
+    mdl.sweep_around_axis(profile, axis="Z", sweep_angle=sweep_deg)
+    return profile
+
+
+def _cut_sector(mdl, names, n_outputs):
+    """
+    Recorta os objetos no setor -180/N..+180/N em torno da saída 1 (eixo +X)
+    girando o modelo para que cada parede caia no plano ZX.
+    """
+    sector_deg = 360.0 / n_outputs
+    mdl.rotate(names, "Z", angle=sector_deg / 2)
+    mdl.split(names, plane="ZX", sides="PositiveOnly")
+    mdl.rotate(names, "Z", angle=-sector_deg)
+    mdl.split(names, plane="ZX", sides="NegativeOnly")
+    mdl.rotate(names, "Z", angle=sector_deg / 2)
+
+
+def _new_project_path(prefix="Divisor_Coaxial"):
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    project_dir = _projects_dir()
+    os.makedirs(project_dir, exist_ok=True)
+    return os.path.join(project_dir, f"{prefix}_{ts}.aedt")
+
+
+def _claim_project(journal, status_queue):
+    """
+    Remove o lock de um dono comprovadamente morto, avisa se há um `.auto`
+    de recuperação (preservado) e registra este processo como dono.
+    """
+    project_path = journal.project_path
+    removed = clean_stale_locks(project_path, journal.state['owner_pid'])
+    if removed:
+        status_queue.put(f"Lock abandonado removido: {', '.join(map(os.path.basename, removed))}")
+    auto = recovery_file(project_path)
+    if auto:
+        status_queue.put(f"Arquivo de recuperação do AEDT preservado: {os.path.basename(auto)} "
+                         f"(abra-o no AEDT para recuperar alterações não salvas).")
+    journal.claim()
+
+
+def generate_hfss_model(params, status_queue, session=None, project_path=None):
     """
     ** VERSÃO FINAL E APRIMORADA **
     Esta função implementa a lógica de criação de geometria, portas e análise,
     e agora ajusta dinamicamente o diâmetro das portas de saída para evitar
     interseções quando há mais de 4 saídas.
+    O design é criado no desktop persistente de `session` (padrão: a sessão
+    do processo), sem iniciar um novo AEDT a cada exportação. O `.aedt` é
+    sempre construído; para pular a exportação quando a solução já está no
+    cache de resultados use `cached_solution` antes.
+    Com `project_path` de uma exportação interrompida, a construção retoma
+    da última etapa registrada no journal. O setup é escolhido pelo
+    histórico (`with_hfss_setup`) a menos que `params['hfss_setup']` exista.
     """
-    if not HFSS_AVAILABLE:
+    params = with_hfss_setup(params, project_path)
+    key = simulation_key(params)
+    project_path = project_path or _new_project_path()
+
+    if not HFSS_AVAILABLE and session is None:
         status_queue.put("ERRO: módulo HFSS não disponível.")
         return None
 
-    project_path = None
     try:
         status_queue.put("Iniciando geração HFSS (lógica aprimorada)...")
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        proj_name = f"Divisor_Coaxial_{ts}"
-
-        project_dir = os.path.join(os.getcwd(), "HFSS_Projects")
-        os.makedirs(project_dir, exist_ok=True)
-        project_path = os.path.join(project_dir, f"{proj_name}.aedt")
-
-        with Hfss(projectname=project_path, designname="DivisorCoaxial", solution_type="Modal", new_desktop=True,
-                  close_on_exit=False) as hfss:
-            mdl = hfss.modeler
-            p = params
-            f0_ghz = (p['f_start'] + p['f_stop']) / 2000.0
-
-            # 1. Definir Variáveis no HFSS
-            vm = hfss.variable_manager
-            vm["comp_total"] = f"{p['len_outer_mm']}mm"
-            vm["comp_secoes"] = f"{p['len_inner_mm']}mm"
-            vm["dia_int_tubo"] = f"{p['d_int_tube']}mm"
-
-            # Obter o número de saídas para facilitar a leitura
-            num_saidas = p['n_outputs']
-
-            # 1. Definir o diâmetro da saída (dielétrico e condutor) com base no número de saídas
-            if num_saidas > 6:
-                status_queue.put(f"Detectado {num_saidas} saídas (>6). Reduzindo diâmetro para evitar colisão.")
-                # Reduz o diâmetro da porta de saída por um fator de 3
-                vm["dia_saida_diel"] = "dia_int_tubo / 3"
-                # Ajusta o condutor interno para manter 50 ohms (D/d = 2.3 para ar/vácuo)
-                vm["dia_saida_cond"] = "(dia_int_tubo / 3) / 2.3"
-
-            elif num_saidas > 4:
-                status_queue.put(f"Detectado {num_saidas} saídas (>4). Reduzindo diâmetro para evitar colisão.")
-                # Reduz o diâmetro da porta de saída por um fator de 2.2
-                vm["dia_saida_diel"] = "dia_int_tubo / 2.2"
-                vm["dia_saida_cond"] = "(dia_int_tubo / 2.2) / 2.3"
 
-            else:
-                # Mantém o diâmetro padrão para 4 ou menos saídas
-                vm["dia_saida_diel"] = "dia_int_tubo"
-                vm["dia_saida_cond"] = f"{p['d_out_50ohm']}mm"
-
-            # 2. Definir o comprimento da saída
-            #    (Ajustado para 10% do comprimento do transformador, conforme seu último código)
-            vm["comp_saida"] = f"{p['len_inner_mm'] * 0.1}mm"
-
-            for i, d in enumerate(p['main_diams']):
-                vm[f"dia_sc{i + 1}"] = f"{d}mm"
-
-            # 2. Criar Geometrias Individuais
-            diel_principal = mdl.create_cylinder("Z", [0, 0, 0], "dia_int_tubo/2", "comp_total", name="Diel_Principal",
-                                                 num_sides=0)
-
-            inner_parts = [
-                mdl.create_cylinder("Z", [0, 0, f"{p['sec_len_mm'] * i}"], f"dia_sc{i + 1}/2", f"{p['sec_len_mm']}mm",
-                                    name=f"Cond_Sec{i + 1}", num_sides=0)
-                for i in range(p['n_sections'])
-            ]
-
-            # ** APRIMORAMENTO: Usa as novas variáveis de diâmetro **
-            output_outer_1 = mdl.create_cylinder("X", [0, 0, "comp_secoes"], "dia_saida_diel/2", "comp_saida",
-                                                 num_sides=0,
-                                                 name="Output_Outer_1")
-            output_inner_1 = mdl.create_cylinder("X", [0, 0, "comp_secoes"], "dia_saida_cond/2", "comp_saida",
-                                                 num_sides=0,
-                                                 name="Output_Inner_1")
-
-            # 3. Duplicar apenas a GEOMETRIA das saídas
-            if p['n_outputs'] > 1:
-                mdl.duplicate_around_axis(
-                    [output_outer_1.name, output_inner_1.name],
-                    axis="Z",
-                    angle=f"360deg/{p['n_outputs']}",
-                    clones=p['n_outputs']
-                )
-
-            # 4. Unir as partes em dois corpos finais
-            all_outers_names = [diel_principal.name] + [name for name in mdl.object_names if
-                                                        name.startswith("Output_Outer_")]
-            united_diel_name = mdl.unite(all_outers_names)
-            final_diel_obj = mdl[united_diel_name]
-            final_diel_obj.name = "Volume_Diel"
-
-            inner_parts_names = [part.name for part in inner_parts]
-            output_inners_names = [name for name in mdl.object_names if
-                                   name.startswith("Cond_Saida_") or name.startswith("Output_Inner_")]
-            all_inners_to_unite = inner_parts_names + output_inners_names
-            united_cond_name = mdl.unite(all_inners_to_unite)
-            final_cond_obj = mdl[united_cond_name]
-            final_cond_obj.name = "Condutor_Unico"
-
-            # 5. Atribuir Materiais aos corpos FINAIS
-            er_val, tand = SUBSTRATE_MATERIALS[p['diel_material']]
-            mat_name = p['diel_material'].replace(' ', '_').replace('(', '').replace(')', '')
-            if mat_name not in hfss.materials:
-                new_mat = hfss.materials.add_material(mat_name)
-                new_mat.permittivity = er_val
-                new_mat.dielectric_loss_tangent = tand
-
-            final_diel_obj.material_name = mat_name
-            final_cond_obj.material_name = "pec"
-
-            # 6. Criar Portas nos corpos FINAIS
-            for face in final_diel_obj.faces:
-                if abs(face.center[2]) < 1e-6:
-                    hfss.wave_port(assignment=face.id, name="P1", renormalize=True, impedance="50")
-                    break
-
-            output_port_len_float = p['len_inner_mm'] * 0.1
-            for k in range(p['n_outputs']):
-                angle_rad = math.radians(360 * k / p['n_outputs'])
-                pos_x = output_port_len_float * math.cos(angle_rad)
-                pos_y = output_port_len_float * math.sin(angle_rad)
-                pos_z = p['len_inner_mm']
-
-                for face in final_diel_obj.faces:
-                    center = face.center
-                    if np.linalg.norm(np.array(center) - np.array([pos_x, pos_y, pos_z])) < 1e-3:
-                        hfss.wave_port(assignment=face.id, name=f"P{k + 2}", renormalize=True, impedance="50")
-                        break
-
-            # 7. Setup e Sweep
-            setup = hfss.create_setup("Setup1")
-            setup.props["Frequency"] = f"{f0_ghz}GHz"
-            setup.props["MaximumPasses"] = 8
-            setup.props["MaxDeltaS"] = 0.02
-
-            setup.create_frequency_sweep(
-                unit="MHz",
-
-                start_frequency=p['f_start'],
-                stop_frequency=p['f_stop'],
-                num_of_freq_points=201,
-                name="Sweep1",
-                sweep_type="Fast",
-                save_fields=False
-            )
+        journal = StageJournal(project_path, key)
+        _claim_project(journal, status_queue)
 
+        session = session or get_session()
+        with session.design(project_path, "DivisorCoaxial", solution_type="Modal") as hfss:
+            _build_divider_model(hfss, params, status_queue, journal)
             hfss.save_project()
             status_queue.put(f"HFSS salvo em: {project_path}")
             return project_path
@@ -706,6 +1028,235 @@ def generate_hfss_model(params, status_queue):
         traceback.print_exc()
         return None
 
+
+# Parâmetros que mudam a topologia do modelo e portanto não podem variar
+# entre linhas de uma mesma varredura paramétrica
+PARAMETRIC_FIXED_KEYS = ('n_sections', 'n_outputs', 'diel_material', 'f_start', 'f_stop')
+
+
+def _parametric_rows_path(project_path):
+    return os.path.splitext(project_path)[0] + "_variacoes.csv"
+
+
+def _write_parametric_rows(project_path, rows):
+    """
+    Grava as linhas da varredura no CSV lido por `parametrics.add_from_file`.
+    """
+    rows_path = _parametric_rows_path(project_path)
+    with open(rows_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["*"] + list(rows[0]))
+        for i, row in enumerate(rows, start=1):
+            writer.writerow([i] + list(row.values()))
+    return rows_path
+
+
+def generate_parametric_project(designs, status_queue, session=None):
+    """
+    Um único projeto para vários designs: o modelo é construído uma vez com
+    o primeiro design e cada design vira uma linha da varredura Optimetrics
+    'Designs' (arquivo CSV ao lado do .aedt). `designs` é uma lista de dicts
+    no formato de `get_geometry_for_viewer()`.
+    """
+    if not HFSS_AVAILABLE and session is None:
+        status_queue.put("ERRO: módulo HFSS não disponível.")
+        return None
+    if not designs:
+        status_queue.put("ERRO: nenhum design para a varredura paramétrica.")
+        return None
+    for key in PARAMETRIC_FIXED_KEYS:
+        values = {str(d[key]) for d in designs}
+        if len(values) > 1:
+            status_queue.put(f"ERRO: '{key}' difere entre os designs ({', '.join(sorted(values))}).")
+            return None
+
+    try:
+        status_queue.put(f"Gerando projeto paramétrico com {len(designs)} designs...")
+        project_path = _new_project_path("Divisor_Coaxial_Parametrico")
+        rows_path = _write_parametric_rows(project_path, [hfss_design_variables(d) for d in designs])
+
+        session = session or get_session()
+        with session.design(project_path, "DivisorCoaxial", solution_type="Modal") as hfss:
+            _build_divider_model(hfss, {**designs[0], 'sector_model': False}, status_queue)
+            hfss.parametrics.add_from_file(rows_path, name="Designs")
+            hfss.save_project()
+        status_queue.put(f"HFSS paramétrico salvo em: {project_path}")
+        return project_path
+
+    except Exception as e:
+        status_queue.put(f"ERRO HFSS: {e}")
+        traceback.print_exc()
+        return None
+
+
+def run_parametric_simulation(project_path, status_queue, cores=4, tasks=None, session=None,
+                              parametric_name="Designs"):
+    """
+    Resolve todas as linhas de `parametric_name` numa única análise distribuída
+    (`tasks` variações em paralelo, padrão: uma por design) e devolve o
+    conjunto multi-variação: {'variables', 'rows', 'touchstone',
+    'frequencies' (Hz), 's' (design, freq, porta, porta)}.
+    """
+    if (not HFSS_AVAILABLE and session is None) or not project_path:
+        status_queue.put("ERRO: Simulação HFSS não pode ser iniciada.")
+        return None
+    try:
+        with open(_parametric_rows_path(project_path), newline='') as f:
+            rows = [{k: v for k, v in row.items() if k != "*"} for row in csv.DictReader(f)]
+        variables = list(rows[0])
+
+        session = session or get_session()
+        with session.design(project_path, "DivisorCoaxial") as hfss:
+            status_queue.put(f"Analisando {len(rows)} variações de '{parametric_name}'...")
+            hfss.analyze_setup(parametric_name, cores=cores, tasks=tasks or min(len(rows), cores))
+            export_dir = os.path.dirname(project_path)
+            stem = os.path.splitext(os.path.basename(project_path))[0]
+            n_ports = len(hfss.ports)
+            touchstones = []
+            for i, row in enumerate(rows, start=1):
+                out = os.path.join(export_dir, f"{stem}_design{i:03d}.s{n_ports}p")
+                hfss.export_touchstone("Setup1", "Sweep1", out, variations=variables,
+                                       variations_value=[row[v] for v in variables])
+                if not os.path.isfile(out):
+                    raise RuntimeError(f"O HFSS não gravou o Touchstone da variação {i} em {out}.")
+                touchstones.append(out)
+            hfss.save_project()
+
+        data = [read_touchstone(path) for path in touchstones]
+        status_queue.put(f"{len(data)} variações exportadas para: {export_dir}")
+        return {
+            'variables': variables,
+            'rows': rows,
+            'touchstone': touchstones,
+            'frequencies': data[0][0],
+            's': np.stack([s for _, s, _ in data]),
+        }
+    except Exception as e:
+        status_queue.put(f"ERRO na simulação HFSS: {e}")
+        traceback.print_exc()
+        return None
+
+
+def cached_solution(params):
+    """
+    Touchstone guardado no cache de resultados para `params` (com o setup
+    já fixado por `with_hfss_setup`), ou None. Não copia nada.
+    """
+    return _result_store().lookup(simulation_key(params))
+
+
+def _cached_solution(project_path, cache_key, status_queue):
+    if cache_key is None or not project_path:
+        return None
+    cached = _result_store().materialize(cache_key, os.path.splitext(project_path)[0])
+    if cached:
+        status_queue.put(f"Solução encontrada no cache, simulação ignorada: {cached}")
+    return cached
+
+
+def run_hfss_simulation(project_path, status_queue, session=None, cache_key=None):
+    """
+    Resolve 'Setup1' e exporta o Touchstone no mesmo desktop persistente
+    usado na exportação. Com `cache_key` (ver `simulation_key`) uma solução
+    já guardada é reutilizada e a nova solução é guardada no cache.
+    """
+    cached = _cached_solution(project_path, cache_key, status_queue)
+    if cached:
+        return cached
+    if (not HFSS_AVAILABLE and session is None) or not project_path:
+        status_queue.put("ERRO: Simulação HFSS não pode ser iniciada.")
+        return None
+    try:
+        journal = StageJournal(project_path)
+        exported = journal.info("export")
+        if exported and os.path.exists(exported['touchstone']):
+            status_queue.put(f"Simulação já concluída: {exported['touchstone']}")
+            return exported['touchstone']
+        _claim_project(journal, status_queue)
+
+        status_queue.put("Iniciando simulação HFSS...")
+        session = session or get_session()
+        with session.design(project_path, "DivisorCoaxial") as hfss:
+            if journal.done("solve"):
+                status_queue.put("Solução de 'Setup1' já concluída; retomando na exportação.")
+            else:
+                status_queue.put("Analisando o setup 'Setup1'...")
+                hfss.analyze_setup("Setup1")
+                hfss.save_project()
+                journal.complete("solve")
+                status_queue.put("Simulação HFSS concluída.")
+            # Caminho explícito com o nome que a importação procura; o valor
+            # devolvido por `export_touchstone` varia entre versões do PyAEDT
+            touchstone_file = os.path.splitext(project_path)[0] + f".s{len(hfss.ports)}p"
+            hfss.export_touchstone("Setup1", "Sweep1", touchstone_file)
+            if not os.path.isfile(touchstone_file):
+                raise RuntimeError(f"O HFSS não gravou o Touchstone em {touchstone_file}.")
+            hfss.save_project()
+            journal.complete("export", touchstone=touchstone_file)
+            status_queue.put(f"Resultados exportados para: {touchstone_file}")
+        if cache_key:
+            _result_store().put(cache_key, touchstone_file, {'project': project_path})
+        return touchstone_file
+    except Exception as e:
+        status_queue.put(f"ERRO na simulação HFSS: {e}")
+        traceback.print_exc()
+        return None
+
+
+def run_sector_simulation(project_path, status_queue, n_outputs, cores=4, session=None, cache_key=None):
+    """
+    Resolve os modos azimutais do modelo de setor, reconstrói a matriz S
+    completa de N+1 portas (`rf_engine.sector_to_full_smatrix`) e grava o
+    Touchstone `<projeto>.s{N+1}p`, o mesmo nome esperado pela importação.
+    """
+    cached = _cached_solution(project_path, cache_key, status_queue)
+    if cached:
+        return cached
+    journal = StageJournal(project_path)
+    exported = journal.info("export")
+    if exported and os.path.exists(exported['touchstone']):
+        status_queue.put(f"Simulação já concluída: {exported['touchstone']}")
+        return exported['touchstone']
+    data = run_parametric_simulation(project_path, status_queue, cores=cores, session=session,
+                                     parametric_name="Modos")
+    if data is None:
+        return None
+    try:
+        s_full = sector_to_full_smatrix(data['s'], n_outputs)
+        net = Network(frequency=Frequency.from_f(data['frequencies'], unit='Hz'), s=s_full)
+        touchstone_file = os.path.splitext(project_path)[0] + f".s{n_outputs + 1}p"
+        net.write_touchstone(touchstone_file)
+        journal.complete("solve")
+        journal.complete("export", touchstone=touchstone_file)
+        if cache_key:
+            _result_store().put(cache_key, touchstone_file, {'project': project_path})
+        status_queue.put(f"Matriz S de {n_outputs + 1} portas reconstruída em: {touchstone_file}")
+        return touchstone_file
+    except Exception as e:
+        status_queue.put(f"ERRO na reconstrução do setor: {e}")
+        traceback.print_exc()
+        return None
+
+
+def resume_pipeline(project_path, params, status_queue, session=None):
+    """
+    Retoma exportação e simulação de um projeto interrompido a partir do
+    journal (locks abandonados são limpos antes) e devolve o Touchstone.
+    `params` são os mesmos da exportação original (`get_geometry_for_viewer()`).
+    """
+    params = with_hfss_setup(params, project_path)
+    key = simulation_key(params)
+    cached = _cached_solution(project_path, key, status_queue)
+    if cached:
+        return cached
+    if generate_hfss_model(params, status_queue, session=session, project_path=project_path) is None:
+        return None
+    if _is_sector(params):
+        return run_sector_simulation(project_path, status_queue, params['n_outputs'], session=session,
+                                     cache_key=key)
+    return run_hfss_simulation(project_path, status_queue, session=session, cache_key=key)
+
+
 # def export_full_pdf(calc: RFCalculator, queue: queue.Queue):
 #     pdf_path = fd.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
 #     if not pdf_path:
@@ -780,6 +1331,12 @@ class App(ctk.CTk):
         self.queue = queue.Queue()
         self.calc = None
         self.project_path = None
+        self.hfss_params = None
+        self.timings = {}
+        self.job_queue = None
+        self.cached_touchstone = None
+        self.open_project = None
+        refresh_results_index()
 
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=1)
@@ -807,8 +1364,11 @@ class App(ctk.CTk):
 
     def calculate_and_display(self, params):
         self.calc = CoaxialCalculator(params)
+        self.cached_touchstone = None
         self.queue.put("Calculando parâmetros geométricos e teóricos...")
+        t0 = time.perf_counter()
         if self.calc.calculate():
+            self.timings = {'calculate_s': time.perf_counter() - t0}
             self.queue.put("Cálculo concluído. Gerando visualizações...")
             self.result_frame.display_results(self.calc)
             self.update_button_states()
@@ -825,15 +1385,54 @@ class App(ctk.CTk):
 
     def _export_hfss_thread(self):
         # ** CORREÇÃO APLICADA AQUI **
-        path = generate_hfss_model(self.calc.get_geometry_for_viewer(), self.queue)
+        t0 = time.perf_counter()
+        params = with_hfss_setup(self.calc.get_geometry_for_viewer())
+        cached = cached_solution(params)
+        if cached:
+            # Solução já no cache: nenhum .aedt é criado e a simulação fica
+            # desabilitada; a importação usa o Touchstone guardado
+            self.queue.put(f"Resultado já simulado no cache, exportação ignorada. Importe: {cached}")
+            self.project_path, self.hfss_params, self.cached_touchstone = None, params, cached
+            self.after(0, self.update_button_states)
+            return
+        path = generate_hfss_model(params, self.queue)
+        self.timings['export_s'] = time.perf_counter() - t0
         if path:
-            self.project_path = path
+            self.project_path, self.hfss_params, self.cached_touchstone = path, params, None
             self.after(0, self.update_button_states)
 
     def run_simulation(self):
         if self.project_path:
-            thread = threading.Thread(target=run_hfss_simulation, args=(self.project_path, self.queue), daemon=True)
-            thread.start()
+            # Parâmetros com que o projeto foi exportado, não os do cálculo atual
+            p = self.hfss_params or self.calc.get_geometry_for_viewer()
+            meta = {'sector_outputs': p['n_outputs'] if _is_sector(p) else 0, 'cache_key': simulation_key(p)}
+            self.simulation_queue().submit(self.project_path, meta=meta)
+            self.queue.put(f"Simulação na fila: {os.path.basename(self.project_path)}")
+
+    def simulation_queue(self):
+        """
+        Fila das simulações da interface (`JobQueue`): uma solução por vez no
+        desktop persistente, servida por uma thread de fundo. Jobs pendentes
+        de uma sessão anterior são retomados.
+        """
+        if self.job_queue is None:
+            self.job_queue = JobQueue(os.path.join(user_data_dir(), "simulation_queue.json"),
+                                      solver=self._solve_queued, max_concurrent=1, max_attempts=1)
+            threading.Thread(target=self.job_queue.run, kwargs={'forever': True}, daemon=True).start()
+        return self.job_queue
+
+    def _solve_queued(self, project, cores):
+        meta = self.job_queue.running_job(project)['meta']
+        t0 = time.perf_counter()
+        if meta.get('sector_outputs'):
+            touchstone = run_sector_simulation(project, self.queue, meta['sector_outputs'],
+                                               cache_key=meta.get('cache_key'))
+        else:
+            touchstone = run_hfss_simulation(project, self.queue, cache_key=meta.get('cache_key'))
+        if not touchstone:
+            raise RuntimeError(f"A simulação de {os.path.basename(project)} não gerou Touchstone.")
+        self.timings['simulation_s'] = time.perf_counter() - t0
+        refresh_results_index(self.queue)
 
     def import_hfss_results(self):
         if not self.calc:
@@ -850,6 +1449,9 @@ class App(ctk.CTk):
             if os.path.exists(expected_file):
                 touchstone_file = expected_file
 
+        if not touchstone_file and not self.project_path and self.cached_touchstone:
+            touchstone_file = self.cached_touchstone
+
         if not touchstone_file:
             touchstone_file = fd.askopenfilename(
                 title="Selecione o arquivo Touchstone (.sNp)",
@@ -859,14 +1461,38 @@ class App(ctk.CTk):
         if touchstone_file and os.path.exists(touchstone_file):
             try:
                 self.queue.put(f"Importando resultados de {touchstone_file}...")
-                sim_net = Network(touchstone_file)
+                # A partir da segunda abertura o arquivo .cache ao lado do
+                # Touchstone é só mapeado em memória, sem reler o texto
+                t0 = time.perf_counter()
+                sim_net = load_network(touchstone_file, cache=True)
+                self.timings['import_s'] = time.perf_counter() - t0
                 self.calc.s_params_sim = sim_net
-                self.queue.put("Resultados importados. Atualizando gráficos...")
-                self.result_frame.display_results(self.calc)
+                comparison = self._comparison_summary()
+                self.queue.put("Resultados importados. Atualizando gráficos..." if comparison is None else
+                               "Resultados importados. Comparação na aba 'Teoria x Simulação'.")
+                self.result_frame.display_results(self.calc, comparison)
             except Exception as e:
                 self.queue.put(f"Erro ao importar arquivo: {e}")
                 messagebox.showerror("Erro de Importação", f"Não foi possível ler o arquivo Touchstone.\n{e}")
 
+    def _comparison_summary(self):
+        """
+        Resumo teoria x simulação para o painel de resultados, ou None. Uma
+        falha na comparação não impede a importação nem os gráficos.
+        """
+        net = self.calc.s_params_sim
+        try:
+            result = self.calc.compare_with_simulation()
+        except Exception as e:
+            self.queue.put(f"Comparação teoria x simulação indisponível: {e}")
+            return None
+        if result is None:
+            if net is not None:
+                self.queue.put(f"Comparação ignorada: a rede importada tem {net.nports} portas, "
+                               f"o divisor {self.calc.params['n_outputs'] + 1}.")
+            return None
+        return format_summary(result)
+
     def export_pdf(self):
         if self.calc:
             thread = threading.Thread(target=export_full_pdf, args=(self.calc, self.queue), daemon=True)
@@ -874,26 +1500,78 @@ class App(ctk.CTk):
 
     def save_project(self):
         if self.calc:
-            filepath = fd.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Project Files", "*.json")])
+            filepath = fd.asksaveasfilename(defaultextension=PROJECT_SUFFIX,
+                                            filetypes=[("Projeto do divisor", f"*{PROJECT_SUFFIX}")])
             if filepath:
                 try:
-                    with open(filepath, 'w') as f:
-                        json.dump(self.calc.params, f, indent=4)
+                    self._release_open_project(filepath)
+                    calc, net = self.calc, self.calc.s_params_sim
+                    sim = (net.f, net.s, net.z0[0]) if net is not None else None
+                    save_project_file(filepath, calc.params, calc.results, calc.frequencies, calc.s_params_th,
+                                      sim=sim, aedt_path=self.project_path,
+                                      hfss_setup=(self.hfss_params or {}).get('hfss_setup'), timings=self.timings)
                     self.queue.put(f"Projeto salvo em {filepath}")
                 except Exception as e:
                     messagebox.showerror("Erro ao Salvar", f"Não foi possível salvar o projeto.\n{e}")
 
     def load_project(self):
-        filepath = fd.askopenfilename(filetypes=[("JSON Project Files", "*.json")])
+        filepath = fd.askopenfilename(filetypes=[("Projeto do divisor", f"*{PROJECT_SUFFIX}"),
+                                                 ("JSON Project Files", "*.json")])
         if filepath:
             try:
-                with open(filepath, 'r') as f:
-                    params = json.load(f)
-                self.param_frame.load_params(params)
+                project = load_project_file(filepath)
+                self.param_frame.load_params(project.params)
+                if project.version >= 2:
+                    self.restore_project(project)
                 self.queue.put(f"Projeto carregado de {filepath}")
             except Exception as e:
                 messagebox.showerror("Erro ao Carregar", f"Não foi possível carregar o projeto.\n{e}")
 
+    def restore_project(self, project):
+        """
+        Restaura a sessão salva (cálculo, S teórico, rede simulada, projeto
+        HFSS e tempos) sem recalcular nem reimportar. Frequências e S teórico
+        ficam como vistas dos blocos mapeados do arquivo (só as páginas
+        usadas saem do disco); ver `_release_open_project`.
+        """
+        calc = CoaxialCalculator(dict(project.params))
+        calc.results = project.results
+        calc.frequencies = project.frequencies
+        calc.s_params_th = project.s_params_th
+        if project.sim is not None:
+            f, s, z0 = project.sim
+            calc.s_params_sim = Network(frequency=Frequency.from_f(f, unit='Hz'), s=s, z0=z0)
+        if self.open_project is not None:
+            self.open_project.close()
+        self.open_project = project
+        self.calc = calc
+        aedt = project.aedt_path
+        self.project_path = aedt if aedt and os.path.exists(aedt) else None
+        self.cached_touchstone = None
+        self.hfss_params = ({**calc.get_geometry_for_viewer(), 'hfss_setup': project.hfss_setup}
+                            if project.hfss_setup else None)
+        self.timings = dict(project.timings)
+        self.result_frame.display_results(calc, self._comparison_summary())
+        self.update_button_states()
+
+    def _release_open_project(self, filepath):
+        """
+        Antes de gravar sobre o .coaxproj aberto: copia para a memória os
+        blocos que o cálculo ainda usa mapeados e solta o mapeamento, senão
+        o os.replace do salvamento falha no Windows. Outro destino não
+        precisa de cópia.
+        """
+        project = self.open_project
+        if project is None or not os.path.exists(filepath) or not os.path.samefile(project.path, filepath):
+            return
+        calc = self.calc
+        if calc.frequencies is not None:
+            calc.frequencies = np.array(calc.frequencies)
+        if calc.s_params_th:
+            calc.s_params_th = {k: np.array(v) for k, v in calc.s_params_th.items()}
+        project.close()
+        self.open_project = None
+
     def update_button_states(self):
         calc_done = self.calc is not None
         hfss_exported = self.project_path is not None
@@ -936,6 +1614,16 @@ class ParameterFrame(ctk.CTkFrame):
         self.mat_menu.grid(row=row, column=1, padx=10, pady=5, sticky="ew")
         row += 1
 
+        self.adaptive_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(self, text="Grade de frequência adaptativa", variable=self.adaptive_var).grid(
+            row=row, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        row += 1
+
+        self.sector_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(self, text="HFSS: modelo de setor 1/N (simetria)", variable=self.sector_var).grid(
+            row=row, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        row += 1
+
         self.calc_btn = ctk.CTkButton(self, text="Calcular", command=self._validate_and_calc, fg_color="#2aa198",
                                       hover_color="#268c84")
         self.calc_btn.grid(row=row, column=0, columnspan=2, pady=10, sticky="ew");
@@ -972,6 +1660,8 @@ class ParameterFrame(ctk.CTkFrame):
             params['n_sections'] = int(params['n_sections'])
             params['n_outputs'] = int(params['n_outputs'])
             params['diel_material'] = self.mat_var.get()
+            params['adaptive_grid'] = self.adaptive_var.get()
+            params['sector_model'] = self.sector_var.get()
 
             if params['f_stop'] <= params['f_start']:
                 raise ValueError("Frequência final deve ser maior que a inicial.")
@@ -995,6 +1685,10 @@ class ParameterFrame(ctk.CTkFrame):
                 self.entries[key].insert(0, str(value))
             elif key == 'diel_material':
                 self.mat_var.set(value)
+            elif key == 'adaptive_grid':
+                self.adaptive_var.set(bool(value))
+            elif key == 'sector_model':
+                self.sector_var.set(bool(value))
 
 
 class ResultFrame(ctk.CTkFrame):
@@ -1009,10 +1703,12 @@ class ResultFrame(ctk.CTkFrame):
 
         self.tab_view.add("Gráficos de Desempenho")
         self.tab_view.add("Parâmetros Geométricos")
+        self.tab_view.add("Teoria x Simulação")
         self.tab_view.add("Visualização 3D")
 
         self.canvas_frame = self.tab_view.tab("Gráficos de Desempenho")
         self.geo_frame = self.tab_view.tab("Parâmetros Geométricos")
+        self.cmp_frame = self.tab_view.tab("Teoria x Simulação")
         self.vis_frame = self.tab_view.tab("Visualização 3D")
 
         ctk.CTkLabel(self.vis_frame,
@@ -1020,7 +1716,7 @@ class ResultFrame(ctk.CTkFrame):
             pady=20)
         ctk.CTkButton(self.vis_frame, text="Atualizar Visualização 3D", command=self.launch_3d_viewer).pack(pady=10)
 
-    def display_results(self, calc: RFCalculator):
+    def display_results(self, calc: RFCalculator, comparison=None):
         for widget in self.canvas_frame.winfo_children():
             widget.destroy()
         fig = calc.plot_performance()
@@ -1049,6 +1745,14 @@ class ResultFrame(ctk.CTkFrame):
         text_area.insert("1.0", report)
         text_area.configure(state="disabled")
 
+        for widget in self.cmp_frame.winfo_children():
+            widget.destroy()
+        cmp_area = ctk.CTkTextbox(self.cmp_frame, font=("Courier New", 12))
+        cmp_area.pack(fill="both", expand=True, padx=10, pady=10)
+        cmp_area.insert("1.0", "--- Teoria x Simulação ---\n\n" + (
+            comparison or "Importe os resultados do HFSS (Touchstone com N+1 portas) para comparar."))
+        cmp_area.configure(state="disabled")
+
     def launch_3d_viewer(self):
         if self.app.calc:
             params = self.app.calc.get_geometry_for_viewer()
@@ -0,0 +1,869 @@
+"""
+Análise dos registros do AEDT (sem GUI).
+
+- `batch.log`: leitura em fluxo, linha a linha, das sessões em lote
+  (início/fim, tempos por etapa, uniões, portas, erros e o arquivo Python
+  que falhou), com estatísticas de resumo. A leitura é incremental: o
+  parser guarda o deslocamento em bytes e só relê o que foi acrescentado.
+- `*.aedtresults`: estatísticas de malha (`.stats`), convergência
+  (`.EMConvData`), perfil de execução (`.profile`) e variações (`.asol`)
+  de cada projeto, indexadas em SQLite junto com as variáveis e o setup
+  do `.aedt`. A varredura é paralela e incremental (pula diretórios cujo
+  mtime não mudou); o índice permite correlacionar parâmetros com malha e
+  custo e estimar o tempo de novas simulações.
+- Setup adaptativo: limite de passes, semeadura da malha inicial e tipo de
+  sweep escolhidos a partir dos solves de geometrias parecidas no índice.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# --------------------------------------------------------------------
+# 1. batch.log
+# --------------------------------------------------------------------
+_START = re.compile(r"^Starting Batch Run: (.+?)\s*$")
+_STOP = re.compile(r"^Stopping Batch Run: (.+?)\s*$")
+_VERSION = re.compile(r"^Ansys Electronics Desktop Version ([\d.]+)")
+_ELAPSED = re.compile(r"\[info\] (.*?)\s*Elapsed time: (\d+)m (\d+)sec")
+_LOAD_TIME = re.compile(r"\[info\] aedt file load time ([\d.eE+-]+)")
+_GRPC = re.compile(r"GRPC server running on port: (\d+)")
+_PROJECT = re.compile(r"\[info\] Project (\S+) has been created")
+_DESIGN = re.compile(r"\[info\] Added design '([^']+)'")
+_UNION = re.compile(r"\[info\] Union of (\d+) objects")
+_PORT = re.compile(r"\[info\] Boundary Wave Port (\S+) has been created")
+_MATERIAL = re.compile(r"\[info\] Adding new material to the Project Library: (.+?)\s*$")
+_WARNING = re.compile(r"\[warning\] (.+?)\s*$")
+_ERROR = re.compile(r"\[error\] (.*?)\s*$")
+_FRAME = re.compile(r'File "(.+?)", line (\d+), in (\S+)')
+_API_ERROR = re.compile(r"AEDT API Error on (\S+)")
+_SIM_DONE = re.compile(r"(Normal completion|completed with execution error) of simulation.*\((.+?)\)")
+_SIM_DONE_ALT = re.compile(r"Simulation (completed with execution error) on server.*\((.+?)\)")
+_STAMP_FORMAT = "%I:%M:%S %p %b %d, %Y"
+
+# Nome da etapa a partir do texto antes de "Elapsed time"
+_STAGE_NAMES = (
+    (re.compile(r"^(\w+) class has been initialized"), r"\1"),
+    (re.compile(r"^File .* correctly loaded"), "Project load"),
+    (re.compile(r"^Bodies Info Refreshed"), "Bodies refresh"),
+    (re.compile(r"^3D Modeler objects parsed"), "Objects parse"),
+)
+
+
+def _parse_stamp(text):
+    # strptime ignora maiúsculas em %p/%b ("05:10:29 pm  jun 10, 2025")
+    try:
+        return datetime.strptime(" ".join(text.split()), _STAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def _stage_name(text):
+    text = text.strip()
+    for pattern, name in _STAGE_NAMES:
+        m = pattern.search(text)
+        if m:
+            return m.expand(name)
+    return text.rstrip(".!")
+
+
+def _new_session(offset, start):
+    return {
+        'offset': offset, 'start': start, 'stop': None, 'duration_s': None, 'version': None,
+        'grpc_port': None, 'project': None, 'design': None, 'stages': {}, 'unions': [], 'ports': [],
+        'materials': [], 'warnings': [], 'errors': [], 'api_errors': [], 'failed_frame': None,
+        'simulation': None, 'simulation_end': None, 'failed': False,
+    }
+
+
+def _feed(session, line):
+    """
+    Atualiza a sessão com uma linha do log.
+    """
+    m = _ELAPSED.search(line)
+    if m:
+        stage = _stage_name(m.group(1))
+        session['stages'].setdefault(stage, []).append(int(m.group(2)) * 60 + int(m.group(3)))
+        return
+    m = _LOAD_TIME.search(line)
+    if m:
+        session['stages'].setdefault("aedt file load", []).append(float(m.group(1)))
+        return
+    for pattern, key in ((_GRPC, 'grpc_port'), (_PROJECT, 'project'), (_DESIGN, 'design')):
+        m = pattern.search(line)
+        if m:
+            session[key] = int(m.group(1)) if key == 'grpc_port' else m.group(1)
+            return
+    for pattern, key in ((_UNION, 'unions'), (_PORT, 'ports'), (_MATERIAL, 'materials'), (_WARNING, 'warnings')):
+        m = pattern.search(line)
+        if m:
+            session[key].append(int(m.group(1)) if key == 'unions' else m.group(1))
+            return
+    m = _SIM_DONE.search(line) or _SIM_DONE_ALT.search(line)
+    if m:
+        session['simulation'] = "normal" if m.group(1).startswith("Normal") else "error"
+        session['simulation_end'] = _parse_stamp(m.group(2))
+        if session['simulation'] == "error":
+            session['failed'] = True
+    m = _ERROR.search(line)
+    if m:
+        message = m.group(1)
+        if not message or set(message) == {"*"}:
+            return
+        session['failed'] = True
+        session['errors'].append(message)
+        frame = _FRAME.search(message)
+        # O quadro mais interno fora da biblioteca padrão é o que falhou
+        if frame and "threading.py" not in frame.group(1):
+            session['failed_frame'] = {'file': frame.group(1), 'line': int(frame.group(2)),
+                                       'function': frame.group(3)}
+        api = _API_ERROR.search(message)
+        if api:
+            session['api_errors'].append(api.group(1))
+
+
+def _close(session, stop=None):
+    session['stop'] = stop
+    if stop is not None and session['start'] is not None:
+        session['duration_s'] = (stop - session['start']).total_seconds()
+    return session
+
+
+class BatchLogParser:
+    """
+    Parser incremental do `batch.log`.
+
+    `sessions()` lê a partir de `offset` e gera as sessões completas (com
+    "Stopping Batch Run" ou seguidas de outro início); a sessão ainda aberta
+    no fim do arquivo não é emitida e `offset` volta para o seu início, então
+    a próxima chamada a relê com as linhas novas. A memória usada é a de uma
+    sessão, independentemente do tamanho do log. `version` guarda a versão
+    anunciada antes de `offset`, já que o cabeçalho precede o "Starting".
+    """
+
+    def __init__(self, path, offset=0, version=None):
+        self.path = path
+        self.offset = offset
+        self.version = version
+
+    def sessions(self):
+        session, version = None, self.version
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            pos = self.offset
+            for raw in iter(f.readline, b""):
+                line_start, pos = pos, pos + len(raw)
+                line = raw.decode('utf-8', errors='replace').rstrip("\r\n")
+                m = _START.match(line)
+                if m:
+                    if session is not None:
+                        # Sessão sem "Stopping": morreu ou foi intercalada
+                        self.offset, self.version = line_start, version
+                        yield _close(session)
+                    session = _new_session(line_start, _parse_stamp(m.group(1)))
+                    session['version'] = version
+                    continue
+                m = _VERSION.match(line)
+                if m:
+                    version = m.group(1)
+                    continue
+                if session is None:
+                    continue
+                m = _STOP.match(line)
+                if m:
+                    self.offset, self.version = pos, version
+                    yield _close(session, _parse_stamp(m.group(1)))
+                    session = None
+                    continue
+                _feed(session, line)
+        if session is not None:
+            self.offset, self.version = session['offset'], session['version']
+
+
+def parse_batch_log(path):
+    """
+    Lista com todas as sessões completas de `path`.
+    """
+    return list(BatchLogParser(path).sessions())
+
+
+def _basename(path):
+    # Os caminhos do log são do Windows, independentemente de onde se lê
+    return re.split(r"[\\/]", path)[-1]
+
+
+def _describe(values):
+    values = np.asarray([v for v in values if v is not None], dtype=float)
+    if values.size == 0:
+        return {'count': 0}
+    return {
+        'count': int(values.size), 'total': float(values.sum()), 'mean': float(values.mean()),
+        'median': float(np.median(values)), 'p95': float(np.percentile(values, 95)), 'max': float(values.max()),
+    }
+
+
+def summarize_sessions(sessions):
+    """
+    Estatísticas das sessões: duração, tempo por etapa, falhas por chamada
+    da API e por arquivo/função, uniões e soluções.
+    """
+    sessions = list(sessions)
+    failed = [s for s in sessions if s['failed']]
+    stage_values = {}
+    for s in sessions:
+        for stage, values in s['stages'].items():
+            stage_values.setdefault(stage, []).extend(values)
+    solve = [(s['simulation_end'] - s['start']).total_seconds() for s in sessions
+             if s['simulation_end'] is not None and s['start'] is not None]
+    return {
+        'sessions': len(sessions),
+        'failed': len(failed),
+        'failure_rate': len(failed) / len(sessions) if sessions else 0.0,
+        'unterminated': sum(1 for s in sessions if s['stop'] is None),
+        'duration_s': _describe(s['duration_s'] for s in sessions),
+        'time_to_solution_s': _describe(solve),
+        'stages_s': {stage: _describe(values) for stage, values in sorted(stage_values.items())},
+        'api_errors': dict(Counter(api for s in failed for api in s['api_errors']).most_common()),
+        'failed_in': dict(Counter(f"{_basename(s['failed_frame']['file'])}:{s['failed_frame']['function']}"
+                                  for s in failed if s['failed_frame']).most_common()),
+        'unions': dict(sorted(Counter(n for s in sessions for n in s['unions']).items())),
+        'simulations': dict(Counter(s['simulation'] for s in sessions if s['simulation'])),
+    }
+
+
+# --------------------------------------------------------------------
+# 2. Resultados (*.aedtresults)
+# --------------------------------------------------------------------
+_QUANTITY = re.compile(r"^\s*([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)\s*([A-Za-z]*)\s*$")
+_UNIT_SCALE = {
+    '': 1.0, 'mm': 1.0, 'cm': 10.0, 'm': 1000.0, 'um': 1e-3, 'in': 25.4, 'mil': 0.0254,
+    'hz': 1.0, 'khz': 1e3, 'mhz': 1e6, 'ghz': 1e9,
+}
+_VARIABLE = re.compile(r"VariableProp\('([^']+)', '[^']*', '[^']*', '([^']*)'")
+_VARIATION = re.compile(r"Map\(V='(.*?)', ID=(\d+)\)")
+_VARIATION_VALUE = re.compile(r"(\w+)=\\'([^\\]*)\\'")
+_VARIATION_ID = re.compile(r"(?:^|_)DV(\d+)_")
+_SETUP_ID = re.compile(r"_S(\d+)_")
+_SETUP_KEYS = {'Frequency': 'adapt_freq_hz', 'MaximumPasses': 'max_passes', 'MaxDeltaS': 'max_delta_s',
+               'RangeCount': 'sweep_points', 'Type': 'sweep_type'}
+_SETUP_LINE = re.compile(r"^\s*(Frequency|MaximumPasses|MaxDeltaS|RangeCount|Type)=(.+?)\s*$")
+_PASS_NO = re.compile(r"PassNo=(\d+)")
+_SOLVED = re.compile(r"SolvedElements\(([^,]+),")
+_DELTA_S = re.compile(r"MaxMagDeltaS\(([^,]+),")
+_PROFILE_GROUP = re.compile(r"^\s*Name='(.+)'\s*$")
+_PROFILE_ELAPSED = re.compile(r"I\(1, 'Elapsed Time', '(\d+):(\d+):(\d+)'\)")
+_PROFILE_FIELD = re.compile(r"\\'([^\\]+)\\', ([\d.]+|\\'[^\\]*\\')")
+_PROFILE_INFO = re.compile(r"I\(1, '(Start Time|Processor|Product)', '([^']*)'\)")
+_PROFILE_STOP = re.compile(r"\\'Stop Time\\', \\'([^\\]+)\\', 1, \\'Status\\', \\'([^\\]+)\\'")
+_PROFILE_STAMP = "%m/%d/%Y %H:%M:%S"
+_PROFILE_STAGES = {'Initial Meshing': 'initial_mesh_s', 'Adaptive Meshing': 'adaptive_s',
+                   'Frequency Sweep': 'sweep_s', 'Solution Process': 'elapsed_s'}
+
+
+def parse_quantity(text):
+    """
+    Valor numérico de '12.5mm', '1GHz', '0.02'... em mm ou Hz; None para
+    expressões ('dia_int_tubo / 2').
+    """
+    m = _QUANTITY.match(text.strip().strip("'"))
+    if not m or m.group(2).lower() not in _UNIT_SCALE:
+        return None
+    return float(m.group(1)) * _UNIT_SCALE[m.group(2).lower()]
+
+
+def parse_stats(path):
+    """
+    Lê um arquivo `.stats` de malha: uma linha por objeto (tetraedros,
+    arestas e volumes) e os totais do rodapé.
+    """
+    objects, totals, columns = [], {}, None
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if "|" in line:
+                cells = [c.strip() for c in line.split("|")]
+                if columns is None:
+                    columns = cells
+                    continue
+                try:
+                    objects.append([float(c) for c in cells])
+                except ValueError:
+                    pass
+                continue
+            parts = line.split()
+            if len(parts) == 2:
+                totals[parts[0]] = parts[1]
+    rows = np.asarray(objects, dtype=float).reshape(-1, 9)
+    return {
+        'objects': len(rows),
+        'total_tets': int(totals['NumTotalTets']) if 'NumTotalTets' in totals else int(rows[:, 1].sum()),
+        'background_tets': int(totals['NumBkTets']) if 'NumBkTets' in totals else None,
+        'units': totals.get('User_Units'),
+        'min_edge': float(rows[:, 2].min()) if len(rows) else None,
+        'max_edge': float(rows[:, 3].max()) if len(rows) else None,
+        # RMS global ponderado pelo número de tetraedros de cada objeto
+        'rms_edge': float(np.sqrt(np.average(rows[:, 4] ** 2, weights=rows[:, 1]))) if rows[:, 1].sum() else None,
+        'mean_volume': float(np.average(rows[:, 7], weights=rows[:, 1])) if rows[:, 1].sum() else None,
+    }
+
+
+def parse_convergence(path):
+    """
+    Passes adaptativos de um `.EMConvData`: tetraedros resolvidos e
+    delta-S máximo de cada passe, e se o setup convergiu.
+    """
+    with open(path, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    passes = {}
+    for block in text.split("$begin 'QuantityValues'")[1:]:
+        m = _PASS_NO.search(block)
+        if not m:
+            continue
+        tets, delta = _SOLVED.search(block), _DELTA_S.search(block)
+        passes[int(m.group(1))] = (int(float(tets.group(1))) if tets else None,
+                                   float(delta.group(1)) if delta else None)
+    return {
+        'converged': "IsConverged=true" in text,
+        'passes': [(n,) + passes[n] for n in sorted(passes)],
+    }
+
+
+def parse_profile(path):
+    """
+    Tempos e recursos de um `.profile`: duração total e por etapa,
+    maior malha resolvida, tamanho da matriz, núcleos e situação final.
+    """
+    out = {'start': None, 'status': None, 'cores': None, 'product': None, 'max_tets': None,
+           'matrix_size': None, 'memory_mb': None}
+    group = None
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            m = _PROFILE_GROUP.match(line)
+            if m:
+                group = m.group(1)
+                continue
+            m = _PROFILE_ELAPSED.search(line)
+            if m and group in _PROFILE_STAGES and _PROFILE_STAGES[group] not in out:
+                h, mi, s = (int(g) for g in m.groups())
+                out[_PROFILE_STAGES[group]] = h * 3600 + mi * 60 + s
+                continue
+            m = _PROFILE_INFO.search(line)
+            if m:
+                key, value = m.groups()
+                if key == 'Start Time':
+                    out['start'] = datetime.strptime(value, _PROFILE_STAMP).isoformat()
+                elif key == 'Processor':
+                    out['cores'] = int(value)
+                else:
+                    out['product'] = value
+                continue
+            m = _PROFILE_STOP.search(line)
+            if m:
+                out['status'] = m.group(2)
+                continue
+            if 'ProfileFootnote' in line or 'Total Memory' in line:
+                fields = dict(_PROFILE_FIELD.findall(line))
+                if 'Max solved tets' in fields:
+                    out['max_tets'] = int(fields['Max solved tets'])
+                    out['matrix_size'] = int(fields.get('Max matrix size', 0)) or None
+                if 'Total Memory' in fields:
+                    memory = fields['Total Memory'].strip("\\'").split()
+                    scale = {'KB': 1e-3, 'MB': 1.0, 'GB': 1e3}.get(memory[-1], None)
+                    if scale is not None:
+                        out['memory_mb'] = max(out['memory_mb'] or 0.0, float(memory[0]) * scale)
+    return out
+
+
+def parse_asol(path):
+    """
+    Variações resolvidas de um `.asol`: {id da variação: {variável: valor}}.
+    """
+    variations = {}
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            m = _VARIATION.search(line)
+            if m:
+                variations[int(m.group(2))] = dict(_VARIATION_VALUE.findall(m.group(1)))
+    return variations
+
+
+def parse_aedt_project(path):
+    """
+    Variáveis de projeto, número de portas e o setup/sweep (passes, delta-S,
+    frequência de adaptação, tipo e pontos do sweep) de um `.aedt`.
+    """
+    variables, setup, n_ports = {}, {}, 0
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if "VariableProp(" in line:
+                for name, value in _VARIABLE.findall(line):
+                    variables.setdefault(name, value)
+            elif "BoundType='Wave Port'" in line:
+                n_ports += 1
+            else:
+                m = _SETUP_LINE.match(line)
+                if m:
+                    # Só o primeiro setup/sweep; 'Type' aparece em outros blocos
+                    key = _SETUP_KEYS[m.group(1)]
+                    if key == 'sweep_type' and 'sweep_points' not in setup:
+                        continue
+                    setup.setdefault(key, m.group(2).strip("'"))
+    for key in ('adapt_freq_hz', 'max_delta_s'):
+        if key in setup:
+            setup[key] = parse_quantity(setup[key])
+    for key in ('max_passes', 'sweep_points'):
+        if key in setup:
+            setup[key] = int(setup[key])
+    return {'variables': variables, 'n_ports': n_ports, 'setup': setup}
+
+
+def _variation_of(name):
+    m = _VARIATION_ID.search(name)
+    return int(m.group(1)) if m else None
+
+
+def scan_project(aedt_path):
+    """
+    Lê um projeto e o seu diretório `.aedtresults`. Função pura (sem
+    SQLite) para poder rodar em outro processo.
+    """
+    results_dir = aedt_path + "results"
+    project = parse_aedt_project(aedt_path)
+    project.update({'path': aedt_path, 'mtime': _project_mtime(aedt_path), 'variations': {},
+                    'mesh': [], 'solves': {}})
+    if not os.path.isdir(results_dir):
+        return project
+    for asol in glob.glob(os.path.join(results_dir, "*.asol")):
+        project['variations'].update(parse_asol(asol))
+    for stats in glob.glob(os.path.join(results_dir, "*.results", "*", "*.stats")):
+        folder = os.path.basename(os.path.dirname(stats))
+        row = parse_stats(stats)
+        row.update({'variation': _variation_of(folder), 'kind': os.path.splitext(folder)[1].lstrip("."),
+                    'file': os.path.relpath(stats, results_dir)})
+        project['mesh'].append(row)
+    # Um solve por (variação, setup): o .profile traz o custo e o
+    # .EMConvData os passes
+    for pattern, parser, key in (("*.profile", parse_profile, 'profile'),
+                                 ("*.EMConvData", parse_convergence, 'convergence')):
+        for path in glob.glob(os.path.join(results_dir, "*.results", pattern)):
+            name = os.path.basename(path)
+            setup = _SETUP_ID.search(name)
+            solve_key = (_variation_of(name), int(setup.group(1)) if setup else None)
+            project['solves'].setdefault(solve_key, {})[key] = parser(path)
+    return project
+
+
+def _project_mtime(aedt_path):
+    # Mudanças no .aedt, no diretório de resultados e nos seus subdiretórios
+    # imediatos (onde o HFSS cria os arquivos de cada solve)
+    paths = [aedt_path, aedt_path + "results"] + glob.glob(os.path.join(aedt_path + "results", "*.results"))
+    return max(os.path.getmtime(p) for p in paths if os.path.exists(p))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime REAL, scanned_at REAL,
+    n_ports INTEGER, n_sections INTEGER, adapt_freq_hz REAL, max_passes INTEGER,
+    max_delta_s REAL, sweep_type TEXT, sweep_points INTEGER
+);
+CREATE TABLE IF NOT EXISTS variables (
+    project_id INTEGER, variation INTEGER, name TEXT, value REAL, expression TEXT
+);
+CREATE TABLE IF NOT EXISTS mesh_stats (
+    project_id INTEGER, variation INTEGER, kind TEXT, file TEXT, objects INTEGER,
+    total_tets INTEGER, background_tets INTEGER, units TEXT, min_edge REAL,
+    max_edge REAL, rms_edge REAL, mean_volume REAL
+);
+CREATE TABLE IF NOT EXISTS solves (
+    project_id INTEGER, variation INTEGER, setup INTEGER, start TEXT, status TEXT,
+    product TEXT, cores INTEGER, elapsed_s REAL, initial_mesh_s REAL, adaptive_s REAL,
+    sweep_s REAL, memory_mb REAL, max_tets INTEGER, matrix_size INTEGER,
+    converged INTEGER, passes INTEGER, final_tets INTEGER, final_delta_s REAL
+);
+CREATE TABLE IF NOT EXISTS passes (
+    project_id INTEGER, variation INTEGER, setup INTEGER, pass_no INTEGER,
+    tets INTEGER, delta_s REAL
+);
+CREATE INDEX IF NOT EXISTS variables_project ON variables(project_id, variation);
+CREATE INDEX IF NOT EXISTS mesh_project ON mesh_stats(project_id);
+CREATE INDEX IF NOT EXISTS solves_project ON solves(project_id);
+CREATE INDEX IF NOT EXISTS passes_project ON passes(project_id);
+"""
+_PROJECT_COLUMNS = ('n_ports', 'n_sections', 'adapt_freq_hz', 'max_passes', 'max_delta_s',
+                    'sweep_type', 'sweep_points')
+_SOLVE_COLUMNS = ('start', 'status', 'product', 'cores', 'elapsed_s', 'initial_mesh_s', 'adaptive_s',
+                  'sweep_s', 'memory_mb', 'max_tets', 'matrix_size')
+_MESH_COLUMNS = ('kind', 'file', 'objects', 'total_tets', 'background_tets', 'units', 'min_edge',
+                 'max_edge', 'rms_edge', 'mean_volume')
+
+
+class ResultsIndex:
+    """
+    Índice SQLite dos resultados do HFSS.
+
+    Tabelas: `projects` (setup e contagens), `variables` (variáveis do .aedt
+    com `variation` nulo e de cada variação do .asol), `mesh_stats`,
+    `solves` (um por variação/setup, com tempos e convergência) e `passes`.
+    A junção parâmetros x custo é feita por `project_id` e `variation`.
+
+    Com `shared` a conexão pode ser usada por várias threads, uma de cada
+    vez sob `lock` (ver `shared_index`).
+    """
+
+    def __init__(self, db_path, shared=False):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path, check_same_thread=not shared)
+        self.db.executescript(_SCHEMA)
+        self.lock = threading.RLock()
+
+    def close(self):
+        self.db.close()
+
+    def mtimes(self):
+        return dict(self.db.execute("SELECT path, mtime FROM projects"))
+
+    def store(self, project):
+        """
+        Substitui as linhas de um projeto pelo resultado de `scan_project`.
+        """
+        db = self.db
+        with db:
+            row = db.execute("SELECT id FROM projects WHERE path = ?", (project['path'],)).fetchone()
+            if row:
+                pid = row[0]
+                for table in ('variables', 'mesh_stats', 'solves', 'passes'):
+                    db.execute(f"DELETE FROM {table} WHERE project_id = ?", (pid,))
+            else:
+                pid = db.execute("INSERT INTO projects (path) VALUES (?)", (project['path'],)).lastrowid
+            setup = dict(project['setup'], n_ports=project['n_ports'],
+                         n_sections=sum(1 for v in project['variables'] if re.fullmatch(r"dia_sc\d+", v)))
+            db.execute(f"UPDATE projects SET mtime = ?, scanned_at = ?, "
+                       f"{', '.join(c + ' = ?' for c in _PROJECT_COLUMNS)} WHERE id = ?",
+                       (project['mtime'], time.time(), *(setup.get(c) for c in _PROJECT_COLUMNS), pid))
+            variables = [(pid, None, name, parse_quantity(value), value) for name, value in project['variables'].items()]
+            variables += [(pid, vid, name, parse_quantity(value), value)
+                          for vid, values in project['variations'].items() for name, value in values.items()]
+            db.executemany("INSERT INTO variables VALUES (?, ?, ?, ?, ?)", variables)
+            db.executemany(f"INSERT INTO mesh_stats VALUES (?, ?, {', '.join('?' * len(_MESH_COLUMNS))})",
+                           [(pid, m['variation'], *(m[c] for c in _MESH_COLUMNS)) for m in project['mesh']])
+            for (vid, sid), solve in project['solves'].items():
+                profile = solve.get('profile', {})
+                conv = solve.get('convergence', {'converged': None, 'passes': []})
+                last = conv['passes'][-1] if conv['passes'] else (None, None, None)
+                db.execute(f"INSERT INTO solves VALUES (?, ?, ?, {', '.join('?' * len(_SOLVE_COLUMNS))}, ?, ?, ?, ?)",
+                           (pid, vid, sid, *(profile.get(c) for c in _SOLVE_COLUMNS),
+                            conv['converged'], len(conv['passes']) or None, last[1], last[2]))
+                db.executemany("INSERT INTO passes VALUES (?, ?, ?, ?, ?, ?)",
+                               [(pid, vid, sid) + p for p in conv['passes']])
+
+    def forget_missing(self):
+        """
+        Remove do índice os projetos cujo `.aedt` não existe mais.
+        """
+        gone = [(pid,) for pid, path in self.db.execute("SELECT id, path FROM projects")
+                if not os.path.exists(path)]
+        with self.db:
+            for table in ('variables', 'mesh_stats', 'solves', 'passes'):
+                self.db.executemany(f"DELETE FROM {table} WHERE project_id = ?", gone)
+            self.db.executemany("DELETE FROM projects WHERE id = ?", gone)
+        return len(gone)
+
+    def solve_table(self, variables=()):
+        """
+        Uma linha por solve com o setup do projeto, o custo, a malha final e
+        as `variables` pedidas (valor da variação, ou o nominal do .aedt).
+        """
+        rows = self.db.execute(
+            "SELECT s.project_id, s.variation, p.path, p.n_ports, p.n_sections, p.adapt_freq_hz, p.max_passes, "
+            "p.max_delta_s, p.sweep_type, p.sweep_points, s.elapsed_s, s.adaptive_s, s.sweep_s, s.memory_mb, "
+            "s.converged, s.passes, s.final_tets, s.final_delta_s, s.max_tets, s.matrix_size, "
+            "(SELECT q.tets FROM passes q WHERE q.project_id = s.project_id AND q.variation IS s.variation "
+            "AND q.setup IS s.setup ORDER BY q.pass_no LIMIT 1) "
+            "FROM solves s JOIN projects p ON p.id = s.project_id ORDER BY p.path, s.variation").fetchall()
+        names = ('project_id', 'variation', 'path', 'n_ports', 'n_sections', 'adapt_freq_hz', 'max_passes',
+                 'max_delta_s', 'sweep_type', 'sweep_points', 'elapsed_s', 'adaptive_s', 'sweep_s', 'memory_mb',
+                 'converged', 'passes', 'final_tets', 'final_delta_s', 'max_tets', 'matrix_size', 'first_tets')
+        table = [dict(zip(names, r)) for r in rows]
+        for row in table:
+            for name in variables:
+                value = self.db.execute(
+                    "SELECT value FROM variables WHERE project_id = ? AND name = ? "
+                    "AND (variation = ? OR variation IS NULL) ORDER BY variation IS NULL LIMIT 1",
+                    (row['project_id'], name, row['variation'])).fetchone()
+                row[name] = value[0] if value else None
+        return table
+
+    def correlate(self, variables, metrics=('elapsed_s', 'final_tets', 'passes', 'memory_mb')):
+        """
+        Correlação de Pearson entre variáveis de projeto e métricas de custo,
+        usando os solves em que ambas existem.
+        """
+        table = self.solve_table(variables)
+        out = {}
+        for name in variables:
+            for metric in metrics:
+                pairs = np.asarray([(r[name], r[metric]) for r in table
+                                    if r[name] is not None and r[metric] is not None], dtype=float)
+                if len(pairs) < 3 or np.ptp(pairs[:, 0]) == 0 or np.ptp(pairs[:, 1]) == 0:
+                    out[(name, metric)] = None
+                else:
+                    out[(name, metric)] = float(np.corrcoef(pairs.T)[0, 1])
+        return out
+
+
+def user_data_dir(*parts):
+    """
+    Diretório de estado da ferramenta fora das pastas de projetos
+    (%LOCALAPPDATA%\\coax_divider no Windows, $XDG_CACHE_HOME/coax_divider ou
+    ~/.cache/coax_divider nos demais), criado se preciso.
+    """
+    root = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+    path = os.path.join(root or os.path.join(os.path.expanduser("~"), ".cache"), "coax_divider", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def default_index_path(directory):
+    """
+    Índice padrão de `directory`: um arquivo por diretório de projetos em
+    `user_data_dir()`, fora da pasta varrida (e da importação em lote).
+    """
+    digest = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()[:12]
+    return os.path.join(user_data_dir(), f"results_index_{digest}.sqlite")
+
+
+def crawl(directory, db_path=None, workers=None, force=False):
+    """
+    Indexa todos os `.aedt` de `directory` em `db_path` (padrão:
+    `default_index_path(directory)`). Os projetos cujo mtime não mudou
+    desde a última varredura são pulados; os demais são lidos em paralelo
+    (`workers` processos) e gravados por esta thread, que é a única a
+    escrever no banco.
+
+    Retorna {'scanned', 'skipped', 'removed', 'elapsed_s'}.
+    """
+    t0 = time.perf_counter()
+    directory = os.path.abspath(directory)
+    db_path = db_path or default_index_path(directory)
+    index = ResultsIndex(db_path)
+    try:
+        known = index.mtimes()
+        found = sorted(glob.glob(os.path.join(directory, "*.aedt")))
+        pending = [p for p in found if force or known.get(p) != _project_mtime(p)]
+        if workers == 1 or len(pending) < 2:
+            for project in map(scan_project, pending):
+                index.store(project)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for project in pool.map(scan_project, pending):
+                    index.store(project)
+        return {'scanned': len(pending), 'skipped': len(found) - len(pending),
+                'removed': index.forget_missing(), 'elapsed_s': time.perf_counter() - t0}
+    finally:
+        index.close()
+
+
+_LIGHT_MM_HZ = 299792458e3
+COST_FEATURES = ('n_ports', 'n_sections', 'max_passes', 'log_sweep_points', 'electrical_length')
+
+
+def job_features(n_ports, n_sections, max_passes, sweep_points, comp_total_mm, freq_hz):
+    """
+    Atributos de um job usados pelo `CostModel`: topologia, setup e
+    comprimento elétrico do divisor na frequência de adaptação.
+    """
+    return {
+        'n_ports': n_ports, 'n_sections': n_sections, 'max_passes': max_passes,
+        'log_sweep_points': np.log(max(sweep_points or 1, 1)),
+        'electrical_length': comp_total_mm * freq_hz / _LIGHT_MM_HZ,
+    }
+
+
+def _row_features(row):
+    if None in (row.get('comp_total'), row.get('adapt_freq_hz'), row.get('max_passes')):
+        return None
+    return job_features(row['n_ports'], row['n_sections'], row['max_passes'], row['sweep_points'],
+                        row['comp_total'], row['adapt_freq_hz'])
+
+
+class CostModel:
+    """
+    Regressão log-linear (mínimos quadrados com regularização leve) de uma
+    métrica de custo (`elapsed_s`, `final_tets`, `memory_mb`...) sobre
+    `COST_FEATURES`. `predict` devolve a estimativa e `spread` o fator
+    multiplicativo típico do erro (exp do desvio dos resíduos).
+    """
+
+    def __init__(self, target, coef, mean, scale, spread, samples):
+        self.target = target
+        self.coef = coef
+        self.mean = mean
+        self.scale = scale
+        self.spread = spread
+        self.samples = samples
+
+    @classmethod
+    def fit(cls, table, target='elapsed_s', ridge=1e-2):
+        rows = [(_row_features(r), r[target]) for r in table if r.get(target)]
+        rows = [(f, y) for f, y in rows if f is not None]
+        if not rows:
+            raise ValueError(f"Nenhum solve com '{target}' e atributos completos no índice.")
+        X = np.asarray([[f[k] for k in COST_FEATURES] for f, _ in rows], dtype=float)
+        y = np.log(np.asarray([y for _, y in rows], dtype=float))
+        mean, scale = X.mean(axis=0), X.std(axis=0)
+        scale[scale == 0] = 1.0
+        A = np.hstack([np.ones((len(X), 1)), (X - mean) / scale])
+        # Atributos constantes no histórico ficam com peso ~0 pela regularização
+        penalty = ridge * np.eye(A.shape[1])
+        penalty[0, 0] = 0.0
+        coef = np.linalg.solve(A.T @ A + penalty, A.T @ y)
+        residual = y - A @ coef
+        spread = float(np.exp(residual.std())) if len(rows) > 1 else None
+        return cls(target, coef, mean, scale, spread, len(rows))
+
+    def predict(self, features):
+        x = (np.asarray([features[k] for k in COST_FEATURES], dtype=float) - self.mean) / self.scale
+        return float(np.exp(self.coef[0] + x @ self.coef[1:]))
+
+
+def fit_cost_model(db_path, target='elapsed_s'):
+    """
+    Ajusta um `CostModel` com os solves do índice em `db_path`.
+    """
+    index = ResultsIndex(db_path)
+    try:
+        return CostModel.fit(index.solve_table(('comp_total',)), target)
+    finally:
+        index.close()
+
+
+# --------------------------------------------------------------------
+# 3. Setup adaptativo a partir do histórico
+# --------------------------------------------------------------------
+DEFAULT_SETUP = {'MaximumPasses': 8, 'MaxDeltaS': 0.02, 'sweep_type': "Fast"}
+ADVISOR_NEIGHBOURS = 5
+PASS_MARGIN = 2                 # passes além do máximo usado pelos vizinhos
+MIN_PASSES, MAX_PASSES = 5, 20
+HARD_PASS_BONUS = 4             # vizinhos que não convergiram: limite maior
+SEED_GROWTH = 1.8               # crescimento de malha que justifica semear
+LAMBDA_TARGET = 0.3333          # alvo de lambda-refine padrão do HFSS
+MIN_LAMBDA_TARGET = 0.15
+FAST_SWEEP_MAX_TETS = 150000    # acima disso o Fast sweep (ALPS) fica caro
+
+
+_SHARED_INDEXES = {}
+_SHARED_INDEXES_LOCK = threading.Lock()
+
+
+def shared_index(db_path):
+    """
+    `ResultsIndex` de `db_path` aberto uma vez por processo e reutilizado
+    pelas consultas seguintes (uma por exportação em `advise_setup`). Use-o
+    sob `index.lock`; não o feche.
+    """
+    key = os.path.abspath(db_path)
+    with _SHARED_INDEXES_LOCK:
+        if key not in _SHARED_INDEXES:
+            _SHARED_INDEXES[key] = ResultsIndex(db_path, shared=True)
+        return _SHARED_INDEXES[key]
+
+
+def geometry_signature(variables, freq_hz):
+    """
+    Vetor adimensional de uma geometria: diâmetros das seções relativos ao
+    tubo, comprimento elétrico e esbeltez. `variables` são as variáveis do
+    projeto (números em mm ou textos como '12.5mm').
+    """
+    values = {k: v if isinstance(v, (int, float)) else parse_quantity(v) for k, v in variables.items()}
+    sections = sorted((k for k in values if re.fullmatch(r"dia_sc\d+", k)), key=lambda k: int(k[6:]))
+    tube, length = values.get('dia_int_tubo'), values.get('comp_total')
+    if not tube or not length or any(values[k] is None for k in sections):
+        return None
+    return np.asarray([values[k] / tube for k in sections] + [length * freq_hz / _LIGHT_MM_HZ, tube / length])
+
+
+def similar_solves(table, n_ports, n_sections, signature, k=ADVISOR_NEIGHBOURS):
+    """
+    Os `k` solves de `table` (ver `ResultsIndex.solve_table`) com a mesma
+    topologia e assinatura geométrica mais próxima de `signature`.
+    """
+    candidates = []
+    for row in table:
+        if row['n_ports'] != n_ports or row['n_sections'] != n_sections or not row['passes']:
+            continue
+        other = geometry_signature({k: v for k, v in row.items() if k.startswith(('dia_', 'comp_'))},
+                                   row['adapt_freq_hz'] or 0.0)
+        if other is None or other.shape != signature.shape:
+            continue
+        # Distância relativa: cada componente pesa pela sua escala
+        candidates.append((float(np.linalg.norm((other - signature) / np.maximum(np.abs(signature), 1e-9))), row))
+    candidates.sort(key=lambda c: c[0])
+    return [row for _, row in candidates[:k]]
+
+
+def advise_setup(db_path, variables, n_ports, freq_hz, default=DEFAULT_SETUP):
+    """
+    Setup1/Sweep1 para um novo design a partir dos solves semelhantes em
+    `db_path`:
+
+    - `MaximumPasses`: passes usados pelos vizinhos mais uma margem; se
+      algum não convergiu, o limite dele mais `HARD_PASS_BONUS`.
+    - Semeadura: se a malha dos vizinhos cresceu mais que `SEED_GROWTH`
+      durante a adaptação, o lambda-refine inicial é apertado para começar
+      perto da malha final (tetraedros ~ 1/alvo³), poupando passes.
+    - `sweep_type`: Fast até `FAST_SWEEP_MAX_TETS` na malha final esperada,
+      Interpolating acima.
+
+    `MaxDeltaS` fica no valor de `default`: a precisão não é negociada.
+    Sem histórico devolve `default`. A chave 'basis' lista os projetos usados.
+    """
+    advice = dict(default, basis=[])
+    signature = geometry_signature(variables, freq_hz)
+    if signature is None or not db_path or not os.path.exists(db_path):
+        return advice
+    n_sections = sum(1 for k in variables if re.fullmatch(r"dia_sc\d+", k))
+    index = shared_index(db_path)
+    names = ['comp_total', 'dia_int_tubo'] + [f"dia_sc{i + 1}" for i in range(n_sections)]
+    with index.lock:
+        table = index.solve_table(names)
+    neighbours = similar_solves(table, n_ports, n_sections, signature)
+    if not neighbours:
+        return advice
+
+    converged = [r for r in neighbours if r['converged']]
+    passes = max(r['passes'] for r in neighbours)
+    if len(converged) < len(neighbours):
+        limit = max(r['max_passes'] or default['MaximumPasses'] for r in neighbours) + HARD_PASS_BONUS
+    else:
+        limit = passes + PASS_MARGIN
+    advice['MaximumPasses'] = int(min(max(limit, MIN_PASSES), MAX_PASSES))
+
+    growth = np.median([r['final_tets'] / r['first_tets'] for r in neighbours
+                        if r['final_tets'] and r['first_tets']] or [1.0])
+    if growth > SEED_GROWTH and passes > 2:
+        advice['SetLambdaTarget'] = True
+        advice['Target'] = round(max(LAMBDA_TARGET / growth ** (1.0 / 3.0), MIN_LAMBDA_TARGET), 4)
+
+    final_tets = np.median([r['final_tets'] for r in neighbours if r['final_tets']] or [0])
+    if final_tets > FAST_SWEEP_MAX_TETS:
+        advice['sweep_type'] = "Interpolating"
+    advice['basis'] = sorted({r['path'] for r in neighbours})
+    return advice
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "index":
+        # python aedt_logs.py index HFSS_Projects [banco.sqlite]
+        print(json.dumps(crawl(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None), indent=2))
+    else:
+        log = sys.argv[1] if len(sys.argv) > 1 else "batch.log"
+        print(json.dumps(summarize_sessions(BatchLogParser(log).sessions()), indent=2, default=str))
@@ -0,0 +1,261 @@
+"""
+Comparação numérica teoria x simulação em fluxo (sem GUI).
+
+A rede simulada é percorrida em trechos (do Touchstone com
+`iter_touchstone`, ou fatias de um array/memmap) e o modelo teórico é
+avaliado na grade de cada trecho. Só acumuladores pequenos ficam em
+memória, então varreduras de milhões de pontos cabem no mesmo orçamento
+de um trecho. Métricas:
+
+  - desvio máximo e RMS de |ΔS| e de ΔdB por entrada que a teoria define;
+  - pior perda de retorno por porta em cada faixa (simulada e teórica);
+  - desbalanço de amplitude (dB) e de fase (graus) entre as saídas S_k1;
+  - pior isolação entre saídas em cada faixa.
+"""
+import sys
+
+import numpy as np
+
+from rf_engine import SUBSTRATE_MATERIALS, divider_s_matrix, divider_s_parameters
+from touchstone_io import CHUNK_BYTES, iter_touchstone
+
+EPS = 1e-12
+CHUNK_POINTS = 1 << 16          # frequências por trecho em fontes na memória
+
+
+# --------------------------------------------------------------------
+# 1. Modelo teórico na grade simulada
+# --------------------------------------------------------------------
+def divider_theory(params, results):
+    """
+    (teoria, definida) do divisor projetado: `teoria(f_hz)` devolve a
+    matriz S (freq, porta, porta) do modelo analítico em qualquer grade e
+    `definida` é a máscara das entradas que o modelo calcula.
+    """
+    er = SUBSTRATE_MATERIALS[params['diel_material']][0]
+    n = params['n_outputs']
+    sec_len_m, len_inner_m = results['sec_len_mm'] / 1000.0, results['len_inner_mm'] / 1000.0
+
+    def theory(f_hz):
+        s_params = divider_s_parameters(results['z_sects'], sec_len_m, len_inner_m, er, n, f_hz)
+        return divider_s_matrix(s_params, n, len(f_hz))[0]
+
+    _, defined = divider_s_matrix(divider_s_parameters(results['z_sects'], sec_len_m, len_inner_m, er, n,
+                                                       np.zeros(0)), n, 0)
+    return theory, defined
+
+
+def interpolated_theory(f_hz, s, defined=None):
+    """
+    (teoria, definida) a partir de uma matriz teórica já amostrada
+    (f_hz, S (freq, porta, porta)): interpolação linear em parte real e
+    imaginária; fora da faixa amostrada o resultado é NaN e não entra nas
+    métricas. Sem `defined`, valem as entradas não nulas.
+    """
+    f_hz = np.asarray(f_hz, dtype=float)
+    s = np.asarray(s, dtype=complex)
+    if defined is None:
+        defined = np.any(s != 0, axis=0)
+
+    def theory(f):
+        f = np.asarray(f, dtype=float)
+        idx = np.clip(np.searchsorted(f_hz, f), 1, len(f_hz) - 1)
+        w = ((f - f_hz[idx - 1]) / (f_hz[idx] - f_hz[idx - 1]))[:, None, None]
+        out = s[idx - 1] * (1 - w) + s[idx] * w
+        out[(f < f_hz[0]) | (f > f_hz[-1])] = np.nan
+        return out
+
+    return theory, np.asarray(defined, dtype=bool)
+
+
+# --------------------------------------------------------------------
+# 2. Acumuladores
+# --------------------------------------------------------------------
+def _db(x):
+    return 20 * np.log10(np.maximum(np.abs(x), EPS))
+
+
+class _Stat:
+    """
+    Máximo, soma dos quadrados e contagem de um array de forma fixa,
+    ignorando NaN.
+    """
+
+    def __init__(self, shape=()):
+        self.max = np.full(shape, -np.inf)
+        self.sq = np.zeros(shape)
+        self.n = np.zeros(shape, dtype=np.int64)
+
+    def update(self, values):
+        valid = ~np.isnan(values)
+        self.max = np.maximum(self.max, np.max(np.where(valid, values, -np.inf), axis=0))
+        self.sq += np.sum(np.where(valid, values, 0.0) ** 2, axis=0)
+        self.n += np.sum(valid, axis=0)
+
+    def result(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {'max': np.where(self.n > 0, self.max, np.nan), 'rms': np.sqrt(self.sq / self.n)}
+
+
+class StreamingComparison:
+    """
+    Métricas teoria x simulação acumuladas trecho a trecho com `update`;
+    `result` pode ser chamado a qualquer momento. `bands` é uma lista de
+    (f_min, f_max) em Hz (padrão: a varredura inteira); a porta 0 é a
+    entrada e as demais são as saídas.
+    """
+
+    def __init__(self, n_ports, defined, bands=None):
+        self.n_ports = n_ports
+        self.defined = np.asarray(defined, dtype=bool)
+        if self.defined.shape != (n_ports, n_ports):
+            raise ValueError(f"Máscara da teoria {self.defined.shape} não corresponde a {n_ports} portas.")
+        self.bands = [tuple(b) for b in bands] if bands else [(-np.inf, np.inf)]
+        self.points, self.f_min, self.f_max = 0, np.inf, -np.inf
+        self.abs_dev = _Stat((n_ports, n_ports))
+        self.db_dev = _Stat((n_ports, n_ports))
+        self._bands = [{'points': 0, 'refl_sim': np.zeros(n_ports), 'refl_th': np.zeros(n_ports),
+                        'coupling': np.zeros((n_ports - 1, n_ports - 1)),
+                        'amplitude': _Stat(), 'phase': _Stat()} for _ in self.bands]
+
+    def update(self, f_hz, s_sim, s_th):
+        s_sim = np.asarray(s_sim)
+        if s_sim.shape[1:] != (self.n_ports, self.n_ports):
+            raise ValueError(f"Rede simulada com forma {s_sim.shape[1:]}, esperadas {self.n_ports} portas.")
+        if not len(f_hz):
+            return
+        self.points += len(f_hz)
+        self.f_min, self.f_max = min(self.f_min, f_hz[0]), max(self.f_max, f_hz[-1])
+
+        sim, th = s_sim[:, self.defined], s_th[:, self.defined]
+        for stat, dev in ((self.abs_dev, np.abs(sim - th)), (self.db_dev, np.abs(_db(sim) - _db(th)))):
+            full = np.full((len(f_hz), self.n_ports, self.n_ports), np.nan)
+            full[:, self.defined] = dev
+            stat.update(full)
+
+        for (lo, hi), acc in zip(self.bands, self._bands):
+            inside = (f_hz >= lo) & (f_hz <= hi)
+            if inside.any():
+                self._update_band(acc, s_sim[inside], s_th[inside])
+
+    def _update_band(self, acc, sim, th):
+        acc['points'] += len(sim)
+        acc['refl_sim'] = np.maximum(acc['refl_sim'], np.abs(np.diagonal(sim, axis1=1, axis2=2)).max(axis=0))
+        acc['refl_th'] = np.fmax(acc['refl_th'], np.fmax.reduce(np.abs(np.diagonal(th, axis1=1, axis2=2)), axis=0))
+
+        outputs = sim[:, 1:, 0]
+        if outputs.shape[1] > 1:
+            amp = _db(outputs)
+            acc['amplitude'].update(amp.max(axis=1) - amp.min(axis=1))
+            # Fase relativa ao fasor médio das saídas: imune ao salto de ±180°
+            ref = np.sum(outputs / np.maximum(np.abs(outputs), EPS), axis=1)
+            rel = np.angle(outputs * np.conj(ref)[:, None], deg=True)
+            acc['phase'].update(rel.max(axis=1) - rel.min(axis=1))
+
+        coupling = np.abs(sim[:, 1:, 1:]).max(axis=0)
+        np.fill_diagonal(coupling, 0.0)
+        acc['coupling'] = np.maximum(acc['coupling'], coupling)
+
+    def result(self):
+        """
+        Dict com 'points', 'f_min_hz', 'f_max_hz', 'deviation' (matrizes
+        (porta, porta) 'max_abs', 'rms_abs', 'max_db', 'rms_db'; NaN onde a
+        teoria não define) e 'bands' (uma entrada por faixa).
+        """
+        abs_dev, db_dev = self.abs_dev.result(), self.db_dev.result()
+        bands = []
+        for (lo, hi), acc in zip(self.bands, self._bands):
+            band = {'f_min_hz': lo, 'f_max_hz': hi, 'points': acc['points']}
+            if acc['points']:
+                th = np.where(np.diagonal(self.defined), -_db(acc['refl_th']), np.nan)
+                amp, phase = acc['amplitude'].result(), acc['phase'].result()
+                band.update({
+                    'worst_rl_db': -_db(acc['refl_sim']), 'worst_rl_db_theory': th,
+                    'amplitude_imbalance_db': {k: float(v) for k, v in amp.items()},
+                    'phase_imbalance_deg': {k: float(v) for k, v in phase.items()},
+                })
+                if self.n_ports > 2:
+                    i, j = np.unravel_index(np.argmax(acc['coupling']), acc['coupling'].shape)
+                    band['worst_isolation_db'] = float(-_db(acc['coupling'][i, j]))
+                    band['worst_isolation_ports'] = (int(i) + 2, int(j) + 2)
+            bands.append(band)
+        return {
+            'points': self.points, 'f_min_hz': float(self.f_min), 'f_max_hz': float(self.f_max),
+            'deviation': {'max_abs': abs_dev['max'], 'rms_abs': abs_dev['rms'],
+                          'max_db': db_dev['max'], 'rms_db': db_dev['rms']},
+            'bands': bands,
+        }
+
+
+# --------------------------------------------------------------------
+# 3. Fontes da rede simulada
+# --------------------------------------------------------------------
+def compare_chunks(chunks, theory, defined, bands=None):
+    """
+    Consome trechos (f_hz, S (freq, porta, porta)) e devolve
+    `StreamingComparison.result()`.
+    """
+    comparison = None
+    for f_hz, s in chunks:
+        if comparison is None:
+            comparison = StreamingComparison(s.shape[1], defined, bands)
+        f_hz = np.asarray(f_hz, dtype=float)
+        comparison.update(f_hz, s, theory(f_hz))
+    if comparison is None:
+        raise ValueError("Rede simulada sem pontos de frequência.")
+    return comparison.result()
+
+
+def compare_touchstone(path, theory, defined, bands=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Compara um Touchstone lido em blocos de `chunk_bytes`, sem carregá-lo.
+    """
+    return compare_chunks(iter_touchstone(path, chunk_bytes), theory, defined, bands)
+
+
+def compare_arrays(f_hz, s, theory, defined, bands=None, chunk_points=CHUNK_POINTS):
+    """
+    Compara uma rede já na memória ou mapeada do disco (`Network.s`,
+    `open_sidecar`, `ProjectFile.sim`) em fatias de `chunk_points`.
+    """
+    chunks = ((f_hz[i:i + chunk_points], np.asarray(s[i:i + chunk_points]))
+              for i in range(0, len(f_hz), chunk_points))
+    return compare_chunks(chunks, theory, defined, bands)
+
+
+def format_summary(result, port_names=None):
+    """
+    Resumo em texto de `result` (uma linha por faixa mais os piores desvios).
+    """
+    dev = result['deviation']
+    n = dev['max_db'].shape[0]
+    names = port_names or [str(i + 1) for i in range(n)]
+    lines = [f"{result['points']} pontos, {result['f_min_hz'] / 1e6:.3f}–{result['f_max_hz'] / 1e6:.3f} MHz"]
+    for i, j in zip(*np.nonzero(~np.isnan(dev['max_db']))):
+        if i >= j:
+            lines.append(f"  S{names[i]}{names[j]}: |ΔS| máx {dev['max_abs'][i, j]:.4f} (RMS {dev['rms_abs'][i, j]:.4f}), "
+                         f"ΔdB máx {dev['max_db'][i, j]:.2f} (RMS {dev['rms_db'][i, j]:.2f})")
+    for band in result['bands']:
+        if not band['points']:
+            continue
+        label = ("faixa inteira" if np.isinf(band['f_min_hz'])
+                 else f"{band['f_min_hz'] / 1e6:.1f}–{band['f_max_hz'] / 1e6:.1f} MHz")
+        text = (f"  {label}: RL pior {band['worst_rl_db'][0]:.2f} dB "
+                f"(teoria {band['worst_rl_db_theory'][0]:.2f} dB), "
+                f"desbalanço {band['amplitude_imbalance_db']['max']:.3f} dB / "
+                f"{band['phase_imbalance_deg']['max']:.2f}°")
+        if 'worst_isolation_db' in band:
+            i, j = band['worst_isolation_ports']
+            text += f", isolação pior {band['worst_isolation_db']:.2f} dB (S{i}{j})"
+        lines.append(text)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python comparison.py simulado.sNp projeto.coaxproj [f_min_MHz f_max_MHz]
+    from project_file import load_project_file
+
+    project = load_project_file(sys.argv[2])
+    bands = [(float(sys.argv[3]) * 1e6, float(sys.argv[4]) * 1e6)] if len(sys.argv) > 4 else None
+    print(format_summary(compare_touchstone(sys.argv[1], *divider_theory(project.params, project.results),
+                                            bands=bands)))
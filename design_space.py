@@ -0,0 +1,331 @@
+"""
+Exploração do espaço de projeto do divisor coaxial (sem GUI).
+
+Avalia todas as combinações de parâmetros num pool de processos, em blocos,
+gravando as métricas direto em arrays de memória compartilhada, e extrai a
+frente de Pareto entre perda de retorno e tamanho mecânico. O mesmo pool
+roda a análise de rendimento por Monte Carlo e os inícios do otimizador.
+
+Em Windows os chamadores devem estar sob `if __name__ == "__main__":`,
+como em qualquer uso de `ProcessPoolExecutor`.
+"""
+from statistics import NormalDist
+
+import numpy as np
+from scipy.optimize import minimize
+
+from rf_engine import (
+    SUBSTRATE_MATERIALS, coax_impedance, coaxial_geometry, material_permittivity, transformer_s11,
+    transformer_s11_gradient
+)
+from shared_pool import run_chunked
+
+# --------------------------------------------------------------------
+# 1. Métricas
+# --------------------------------------------------------------------
+EPS = 1e-12
+Z0 = 50.0
+
+
+def worst_s11_db(z_sects, sec_len_m, freqs_hz, n_outputs, er):
+    """
+    Pior |S11| em dB dentro da banda (quanto menor, melhor) para um lote de
+    projetos com o mesmo número de seções, na carga real z0/N
+    (`transformer_s11`). `z_sects` tem forma (d, n).
+    """
+    s11 = transformer_s11(z_sects, sec_len_m, freqs_hz, n_outputs, er)
+    return 20 * np.log10(np.maximum(np.abs(s11).max(axis=-1), EPS))
+
+
+def worst_s11_db_grouped(z_sects, sec_len_m, freqs_hz, n_sections, n_outputs, er):
+    """
+    `worst_s11_db` para projetos com `n_sections` diferentes: agrupa por
+    número de seções e usa as colunas válidas de `z_sects` (preenchido com NaN).
+    """
+    worst = np.empty(len(n_sections))
+    for n in np.unique(n_sections):
+        idx = np.flatnonzero(n_sections == n)
+        worst[idx] = worst_s11_db(z_sects[idx, :n], sec_len_m[idx, None], freqs_hz, n_outputs[idx], er[idx])
+    return worst
+
+
+def pareto_front(costs):
+    """
+    Índices das linhas não dominadas de `costs` (n_pontos, n_objetivos),
+    todos os objetivos minimizados. Linhas com NaN são ignoradas.
+
+    Os candidatos são ordenados pela soma dos custos normalizados para que os
+    pontos mais fortes eliminem cedo a maior parte do conjunto.
+    """
+    costs = np.asarray(costs, dtype=float)
+    idx = np.flatnonzero(~np.isnan(costs).any(axis=1))
+    c = costs[idx]
+    if not len(c):
+        return idx
+    span = np.ptp(c, axis=0)
+    order = np.argsort(((c - c.min(axis=0)) / np.where(span > 0, span, 1)).sum(axis=1), kind='stable')
+    idx, c = idx[order], c[order]
+
+    i = 0
+    while i < len(c):
+        # Fica quem é estritamente melhor em algum objetivo (ou empata em todos)
+        keep = np.any(c < c[i], axis=1) | np.all(c == c[i], axis=1)
+        idx, c = idx[keep], c[keep]
+        i = np.count_nonzero(keep[:i]) + 1
+    return np.sort(idx)
+
+
+# --------------------------------------------------------------------
+# 2. Varredura do espaço de projeto
+# --------------------------------------------------------------------
+SWEEP_AXES = ('n_sections', 'n_outputs', 'd_ext', 'wall_thick', 'diel_material')
+
+
+def _decode(grid, start, stop):
+    """
+    Parâmetros dos candidatos [start, stop) a partir dos índices planos da grade.
+    """
+    shape = tuple(len(grid[k]) for k in SWEEP_AXES)
+    pos = np.unravel_index(np.arange(start, stop), shape)
+    return {k: np.asarray(grid[k], dtype=object if k == 'diel_material' else None)[i]
+            for k, i in zip(SWEEP_AXES, pos)}
+
+
+def _sweep_task(start, stop, ctx):
+    c = _decode(ctx['grid'], start, stop)
+    er = material_permittivity(c['diel_material'])
+    n_sections = c['n_sections'].astype(int)
+    n_outputs = c['n_outputs'].astype(int)
+    geo = coaxial_geometry(ctx['f_start'], ctx['f_stop'], c['d_ext'], c['wall_thick'], n_sections, n_outputs, er)
+    freqs_hz = np.linspace(ctx['f_start'], ctx['f_stop'], ctx['n_freqs']) * 1e6
+
+    worst = worst_s11_db_grouped(geo['z_sects'], geo['sec_len_mm'] / 1000.0, freqs_hz, n_sections, n_outputs, er)
+    worst[geo['d_int_tube'] <= 0] = np.nan
+    return np.column_stack([worst, geo['len_outer_mm']])
+
+
+def design_space_sweep(f_start, f_stop, n_sections, n_outputs, d_ext, wall_thick, materials=None,
+                       n_freqs=101, workers=None, chunk_size=8192):
+    """
+    Avalia todas as combinações de `n_sections`, `n_outputs`, `d_ext`,
+    `wall_thick` e `materials` (chaves de `SUBSTRATE_MATERIALS`) na banda
+    [f_start, f_stop] MHz.
+
+    Retorna um dict com os parâmetros de cada candidato, 'worst_s11_db'
+    (pior |S11| na banda), 'len_outer_mm' e 'pareto', os índices da frente
+    de Pareto de (pior |S11|, comprimento total, diâmetro externo).
+    Combinações com parede maior que o raio ficam com NaN e fora da frente.
+    """
+    grid = {
+        'n_sections': np.atleast_1d(n_sections).astype(int),
+        'n_outputs': np.atleast_1d(n_outputs).astype(int),
+        'd_ext': np.atleast_1d(d_ext).astype(float),
+        'wall_thick': np.atleast_1d(wall_thick).astype(float),
+        'diel_material': list(materials or SUBSTRATE_MATERIALS),
+    }
+    n_items = int(np.prod([len(grid[k]) for k in SWEEP_AXES]))
+    context = {'grid': grid, 'f_start': float(f_start), 'f_stop': float(f_stop), 'n_freqs': n_freqs}
+
+    metrics = run_chunked(_sweep_task, n_items, context, 2, workers=workers, chunk_size=chunk_size)
+    result = _decode(grid, 0, n_items)
+    result['worst_s11_db'] = metrics[:, 0]
+    result['len_outer_mm'] = metrics[:, 1]
+    result['pareto'] = pareto_front(np.column_stack([metrics, result['d_ext']]))
+    return result
+
+
+# --------------------------------------------------------------------
+# 3. Rendimento de fabricação (Monte Carlo)
+# --------------------------------------------------------------------
+def _perturb(rng, nominal, tolerance, shape):
+    """
+    Amostras de `nominal` com a tolerância ('normal', desvio padrão) ou
+    ('uniform', meia largura), em mm; `None` mantém o valor nominal.
+    """
+    nominal = np.broadcast_to(np.asarray(nominal, dtype=float), shape)
+    if tolerance is None:
+        return nominal
+    dist, value = tolerance
+    if dist == 'normal':
+        return nominal + rng.normal(0.0, value, shape)
+    if dist == 'uniform':
+        return nominal + rng.uniform(-value, value, shape)
+    raise ValueError(f"Distribuição de tolerância desconhecida: {dist}")
+
+
+def _yield_task(start, stop, ctx):
+    n_sec = len(ctx['main_diams'])
+    tol = ctx['tolerances']
+    freqs_hz = ctx['freqs_mhz'] * 1e6
+    rows = []
+    for chunk in range(start, stop):
+        n = min(ctx['chunk_size'], ctx['n_samples'] - chunk * ctx['chunk_size'])
+        # Semente por bloco: o resultado não depende do número de processos
+        rng = np.random.default_rng(np.random.SeedSequence(ctx['seed'], spawn_key=(chunk,)))
+        diams = _perturb(rng, ctx['main_diams'], tol.get('main_diams'), (n, n_sec))
+        lens = _perturb(rng, ctx['sec_len_mm'], tol.get('sec_len_mm'), (n, n_sec))
+        tube = _perturb(rng, ctx['d_int_tube'], tol.get('d_int_tube'), (n, 1))
+
+        valid = np.all((diams > 0) & (lens > 0) & (tube > diams), axis=1)
+        ratio = np.where(valid[:, None], tube / np.where(diams > 0, diams, 1.0), 2.0)
+        z = 59.952 / np.sqrt(ctx['er']) * np.log(ratio)
+        worst = worst_s11_db(z, lens / 1000.0, freqs_hz, ctx['n_outputs'], ctx['er'])
+
+        ok = valid & (worst <= ctx['spec_s11_db'])
+        w = worst[valid]
+        rows.append([ok.sum(), n, valid.sum(), w.sum(), (w ** 2).sum()])
+    return np.array(rows, dtype=float)
+
+
+def monte_carlo_yield(params, results, tolerances, spec_s11_db=-20.0, n_samples=100_000, freqs_mhz=None,
+                      confidence=0.95, seed=0, workers=None, chunk_size=4096):
+    """
+    Rendimento de fabricação de um projeto (`params`/`results` de
+    `CoaxialCalculator`) sob tolerâncias de usinagem.
+
+    `tolerances` mapeia 'main_diams', 'sec_len_mm' e/ou 'd_int_tube' para
+    ('normal', σ_mm) ou ('uniform', ±mm); diâmetros e comprimentos de cada
+    seção variam de forma independente. Cada amostra é aprovada se o pior
+    |S11| na banda, na carga real z0/N, ficar abaixo de `spec_s11_db`.
+
+    As amostras são geradas e avaliadas em blocos de `chunk_size` (vetorizados,
+    um bloco por tarefa do pool), e só os totais de cada bloco voltam: a
+    memória não cresce com `n_samples`. Retorna o rendimento com o intervalo
+    de confiança de Wilson.
+    """
+    if freqs_mhz is None:
+        freqs_mhz = np.linspace(params['f_start'], params['f_stop'], 101)
+    n_chunks = -(-n_samples // chunk_size)
+    context = {
+        'main_diams': np.asarray(results['main_diams'], dtype=float),
+        'sec_len_mm': results['sec_len_mm'],
+        'd_int_tube': results['d_int_tube'],
+        'er': SUBSTRATE_MATERIALS[params['diel_material']][0],
+        'n_outputs': params['n_outputs'],
+        'freqs_mhz': np.asarray(freqs_mhz, dtype=float),
+        'tolerances': dict(tolerances),
+        'spec_s11_db': spec_s11_db,
+        'n_samples': n_samples,
+        'chunk_size': chunk_size,
+        'seed': seed,
+    }
+    totals = run_chunked(_yield_task, n_chunks, context, 5, workers=workers, chunk_size=1).sum(axis=0)
+    n_pass, n_total, n_valid, w_sum, w_sq = totals
+
+    p_hat = n_pass / n_total
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    center = (p_hat + z ** 2 / (2 * n_total)) / (1 + z ** 2 / n_total)
+    half = z * np.sqrt(p_hat * (1 - p_hat) / n_total + z ** 2 / (4 * n_total ** 2)) / (1 + z ** 2 / n_total)
+    mean = w_sum / n_valid if n_valid else np.nan
+    return {
+        'yield': float(p_hat),
+        'ci_low': float(max(min(center - half, p_hat), 0.0)),
+        'ci_high': float(min(max(center + half, p_hat), 1.0)),
+        'confidence': confidence,
+        'n_samples': int(n_total),
+        'n_pass': int(n_pass),
+        'n_invalid': int(n_total - n_valid),
+        'worst_s11_db_mean': float(mean),
+        'worst_s11_db_std': float(np.sqrt(max(w_sq / n_valid - mean ** 2, 0.0))) if n_valid else np.nan,
+    }
+
+
+# --------------------------------------------------------------------
+# 4. Otimização do perfil de impedâncias (multi-start)
+# --------------------------------------------------------------------
+def _pnorm_objective(x, ctx):
+    """
+    Norma-p de |S11| na banda (aproximação suave do pior caso) e gradiente
+    em relação às variáveis normalizadas x = [z_1..z_n, L] em [0, 1].
+    """
+    lo, hi = ctx['lower'], ctx['upper']
+    v = lo + x * (hi - lo)
+    z, sec_len_mm = v[:-1], v[-1]
+    s11, ds_dz, ds_dl = transformer_s11_gradient(z, sec_len_mm / 1000.0, ctx['freqs_hz'], ctx['n_outputs'],
+                                                 ctx['er'])
+
+    p = ctx['p_norm']
+    mag = np.abs(s11)
+    s_max = max(mag.max(), EPS)
+    u = mag / s_max
+    q = np.mean(u ** (2 * p))
+    value = s_max * q ** (1 / (2 * p))
+
+    weight = q ** (1 / (2 * p) - 1) * u ** (2 * p - 2) / s_max
+    g_z = np.mean(weight * np.real(np.conj(s11) * ds_dz), axis=-1)
+    g_l = np.mean(weight * np.real(np.conj(s11) * ds_dl.sum(axis=0))) / 1000.0
+    return value, np.append(g_z, g_l) * (hi - lo)
+
+
+def _optimize_task(start, stop, ctx):
+    rows = []
+    n = len(ctx['z_start'])
+    for i in range(start, stop):
+        x0 = (np.append(ctx['z_start'], ctx['sec_len_mm']) - ctx['lower']) / (ctx['upper'] - ctx['lower'])
+        if i > 0:
+            # O início 0 é o perfil de fórmula fechada; os demais são sorteados
+            rng = np.random.default_rng(np.random.SeedSequence(ctx['seed'], spawn_key=(i,)))
+            x0 = rng.uniform(0.0, 1.0, n + 1)
+            x0[:n] = np.sort(x0[:n])[::-1]
+        x0 = np.clip(x0, 0.0, 1.0)
+        res = minimize(_pnorm_objective, x0, args=(ctx,), jac=True, method='L-BFGS-B',
+                       bounds=[(0.0, 1.0)] * (n + 1), options={'maxiter': ctx['maxiter']})
+        v = ctx['lower'] + res.x * (ctx['upper'] - ctx['lower'])
+        s11 = transformer_s11(v[:-1], v[-1] / 1000.0, ctx['freqs_hz'], ctx['n_outputs'], ctx['er'])
+        rows.append(np.concatenate([[20 * np.log10(max(np.abs(s11).max(), EPS))], v]))
+    return np.array(rows)
+
+
+def optimize_profile(params, results, n_starts=16, freqs_mhz=None, diam_bounds=None, length_range=(0.7, 1.3),
+                     p_norm=32, maxiter=200, seed=0, workers=None):
+    """
+    Ajusta as impedâncias das seções e o comprimento comum de seção para
+    minimizar o pior |S11| na banda, com o transformador terminado na carga
+    real z0/N (`transformer_s11`).
+
+    Cada início roda um L-BFGS-B sobre a norma-p de |S11| com o gradiente
+    adjunto de `transformer_s11_gradient`; os inícios rodam em paralelo
+    (`run_chunked`) e o melhor pior caso vence. As impedâncias ficam entre
+    z0/N e z0 e dentro de `diam_bounds` (padrão 5% a 95% de `d_int_tube`);
+    o comprimento de seção em `length_range` vezes o nominal. O comprimento
+    é único para todas as seções porque o modelo HFSS usa um só
+    `sec_len_mm`.
+
+    Retorna um dict no formato de `results` (aceito por
+    `generate_hfss_model`), mais 'worst_s11_db'.
+    """
+    er = SUBSTRATE_MATERIALS[params['diel_material']][0]
+    d_tube = results['d_int_tube']
+    d_min, d_max = diam_bounds or (0.05 * d_tube, 0.95 * d_tube)
+    n = len(results['main_diams'])
+    if freqs_mhz is None:
+        freqs_mhz = np.linspace(params['f_start'], params['f_stop'], 201)
+    z_lo = max(coax_impedance(d_tube, d_max, er), Z0 / params['n_outputs'])
+    z_hi = min(coax_impedance(d_tube, d_min, er), Z0)
+
+    context = {
+        'z_start': coax_impedance(d_tube, np.asarray(results['main_diams'], dtype=float), er),
+        'sec_len_mm': results['sec_len_mm'],
+        'lower': np.append(np.full(n, z_lo), length_range[0] * results['sec_len_mm']),
+        'upper': np.append(np.full(n, z_hi), length_range[1] * results['sec_len_mm']),
+        'freqs_hz': np.asarray(freqs_mhz, dtype=float) * 1e6,
+        'n_outputs': params['n_outputs'],
+        'er': er,
+        'p_norm': p_norm,
+        'maxiter': maxiter,
+        'seed': seed,
+    }
+    rows = run_chunked(_optimize_task, n_starts, context, n + 2, workers=workers, chunk_size=1)
+    best = rows[np.nanargmin(rows[:, 0])]
+    z_sects, sec_len = best[1:-1], best[-1]
+
+    design = dict(results)
+    design.update({
+        'sec_len_mm': float(sec_len),
+        'len_inner_mm': float(n * sec_len),
+        'len_outer_mm': float(n * sec_len * 1.05),
+        'main_diams': [float(d) for d in d_tube / np.exp(z_sects * np.sqrt(er) / 59.952)],
+        'z_sects': [float(z) for z in z_sects],
+        'worst_s11_db': float(best[0]),
+    })
+    return design
@@ -0,0 +1,703 @@
+"""
+Automação do AEDT/HFSS sem GUI.
+
+- Sessão persistente: um único processo do AEDT é iniciado e mantido vivo
+  via gRPC; os projetos e designs são entregues dentro do mesmo desktop, com
+  verificação de saúde e reconexão automática se o processo cair.
+- Fila de simulações: vários projetos .aedt resolvidos com limite de
+  soluções simultâneas e de núcleos, com estado persistente.
+- Índice espacial de faces para localizar portas sem varrer o modelo.
+- Cache de resultados por conteúdo: soluções repetidas reutilizam o Touchstone.
+- Journal de etapas para retomar exportações/soluções interrompidas.
+"""
+import glob
+import heapq
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+try:
+    from ansys.aedt.core import Desktop, Hfss
+
+    HFSS_AVAILABLE = True
+except ImportError:
+    Desktop = Hfss = None
+    HFSS_AVAILABLE = False
+
+
+# --------------------------------------------------------------------
+# 1. Sessão persistente do AEDT
+# --------------------------------------------------------------------
+class AedtSession:
+    """
+    Mantém um Electronics Desktop aberto entre exportações e simulações.
+
+    `design()` entrega um app Hfss no desktop compartilhado; os apps ficam
+    em cache por (projeto, design) até `max_open_projects`, então exportar e
+    depois simular o mesmo projeto não reabre nada. O acesso é serializado
+    por um lock porque a API do AEDT não é segura entre threads.
+    `desktop_cls`/`hfss_cls` permitem injetar um backend alternativo.
+    """
+
+    def __init__(self, version=None, non_graphical=False, port=0, max_open_projects=4,
+                 desktop_cls=None, hfss_cls=None):
+        self.version = version
+        self.non_graphical = non_graphical
+        self.port = port
+        self.max_open_projects = max_open_projects
+        self.desktop_cls = desktop_cls or Desktop
+        self.hfss_cls = hfss_cls or Hfss
+        self.startups = 0
+        self.reconnects = 0
+        self._desktop = None
+        self._apps = OrderedDict()
+        self._lock = threading.RLock()
+
+    # -- desktop -----------------------------------------------------
+    def is_alive(self):
+        """
+        Verificação de saúde: uma chamada gRPC barata ao desktop.
+        """
+        if self._desktop is None:
+            return False
+        try:
+            self._desktop.odesktop.GetVersion()
+            return True
+        except Exception:
+            return False
+
+    def ensure_alive(self):
+        with self._lock:
+            if self.is_alive():
+                return self._desktop
+            if self._desktop is not None:
+                self.reconnects += 1
+                self._apps.clear()
+                # Primeiro tenta reanexar ao mesmo processo/porta
+                try:
+                    self._desktop = self.desktop_cls(version=self.version, non_graphical=self.non_graphical,
+                                                     new_desktop=False, close_on_exit=False, port=self.port)
+                    if self.is_alive():
+                        return self._desktop
+                except Exception:
+                    traceback.print_exc()
+            return self._start()
+
+    def _start(self):
+        if self.desktop_cls is None:
+            raise RuntimeError("ansys-aedt-core não encontrado. Funcionalidades HFSS desativadas.")
+        self._desktop = self.desktop_cls(version=self.version, non_graphical=self.non_graphical,
+                                         new_desktop=True, close_on_exit=False, port=self.port)
+        self.port = getattr(self._desktop, 'port', self.port)
+        self.startups += 1
+        return self._desktop
+
+    # -- designs -----------------------------------------------------
+    @contextmanager
+    def design(self, project, design_name=None, solution_type="Modal"):
+        """
+        Entrega um app Hfss do projeto no desktop compartilhado; o projeto
+        continua aberto na saída para o próximo uso.
+        """
+        with self._lock:
+            yield self._app(project, design_name, solution_type)
+
+    def _app(self, project, design_name, solution_type):
+        self.ensure_alive()
+        key = (str(project), design_name)
+        app = self._apps.get(key)
+        if app is not None:
+            self._apps.move_to_end(key)
+            return app
+
+        app = self.hfss_cls(project=str(project), design=design_name, solution_type=solution_type,
+                            version=self.version, non_graphical=self.non_graphical, new_desktop=False,
+                            close_on_exit=False, port=self.port)
+        self._apps[key] = app
+        while len(self._apps) > self.max_open_projects:
+            _, old = self._apps.popitem(last=False)
+            self._close_app(old)
+        return app
+
+    def release_project(self, project):
+        """
+        Fecha (salvando) todos os designs abertos de `project`.
+        """
+        with self._lock:
+            for key in [k for k in self._apps if k[0] == str(project)]:
+                self._close_app(self._apps.pop(key))
+
+    @staticmethod
+    def _close_app(app):
+        try:
+            app.close_project(save=True)
+        except Exception:
+            traceback.print_exc()
+
+    def close(self):
+        """
+        Fecha os projetos e encerra o desktop.
+        """
+        with self._lock:
+            for app in self._apps.values():
+                self._close_app(app)
+            self._apps.clear()
+            if self._desktop is not None:
+                try:
+                    self._desktop.release_desktop(close_projects=True, close_on_exit=True)
+                except Exception:
+                    traceback.print_exc()
+                self._desktop = None
+
+    def stats(self):
+        return {'startups': self.startups, 'reconnects': self.reconnects, 'open_projects': len(self._apps),
+                'alive': self.is_alive()}
+
+
+_default_session = None
+_default_lock = threading.Lock()
+
+
+def get_session(**kwargs):
+    """
+    Sessão padrão do processo (criada no primeiro uso).
+    """
+    global _default_session
+    with _default_lock:
+        if _default_session is None:
+            _default_session = AedtSession(**kwargs)
+        return _default_session
+
+
+# --------------------------------------------------------------------
+# 2. Fila de simulações em lote
+# --------------------------------------------------------------------
+class LicenseUnavailable(RuntimeError):
+    """
+    O solver não conseguiu licença; o job volta para a fila.
+    """
+
+
+class BatchSolver:
+    """
+    Solver real: `ansysedt -ng -batchsolve` num processo separado por job,
+    o que permite várias soluções simultâneas.
+    """
+
+    def __init__(self, ansysedt=None, extra_args=(), timeout=None):
+        self.ansysedt = ansysedt or self._find_ansysedt()
+        self.extra_args = list(extra_args)
+        self.timeout = timeout
+
+    @staticmethod
+    def _find_ansysedt():
+        roots = sorted(k for k in os.environ if k.startswith("ANSYSEM_ROOT"))
+        if not roots:
+            raise RuntimeError("Instalação do AEDT não encontrada (variável ANSYSEM_ROOT*).")
+        exe = "ansysedt.exe" if os.name == "nt" else "ansysedt"
+        return os.path.join(os.environ[roots[-1]], exe)
+
+    def __call__(self, project, cores):
+        cmd = [self.ansysedt, "-ng", "-batchsolve", "-machinelist", f"numcores={cores}",
+               *self.extra_args, str(project)]
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+        output = proc.stdout + proc.stderr
+        if "license" in output.lower() and proc.returncode != 0:
+            raise LicenseUnavailable(output.strip()[-500:])
+        if proc.returncode != 0:
+            raise RuntimeError(f"batchsolve terminou com código {proc.returncode}: {output.strip()[-500:]}")
+        return None
+
+
+class MockSolver:
+    """
+    Solver local para testes e benchmarks da fila: dorme um tempo
+    proporcional ao trabalho dividido pelos núcleos e pode simular falta de
+    licença com `license_failures` tentativas iniciais por projeto.
+    """
+
+    def __init__(self, work_s=1.0, license_failures=0):
+        self.work_s = work_s
+        self.license_failures = license_failures
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, project, cores):
+        with self._lock:
+            n = self._attempts[project] = self._attempts.get(project, 0) + 1
+        if n <= self.license_failures:
+            raise LicenseUnavailable("mock: nenhuma licença HFSS disponível")
+        time.sleep(self.work_s / max(cores, 1))
+        return None
+
+
+class JobQueue:
+    """
+    Fila de prioridade de projetos .aedt com limite de soluções simultâneas.
+
+    - `max_concurrent`: número de soluções em paralelo (licenças de solver);
+    - `cores_per_solve` / `total_cores`: um job só inicia se houver núcleos
+      livres no orçamento (licenças HPC); pedidos acima de `total_cores`
+      são limitados a ele;
+    - prioridade menor roda antes; empates em ordem de submissão;
+    - o estado é gravado em JSON (escrita atômica) a cada mudança, e jobs
+      que estavam 'running' quando o processo morreu voltam para 'queued';
+    - `LicenseUnavailable` do solver recoloca o job na fila após
+      `license_retry_s`, sem contar como falha.
+    """
+
+    def __init__(self, state_path, solver=None, max_concurrent=1, cores_per_solve=4, total_cores=None,
+                 max_attempts=2, license_retry_s=60.0):
+        self.state_path = state_path
+        self.solver = solver or BatchSolver()
+        self.max_concurrent = max_concurrent
+        self.cores_per_solve = cores_per_solve
+        self.total_cores = total_cores or max_concurrent * cores_per_solve
+        self.max_attempts = max_attempts
+        self.license_retry_s = license_retry_s
+        self.jobs = {}
+        self._heap = []
+        self._seq = 0
+        self._running = 0
+        self._cores_in_use = 0
+        self._cond = threading.Condition()
+        self._load()
+
+    # -- persistência ------------------------------------------------
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, 'r') as f:
+            state = json.load(f)
+        for job in state.get('jobs', []):
+            if job['status'] == 'running':
+                job['status'] = 'queued'
+            job['cores'] = self._clamp_cores(job['cores'])
+            job.setdefault('meta', {})
+            self.jobs[job['id']] = job
+            self._seq = max(self._seq, job['seq'] + 1)
+            if job['status'] == 'queued':
+                heapq.heappush(self._heap, (job['priority'], job['seq'], job['id']))
+
+    def _save(self):
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'jobs': sorted(self.jobs.values(), key=lambda j: j['seq'])}, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    # -- submissão ---------------------------------------------------
+    def _clamp_cores(self, cores):
+        # Um job maior que o orçamento nunca caberia e `run` esperaria para sempre
+        return min(max(int(cores or self.cores_per_solve), 1), self.total_cores)
+
+    def submit(self, project, priority=0, cores=None, meta=None):
+        """
+        Enfileira um projeto; projetos já presentes e não concluídos são
+        ignorados. `meta` (serializável em JSON) fica no job para o solver.
+        """
+        project = os.path.abspath(project)
+        with self._cond:
+            for job in self.jobs.values():
+                if job['project'] == project and job['status'] in ('queued', 'running'):
+                    return job['id']
+            job_id = f"job{self._seq:05d}"
+            self.jobs[job_id] = {
+                'id': job_id, 'seq': self._seq, 'project': project, 'priority': priority,
+                'cores': self._clamp_cores(cores), 'status': 'queued', 'attempts': 0,
+                'submitted': time.time(), 'started': None, 'finished': None, 'not_before': 0.0,
+                'error': None, 'meta': meta or {},
+            }
+            heapq.heappush(self._heap, (priority, self._seq, job_id))
+            self._seq += 1
+            self._save()
+            self._cond.notify_all()
+            return job_id
+
+    def submit_dir(self, directory, pattern="*.aedt", priority=0):
+        return [self.submit(path, priority) for path in sorted(glob.glob(os.path.join(directory, pattern)))]
+
+    # -- execução ----------------------------------------------------
+    def _next_ready(self):
+        """
+        Retira o job de maior prioridade que cabe nos núcleos livres e cujo
+        tempo de espera por licença já passou.
+        """
+        now = time.time()
+        skipped, chosen = [], None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            job = self.jobs[item[2]]
+            if job['not_before'] <= now and self._cores_in_use + job['cores'] <= self.total_cores:
+                chosen = job
+                break
+            skipped.append(item)
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return chosen
+
+    def _run_job(self, job):
+        error, status = None, 'done'
+        try:
+            self.solver(job['project'], job['cores'])
+        except LicenseUnavailable as e:
+            error, status = str(e), 'license'
+        except Exception as e:
+            error, status = str(e), 'failed'
+            traceback.print_exc()
+
+        with self._cond:
+            self._running -= 1
+            self._cores_in_use -= job['cores']
+            job['error'] = error
+            job['finished'] = time.time()
+            if status == 'license':
+                job['attempts'] -= 1
+                job['not_before'] = time.time() + self.license_retry_s
+            if status in ('license', 'failed') and job['attempts'] < self.max_attempts:
+                job['status'] = 'queued'
+                heapq.heappush(self._heap, (job['priority'], job['seq'], job['id']))
+            else:
+                job['status'] = status
+            self._save()
+            self._cond.notify_all()
+
+    def run(self, poll_s=1.0, forever=False):
+        """
+        Processa a fila até esvaziar (bloqueante). Com `forever` continua
+        esperando novos jobs (para uma thread de fundo da interface).
+        """
+        with self._cond:
+            while forever or self._heap or self._running:
+                job = self._next_ready() if self._running < self.max_concurrent else None
+                if job is None:
+                    self._cond.wait(timeout=poll_s)
+                    continue
+                job['status'] = 'running'
+                job['attempts'] += 1
+                job['started'] = time.time()
+                self._running += 1
+                self._cores_in_use += job['cores']
+                self._save()
+                threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+
+    def running_job(self, project):
+        """
+        Job em execução do projeto `project`, ou None.
+        """
+        project = os.path.abspath(project)
+        with self._cond:
+            return next((j for j in self.jobs.values() if j['project'] == project and j['status'] == 'running'),
+                        None)
+
+    def stats(self):
+        with self._cond:
+            jobs = list(self.jobs.values())
+        done = [j for j in jobs if j['status'] == 'done']
+        counts = {}
+        for j in jobs:
+            counts[j['status']] = counts.get(j['status'], 0) + 1
+        result = {'counts': counts}
+        if done:
+            t0 = min(j['started'] for j in done)
+            t1 = max(j['finished'] for j in done)
+            result['wall_s'] = t1 - t0
+            result['throughput_per_h'] = len(done) / max(t1 - t0, 1e-9) * 3600
+            result['mean_solve_s'] = sum(j['finished'] - j['started'] for j in done) / len(done)
+        return result
+
+
+# --------------------------------------------------------------------
+# 3. Índice espacial de faces
+# --------------------------------------------------------------------
+class FaceIndex:
+    """
+    Centros das faces de um objeto lidos uma única vez e guardados numa
+    k-d tree; cada busca por posição é O(log n) e não toca o AEDT.
+
+    Cada `face.center` é uma chamada gRPC. A varredura ingênua (percorrer
+    `obj.faces` lendo o centro até achar a face) custa até faces × buscas
+    chamadas; `report()` compara as chamadas feitas com uma estimativa do
+    que essa varredura teria feito nas buscas de `nearest` (listagem mais
+    os centros até a face achada, ou todos se nenhuma confere). A
+    estimativa não é medida: supõe a mesma ordem de faces a cada listagem.
+    """
+
+    def __init__(self, faces):
+        faces = list(faces)
+        self.faces = []
+        centers = []
+        self.api_calls = 1  # a própria listagem de faces
+        for face in faces:
+            center = face.center
+            self.api_calls += 1
+            # Faces curvas não têm centro definido
+            if center and len(center) == 3:
+                self.faces.append(face)
+                centers.append([float(c) for c in center])
+        self.n_faces = self.api_calls - 1
+        self._positions = {id(face): i for i, face in enumerate(faces)}
+        self.centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+        self._tree = cKDTree(self.centers) if len(self.centers) else None
+        self.lookups = 0
+        self.naive_calls = 0
+
+    def nearest(self, point, tol=1e-3):
+        """
+        Face cujo centro está a menos de `tol` de `point`, ou None.
+        """
+        self.lookups += 1
+        self.naive_calls += 1  # `obj.faces` relido a cada busca
+        if self._tree is None:
+            self.naive_calls += self.n_faces
+            return None
+        dist, i = self._tree.query(np.asarray(point, dtype=float))
+        if dist >= tol:
+            self.naive_calls += self.n_faces
+            return None
+        face = self.faces[i]
+        self.naive_calls += self._positions[id(face)] + 1
+        return face
+
+    def on_plane(self, axis, value, tol=1e-6):
+        """
+        Faces cujo centro tem a coordenada `axis` (0, 1, 2) igual a `value`.
+        """
+        hits = np.flatnonzero(np.abs(self.centers[:, axis] - value) < tol)
+        return [self.faces[i] for i in hits]
+
+    def on_half_plane(self, theta_rad, tol_rad=1e-4, min_radius=1e-6):
+        """
+        Faces cujo centro está no semiplano que contém o eixo Z e faz o
+        ângulo `theta_rad` com +X (paredes de corte de um setor).
+        """
+        x, y = self.centers[:, 0], self.centers[:, 1]
+        diff = np.angle(np.exp(1j * (np.arctan2(y, x) - theta_rad)))
+        hits = np.flatnonzero((np.hypot(x, y) > min_radius) & (np.abs(diff) < tol_rad))
+        return [self.faces[i] for i in hits]
+
+    def report(self):
+        return {
+            'faces': self.n_faces,
+            'lookups': self.lookups,
+            'api_calls': self.api_calls,
+            'naive_api_calls_estimate': self.naive_calls,
+            'api_calls_saved_estimate': self.naive_calls - self.api_calls,
+        }
+
+
+# --------------------------------------------------------------------
+# 4. Cache de resultados por conteúdo
+# --------------------------------------------------------------------
+def _atomic_copy(src, dest):
+    """
+    Copia `src` para `dest` via arquivo temporário no mesmo diretório e
+    `os.replace`: uma cópia interrompida nunca deixa `dest` truncado. O
+    temporário (`.<nome>.<pid>.tmp`) não casa com os padrões `*.sNp`.
+    """
+    tmp = os.path.join(os.path.dirname(dest) or ".", f".{os.path.basename(dest)}.{os.getpid()}.tmp")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ResultStore:
+    """
+    Touchstones resolvidos guardados por chave de conteúdo (hash da
+    geometria, material, setup e sweep; ver `rf_engine.canonical_key`).
+
+    Layout: `<root>/<kk>/<chave>.sNp` mais `<chave>.json` com metadados.
+    As gravações são atômicas (cópia temporária + `os.replace`), então um
+    processo interrompido nunca deixa uma entrada parcial.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    def _dir(self, key):
+        return os.path.join(self.root, key[:2])
+
+    def lookup(self, key):
+        """
+        Caminho do Touchstone guardado para `key`, ou None.
+        """
+        found = glob.glob(os.path.join(self._dir(key), f"{key}.s*p"))
+        if found:
+            self.hits += 1
+            return found[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, touchstone, meta=None):
+        """
+        Copia `touchstone` para o cache e devolve o caminho guardado.
+        """
+        os.makedirs(self._dir(key), exist_ok=True)
+        ext = os.path.splitext(touchstone)[1]
+        dest = os.path.join(self._dir(key), f"{key}{ext}")
+        _atomic_copy(touchstone, dest)
+        info = {'key': key, 'source': os.path.abspath(touchstone), 'stored': time.time(), **(meta or {})}
+        meta_path = os.path.join(self._dir(key), f"{key}.json")
+        with open(f"{meta_path}.tmp", 'w') as f:
+            json.dump(info, f, indent=2)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        return dest
+
+    def materialize(self, key, dest_stem):
+        """
+        Copia a entrada de `key` para `dest_stem` + extensão .sNp (ex.: ao
+        lado do projeto, com o nome esperado pela importação). Devolve o
+        caminho criado ou None.
+        """
+        cached = self.lookup(key)
+        if cached is None:
+            return None
+        dest = dest_stem + os.path.splitext(cached)[1]
+        if os.path.abspath(cached) != os.path.abspath(dest):
+            _atomic_copy(cached, dest)
+        return dest
+
+    def stats(self):
+        entries = len(glob.glob(os.path.join(self.root, "*", "*.s*p")))
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses}
+
+
+# --------------------------------------------------------------------
+# 5. Journal de etapas (checkpoint/retomada)
+# --------------------------------------------------------------------
+PIPELINE_STAGES = ("geometry", "materials", "ports", "setup", "solve", "export")
+
+
+def _pid_alive(pid):
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == "nt":
+        # Sem psutil não há teste seguro no Windows (os.kill encerraria o processo)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class StageJournal:
+    """
+    Registro das etapas concluídas de um projeto em `<projeto>.journal.json`.
+
+    Cada etapa só é marcada depois que o projeto foi salvo, então uma
+    execução interrompida retoma a partir da última etapa boa. `key`
+    identifica os parâmetros: se mudar, o journal é reiniciado.
+    """
+
+    def __init__(self, project_path, key=None):
+        self.project_path = project_path
+        self.path = f"{os.path.splitext(project_path)[0]}.journal.json"
+        self.state = {'project': project_path, 'key': key, 'owner_pid': None, 'stages': {}}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            if key is None or state.get('key') == key:
+                self.state = state
+        self.state['key'] = key if key is not None else self.state.get('key')
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def claim(self):
+        """
+        Marca este processo como dono do projeto (usado na limpeza de locks).
+        """
+        self.state['owner_pid'] = os.getpid()
+        self._save()
+
+    def done(self, stage):
+        return stage in self.state['stages']
+
+    def complete(self, stage, **info):
+        self.state['stages'][stage] = {'finished': time.time(), **info}
+        self._save()
+
+    def info(self, stage):
+        return self.state['stages'].get(stage)
+
+    def reset(self, from_stage=PIPELINE_STAGES[0]):
+        """
+        Esquece `from_stage` e todas as etapas seguintes.
+        """
+        for stage in PIPELINE_STAGES[PIPELINE_STAGES.index(from_stage):]:
+            self.state['stages'].pop(stage, None)
+        self._save()
+
+    @property
+    def last_stage(self):
+        done = [s for s in PIPELINE_STAGES if s in self.state['stages']]
+        return done[-1] if done else None
+
+    @property
+    def finished(self):
+        return all(s in self.state['stages'] for s in PIPELINE_STAGES)
+
+
+def clean_stale_locks(project_path, owner_pid=None):
+    """
+    Remove o `.lock` deixado por uma execução que morreu e devolve os
+    arquivos removidos.
+
+    O lock só é considerado abandonado se há um processo dono registrado no
+    journal e ele comprovadamente não existe mais. Sem dono registrado (um
+    projeto sem journal pode estar aberto em outro AEDT) nada é tocado. O
+    `.auto` (recuperação de falhas do AEDT) nunca é removido aqui; veja
+    `recovery_file`.
+    """
+    if owner_pid is None or _pid_alive(owner_pid):
+        return []
+    path = f"{project_path}.lock"
+    if not os.path.exists(path):
+        return []
+    os.remove(path)
+    return [path]
+
+
+def recovery_file(project_path):
+    """
+    Caminho do `.auto` de recuperação do AEDT para `project_path`, se existir.
+    Cabe ao usuário decidir entre ele e o último estado salvo.
+    """
+    path = f"{project_path}.auto"
+    return path if os.path.exists(path) else None
+
+
+def incomplete_projects(directory):
+    """
+    Projetos de `directory` com journal e etapas pendentes.
+    """
+    pending = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.journal.json"))):
+        with open(path, 'r') as f:
+            state = json.load(f)
+        if not all(s in state.get('stages', {}) for s in PIPELINE_STAGES):
+            pending.append(state['project'])
+    return pending
@@ -0,0 +1,565 @@
+"""
+Backend AEDT simulado para benchmarks e regressão sem Ansys.
+
+`MockDesktop` e `MockHfss` substituem `Desktop`/`Hfss` do ansys-aedt-core
+na `AedtSession` (`desktop_cls`/`hfss_cls`). Toda chamada à API é
+registrada e pode dormir `latency_s` para simular o custo de uma ida e
+volta gRPC; a "solução" escreve um Touchstone sintético calculado pelo
+modelo analítico (`rf_engine`) a partir das variáveis do projeto.
+"""
+import csv
+import functools
+import json
+import math
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+from skrf.frequency import Frequency
+from skrf.network import Network
+
+from rf_engine import coax_impedance, divider_s21, transformer_s11
+from touchstone_io import load_network
+
+_UNITS = re.compile(r"(?<=[\d.])\s*(mm|deg|GHz|MHz)\b")
+_NAMES = re.compile(r"[A-Za-z_]\w*")
+
+
+# --------------------------------------------------------------------
+# 1. Registro de chamadas
+# --------------------------------------------------------------------
+class CallRecorder:
+    """
+    Lista de chamadas (nome, args, kwargs) com latência simulada por chamada.
+    """
+
+    def __init__(self, latency_s=0.0):
+        self.latency_s = latency_s
+        self.calls = []
+
+    def __call__(self, call, /, *args, **kwargs):
+        self.calls.append((call, args, kwargs))
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def counts(self):
+        return Counter(name for name, _, _ in self.calls)
+
+
+# --------------------------------------------------------------------
+# 2. Objetos do modelador
+# --------------------------------------------------------------------
+class MockFace:
+    def __init__(self, record, face_id, center):
+        self._record = record
+        self.id = face_id
+        self._center = center
+
+    @property
+    def center(self):
+        self._record("face.center", self.id)
+        # Faces curvas: a API devolve False
+        return list(self._center) if self._center is not None else False
+
+
+class MockObject3d:
+    def __init__(self, modeler, name, kind, **meta):
+        self._modeler = modeler
+        self._name = name
+        self.kind = kind
+        self.meta = meta
+        self._material = "vacuum"
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._modeler._record("object.name", self._name, value)
+        self._modeler._rename(self._name, value)
+        self._name = value
+
+    @property
+    def material_name(self):
+        return self._material
+
+    @material_name.setter
+    def material_name(self, value):
+        self._modeler._record("object.material_name", self._name, value)
+        self._material = value
+
+    @property
+    def faces(self):
+        self._modeler._record("object.faces", self._name)
+        return self._modeler._hfss._faces_for(self)
+
+
+class MockModeler:
+    def __init__(self, hfss):
+        self._hfss = hfss
+        self._record = hfss._record
+        self.objects = {}
+        self.booleans = 0
+
+    def _add(self, name, kind, **meta):
+        obj = MockObject3d(self, name, kind, **meta)
+        self.objects[name] = obj
+        return obj
+
+    def _rename(self, old, new):
+        self.objects[new] = self.objects.pop(old)
+
+    @property
+    def object_names(self):
+        self._record("modeler.object_names")
+        return list(self.objects)
+
+    def __getitem__(self, name):
+        self._record("modeler.__getitem__", name)
+        return self.objects[name]
+
+    def create_cylinder(self, orientation, origin, radius, height, num_sides=0, name=None, material=None, **kwargs):
+        self._record("modeler.create_cylinder", orientation, origin, radius, height, name=name)
+        return self._add(name or f"Cylinder{len(self.objects) + 1}", "cylinder", orientation=orientation)
+
+    def create_polyline(self, points, close_surface=False, cover_surface=False, name=None, **kwargs):
+        self._record("modeler.create_polyline", points, name=name)
+        return self._add(name or f"Polyline{len(self.objects) + 1}", "polyline", points=points)
+
+    def sweep_around_axis(self, assignment, axis, sweep_angle=360, draft_angle=0, number_of_segments=0):
+        self._record("modeler.sweep_around_axis", assignment, axis, sweep_angle)
+        obj = assignment if isinstance(assignment, MockObject3d) else self.objects[assignment]
+        obj.meta['sweep_angle'] = float(sweep_angle)
+        if sweep_angle < 360:
+            self._hfss._sector_n = int(round(360.0 / sweep_angle))
+        return True
+
+    def duplicate_around_axis(self, assignment, axis="Z", angle=90, clones=2, **kwargs):
+        self._record("modeler.duplicate_around_axis", assignment, axis, angle, clones)
+        names = []
+        for name in assignment:
+            for i in range(1, clones):
+                names.append(self._add(f"{name}_{i}", self.objects[name].kind).name)
+        self._hfss._n_modeled_outputs = clones
+        return True, names
+
+    def unite(self, assignment, **kwargs):
+        self._record("modeler.unite", list(assignment))
+        self.booleans += 1
+        keep = assignment[0]
+        for name in assignment[1:]:
+            self.objects.pop(name, None)
+        return keep
+
+    def delete(self, assignment=None):
+        self._record("modeler.delete", assignment)
+        for name in list(assignment or []):
+            self.objects.pop(name, None)
+        return True
+
+    def rotate(self, assignment, axis, angle=90.0, units="deg"):
+        self._record("modeler.rotate", assignment, axis, angle)
+        if self._hfss._sector_n is None and angle > 0:
+            # `_cut_sector` começa girando meio setor
+            self._hfss._sector_n = int(round(180.0 / angle))
+        return True
+
+    def split(self, assignment, plane=None, sides="Both", **kwargs):
+        self._record("modeler.split", assignment, plane, sides)
+        self.booleans += 1
+        return assignment
+
+
+# --------------------------------------------------------------------
+# 3. Variáveis, materiais, setups
+# --------------------------------------------------------------------
+class MockVariableManager:
+    def __init__(self, hfss):
+        self._record = hfss._record
+        self.variables = {}
+
+    def __setitem__(self, name, value):
+        self._record("variable_manager.__setitem__", name, value)
+        self.variables[name] = str(value)
+
+    def __getitem__(self, name):
+        self._record("variable_manager.__getitem__", name)
+        return self.variables[name]
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    def evaluate(self, name, overrides=None):
+        """
+        Valor numérico (mm, graus) de uma variável, resolvendo expressões.
+        """
+        values = {**self.variables, **(overrides or {})}
+        cache = {}
+
+        def ev(var):
+            if var not in cache:
+                expr = _UNITS.sub("", values[var])
+                names = {n: ev(n) for n in _NAMES.findall(expr) if n in values}
+                cache[var] = float(eval(expr, {"__builtins__": {}}, names))
+            return cache[var]
+
+        return ev(name)
+
+
+class MockMaterial:
+    def __init__(self, name):
+        self.name = name
+        self.permittivity = 1.0
+        self.dielectric_loss_tangent = 0.0
+
+
+class MockMaterials:
+    def __init__(self, hfss):
+        self._record = hfss._record
+        self.materials = {"vacuum": MockMaterial("vacuum"), "pec": MockMaterial("pec")}
+
+    def __contains__(self, name):
+        self._record("materials.__contains__", name)
+        return name in self.materials
+
+    def add_material(self, name):
+        self._record("materials.add_material", name)
+        self.materials[name] = MockMaterial(name)
+        return self.materials[name]
+
+
+class MockBoundary:
+    def __init__(self, record, name):
+        self._record = record
+        self.name = name
+        self.props = {}
+
+    def update(self):
+        self._record("boundary.update", self.name)
+        return True
+
+
+class MockSetup:
+    def __init__(self, hfss, name):
+        self._hfss = hfss
+        self.name = name
+        self.props = {}
+        self.sweeps = {}
+
+    def create_frequency_sweep(self, unit="GHz", start_frequency=1.0, stop_frequency=10.0, num_of_freq_points=None,
+                               name=None, sweep_type="Interpolating", save_fields=True, **kwargs):
+        self._hfss._record("setup.create_frequency_sweep", start_frequency, stop_frequency, num_of_freq_points)
+        scale = {"GHz": 1e9, "MHz": 1e6, "kHz": 1e3, "Hz": 1.0}[unit]
+        self.sweeps[name] = np.linspace(start_frequency, stop_frequency, num_of_freq_points or 401) * scale
+        return self.sweeps[name]
+
+    def create_single_point_sweep(self, unit="GHz", freq=1.0, name=None, save_single_field=True, **kwargs):
+        self._hfss._record("setup.create_single_point_sweep", len(np.atleast_1d(freq)))
+        scale = {"GHz": 1e9, "MHz": 1e6, "kHz": 1e3, "Hz": 1.0}[unit]
+        self.sweeps[name] = np.atleast_1d(np.asarray(freq, dtype=float)) * scale
+        return self.sweeps[name]
+
+
+class MockParametrics:
+    def __init__(self, hfss):
+        self._record = hfss._record
+        self.setups = {}
+
+    def add_from_file(self, input_file, name=None):
+        self._record("parametrics.add_from_file", input_file, name)
+        with open(input_file, newline='') as f:
+            self.setups[name] = [{k: v for k, v in row.items() if k != "*"} for row in csv.DictReader(f)]
+        return True
+
+
+# --------------------------------------------------------------------
+# 4. Desktop e app HFSS simulados
+# --------------------------------------------------------------------
+class _MockODesktop:
+    def __init__(self, desktop):
+        self._desktop = desktop
+
+    def GetVersion(self):
+        self._desktop._record("odesktop.GetVersion")
+        if not self._desktop.alive:
+            raise RuntimeError("mock: desktop encerrado")
+        return "2025.1-mock"
+
+
+class MockDesktop:
+    """
+    Substituto de `Desktop`; `kill()` simula a queda do processo.
+    """
+
+    def __init__(self, version=None, non_graphical=True, new_desktop=True, close_on_exit=True, port=0,
+                 latency_s=0.0, **kwargs):
+        self._record = CallRecorder(latency_s)
+        self._record("Desktop", version=version, new_desktop=new_desktop, port=port)
+        self.port = port or 50051
+        self.alive = True
+        self.odesktop = _MockODesktop(self)
+
+    def kill(self):
+        self.alive = False
+
+    def release_desktop(self, close_projects=True, close_on_exit=True):
+        self._record("release_desktop")
+        self.alive = False
+        return True
+
+
+class MockHfss:
+    """
+    Substituto de `Hfss`: registra chamadas (`calls`, `call_counts()`),
+    dorme `latency_s` por chamada e `solve_time_s` por análise, e exporta
+    Touchstones sintéticos do modelo analítico.
+
+    Para configurar a latência numa `AedtSession` use `MockHfss.factory()`.
+    `save_project()` grava o estado do modelo em JSON no arquivo do projeto
+    e um novo `MockHfss` do mesmo projeto o recarrega, como o AEDT faria.
+    """
+
+    def __init__(self, project=None, design=None, solution_type="Modal", version=None, non_graphical=True,
+                 new_desktop=False, close_on_exit=False, port=0, latency_s=0.0, solve_time_s=0.0, **kwargs):
+        self._record = CallRecorder(latency_s)
+        self._record("Hfss", project=project, design=design, solution_type=solution_type)
+        self.project_file = project
+        self.design_name = design
+        self.solve_time_s = solve_time_s
+        self.modeler = MockModeler(self)
+        self.variable_manager = MockVariableManager(self)
+        self.materials = MockMaterials(self)
+        self.parametrics = MockParametrics(self)
+        self.setups = {}
+        self.boundaries = []
+        self._ports = []
+        self._n_modeled_outputs = 1
+        self._sector_n = None
+        self.solved = set()
+        if project and os.path.exists(project) and os.path.getsize(project):
+            self._load(project)
+
+    @classmethod
+    def factory(cls, **kwargs):
+        return functools.partial(cls, **kwargs)
+
+    @property
+    def calls(self):
+        return self._record.calls
+
+    def call_counts(self):
+        return self._record.counts()
+
+    @property
+    def ports(self):
+        self._record("ports")
+        return [name for name, _ in self._ports]
+
+    # -- portas e contornos ------------------------------------------
+    def wave_port(self, assignment=None, name=None, renormalize=True, impedance=50, **kwargs):
+        self._record("wave_port", assignment, name=name, impedance=impedance)
+        self._ports.append((name, float(impedance)))
+        return MockBoundary(self._record, name)
+
+    def assign_master_slave(self, independent, dependent, u_start, u_end, reverse_v=False, **kwargs):
+        self._record("assign_master_slave", independent, dependent)
+        bnd = MockBoundary(self._record, "Master1"), MockBoundary(self._record, "Slave1")
+        self.boundaries.extend(bnd)
+        return bnd
+
+    # -- setup e solução ---------------------------------------------
+    def create_setup(self, name="MySetupAuto", **kwargs):
+        self._record("create_setup", name)
+        self.setups[name] = MockSetup(self, name)
+        return self.setups[name]
+
+    def analyze_setup(self, name=None, cores=4, tasks=1, **kwargs):
+        self._record("analyze_setup", name, cores=cores, tasks=tasks)
+        n_runs = len(self.parametrics.setups.get(name, [None]))
+        if self.solve_time_s:
+            time.sleep(self.solve_time_s * n_runs / max(tasks, 1))
+        self.solved.add(name)
+        return True
+
+    def export_touchstone(self, setup=None, sweep=None, output_file=None, variations=None, variations_value=None,
+                          **kwargs):
+        self._record("export_touchstone", setup, sweep, output_file)
+        overrides = dict(zip(variations or [], variations_value or []))
+        net = self.synthetic_network(setup, sweep, overrides)
+        if output_file is None or os.path.isdir(output_file):
+            stem = os.path.splitext(os.path.basename(self.project_file or "Project"))[0]
+            output_file = os.path.join(output_file or tempfile.gettempdir(), f"{stem}.s{net.nports}p")
+        net.write_touchstone(output_file)
+        return output_file
+
+    def save_project(self, *args, **kwargs):
+        self._record("save_project")
+        if self.project_file:
+            state = {
+                'variables': self.variable_manager.variables,
+                'objects': [(o.name, o.kind, o.material_name, o.meta) for o in self.modeler.objects.values()],
+                'materials': {m.name: m.permittivity for m in self.materials.materials.values()},
+                'ports': self._ports,
+                'sweeps': {name: {sw: list(f) for sw, f in setup.sweeps.items()} for name, setup in self.setups.items()},
+                'parametrics': self.parametrics.setups,
+                'sector_n': self._sector_n,
+                'n_modeled_outputs': self._n_modeled_outputs,
+                'solved': sorted(self.solved),
+            }
+            with open(self.project_file, 'w') as f:
+                json.dump(state, f)
+        return True
+
+    def _load(self, project):
+        with open(project, 'r') as f:
+            state = json.load(f)
+        self.variable_manager.variables.update(state['variables'])
+        for name, kind, material, meta in state['objects']:
+            self.modeler._add(name, kind, **meta)._material = material
+        for name, er in state['materials'].items():
+            self.materials.materials.setdefault(name, MockMaterial(name)).permittivity = er
+        self._ports = [tuple(port) for port in state['ports']]
+        for name, sweeps in state['sweeps'].items():
+            self.setups[name] = MockSetup(self, name)
+            self.setups[name].sweeps = {sw: np.asarray(f) for sw, f in sweeps.items()}
+        self.parametrics.setups = state['parametrics']
+        self._sector_n = state['sector_n']
+        self._n_modeled_outputs = state['n_modeled_outputs']
+        self.solved = set(state['solved'])
+
+    def close_project(self, name=None, save=True):
+        self._record("close_project", save=save)
+        return True
+
+    def release_desktop(self, close_projects=True, close_on_exit=True):
+        self._record("release_desktop")
+        return True
+
+    # -- modelo sintético --------------------------------------------
+    def _faces_for(self, obj):
+        """
+        Faces planas do dielétrico unido (entrada, topo, extremidades das
+        saídas e paredes do setor) mais faces curvas sem centro.
+        """
+        if not obj.name.startswith(("Diel_Principal", "Volume_Diel")):
+            return []
+        ev = self.variable_manager.evaluate
+        len_inner, len_outer = ev("comp_secoes"), ev("comp_total")
+        radius, stub = ev("dia_int_tubo") / 2, ev("comp_saida")
+        n = self._sector_n or self._n_modeled_outputs
+
+        centers = [None, (0.0, 0.0, len_outer)]
+        if self._sector_n:
+            half = math.pi / self._sector_n
+            r_c = 2 * radius * math.sin(half) / (3 * half)
+            centers.append((r_c, 0.0, 0.0))
+            for theta in (-half, half):
+                centers.append((radius / 2 * math.cos(theta), radius / 2 * math.sin(theta), len_outer / 2))
+            outputs = [0]
+        else:
+            centers.append((0.0, 0.0, 0.0))
+            outputs = range(n)
+        for k in outputs:
+            angle = 2 * math.pi * k / n
+            centers += [None, (stub * math.cos(angle), stub * math.sin(angle), len_inner)]
+        return [MockFace(self._record, 1000 + i, c) for i, c in enumerate(centers)]
+
+    def _diel_permittivity(self):
+        for obj in self.modeler.objects.values():
+            if obj.material_name in self.materials.materials and obj.material_name != "pec":
+                return self.materials.materials[obj.material_name].permittivity
+        return 1.0
+
+    def synthetic_network(self, setup="Setup1", sweep="Sweep1", overrides=None):
+        """
+        Rede do modelo analítico para as variáveis atuais (com `overrides`
+        de uma variação paramétrica). No modelo de setor devolve a solução
+        de 2 portas do modo azimutal dado por `fase_setor`.
+        """
+        ev = functools.partial(self.variable_manager.evaluate, overrides=overrides)
+        freqs_hz = self.setups[setup].sweeps[sweep]
+        er = self._diel_permittivity()
+        d_int = ev("dia_int_tubo")
+        n_sections = sum(1 for v in self.variable_manager.variables if re.fullmatch(r"dia_sc\d+", v))
+        z_sects = [coax_impedance(d_int, ev(f"dia_sc{i + 1}"), er) for i in range(n_sections)]
+        sec_len_m = ev("comp_sec") / 1000.0
+
+        n_out = self._sector_n or len(self._ports) - 1
+        s11 = transformer_s11(z_sects, sec_len_m, freqs_hz, n_out, er)
+        s21 = divider_s21(s11, n_out, ev("comp_secoes") / 1000.0, er, freqs_hz)
+        frequency = Frequency.from_f(freqs_hz, unit='Hz')
+
+        if self._sector_n:
+            m = int(round(ev("fase_setor") * n_out / 360.0)) if "fase_setor" in self.variable_manager else 0
+            s = np.zeros((len(freqs_hz), 2, 2), dtype=complex)
+            if m == 0:
+                s[:, 0, 0] = s11
+                s[:, 1, 0] = s[:, 0, 1] = np.sqrt(n_out) * s21
+            else:
+                s[:, 0, 0] = 1.0
+            s[:, 1, 1] = s11
+            return Network(frequency=frequency, s=s)
+
+        s = np.zeros((len(freqs_hz), n_out + 1, n_out + 1), dtype=complex)
+        s[:, 0, 0] = s11
+        s[:, 1:, 0] = s[:, 0, 1:] = s21[:, None]
+        for k in range(1, n_out + 1):
+            s[:, k, k] = s11
+        if n_out > 1:
+            s[:, 2, 1] = s[:, 1, 2] = 0.5
+        return Network(frequency=frequency, s=s)
+
+
+# --------------------------------------------------------------------
+# 5. Benchmark do pipeline exportar → resolver → importar
+# --------------------------------------------------------------------
+def benchmark_pipeline(params, workdir=None, latency_s=0.002, solve_time_s=0.0):
+    """
+    Executa `generate_hfss_model` → `run_hfss_simulation` → leitura do
+    Touchstone contra o backend simulado e devolve tempos por etapa,
+    contagem de chamadas à API e o desvio do S11 importado em relação ao
+    cálculo teórico.
+    """
+    import queue
+    import Calc_Div_EFTX as app
+    from hfss_automation import AedtSession
+
+    calc = app.CoaxialCalculator(dict(params))
+    calc.calculate()
+    geometry = calc.get_geometry_for_viewer()
+
+    session = AedtSession(desktop_cls=MockDesktop,
+                          hfss_cls=MockHfss.factory(latency_s=latency_s, solve_time_s=solve_time_s))
+    status = queue.Queue()
+    cwd = os.getcwd()
+    os.chdir(workdir or tempfile.mkdtemp(prefix="mock_aedt_"))
+    try:
+        t0 = time.perf_counter()
+        project = app.generate_hfss_model(geometry, status, session=session)
+        t1 = time.perf_counter()
+        touchstone = app.run_hfss_simulation(project, status, session=session)
+        t2 = time.perf_counter()
+        net = load_network(touchstone)
+        t3 = time.perf_counter()
+    finally:
+        os.chdir(cwd)
+
+    hfss = next(iter(session._apps.values()))
+    result = {
+        'build_s': t1 - t0,
+        'solve_s': t2 - t1,
+        'import_s': t3 - t2,
+        'api_calls': len(hfss.calls),
+        'call_counts': dict(hfss.call_counts()),
+        'booleans': hfss.modeler.booleans,
+        'touchstone': touchstone,
+        'messages': list(status.queue),
+    }
+    if len(net.f) == len(calc.frequencies) and np.allclose(net.f / 1e6, calc.frequencies):
+        result['max_s11_error'] = float(np.max(np.abs(net.s[:, 0, 0] - calc.s_params_th['S11'])))
+    session.close()
+    return result
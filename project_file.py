@@ -0,0 +1,190 @@
+"""
+Arquivo de projeto do divisor coaxial, formato 2 (sem GUI).
+
+Um único arquivo com um manifesto JSON (parâmetros, `results`, caminho do
+`.aedt` vinculado, setup HFSS, tempos e o índice dos blocos) seguido de
+blocos binários alinhados: frequências, S teórico e a rede simulada
+importada. Os blocos são abertos com `np.memmap`, então só as páginas
+usadas saem do disco. Arquivos do formato 1 (JSON só com `params`) ainda
+são lidos.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+# --------------------------------------------------------------------
+# 1. Gravação
+# --------------------------------------------------------------------
+PROJECT_MAGIC = b"COAXPRJ2"
+PROJECT_VERSION = 2
+PROJECT_SUFFIX = ".coaxproj"
+BLOCK_MIN_LEN = 64              # listas numéricas maiores que isso viram bloco
+_ALIGN = 64
+
+
+def _is_numeric_list(value):
+    return (isinstance(value, (list, tuple, np.ndarray)) and len(value) > BLOCK_MIN_LEN
+            and np.issubdtype(np.asarray(value).dtype, np.number))
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    return value
+
+
+def save_project_file(path, params, results, frequencies, s_params_th=None, sim=None, aedt_path=None,
+                      hfss_setup=None, timings=None):
+    """
+    Grava o projeto em `path` (atômico).
+
+    `frequencies` em MHz (grade teórica), `s_params_th` o dict {'S11': array,
+    ...} do cálculo, `sim` a rede simulada como (f em Hz, S (freq, porta,
+    porta), z0) ou None. Arrays repetidos (os S_i1 de todas as saídas são o
+    mesmo objeto) são gravados uma vez.
+    """
+    blocks, arrays = {}, []
+
+    def add_block(name, value):
+        value = np.ascontiguousarray(value)
+        for existing, other in arrays:
+            if other is value or (other.shape == value.shape and other.dtype == value.dtype
+                                  and np.array_equal(other, value)):
+                return existing
+        blocks[name] = {'dtype': value.dtype.str, 'shape': list(value.shape)}
+        arrays.append((name, value))
+        return name
+
+    results_json, result_blocks = {}, {}
+    for key, value in (results or {}).items():
+        if _is_numeric_list(value):
+            result_blocks[key] = add_block(f"results/{key}", np.asarray(value))
+        else:
+            results_json[key] = _jsonable(value)
+
+    manifest = {
+        'format': "coax_divider_project", 'version': PROJECT_VERSION, 'saved_at': time.time(),
+        'params': _jsonable(params), 'results': results_json, 'result_blocks': result_blocks,
+        'frequencies': add_block("frequencies", np.asarray(frequencies, dtype=float)),
+        's_params_th': {k: add_block(f"th/{k}", np.asarray(v)) for k, v in (s_params_th or {}).items()},
+        'sim': None, 'aedt_path': aedt_path, 'hfss_setup': _jsonable(hfss_setup),
+        'timings': _jsonable(timings or {}), 'blocks': blocks,
+    }
+    if sim is not None:
+        f, s, z0 = sim
+        manifest['sim'] = {'f': add_block("sim/f", np.asarray(f, dtype=float)),
+                           's': add_block("sim/s", np.asarray(s, dtype=complex)),
+                           'z0': _jsonable(np.real(np.asarray(z0)).ravel())}
+
+    # Deslocamentos reservados com folga, pois entram no próprio manifesto
+    offset = len(PROJECT_MAGIC) + 8 + len(json.dumps(manifest)) + 32 * (len(arrays) + 1)
+    for name, value in arrays:
+        offset = -(-offset // _ALIGN) * _ALIGN
+        blocks[name]['offset'] = offset
+        offset += value.nbytes
+    encoded = json.dumps(manifest).encode()
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as out:
+        out.write(PROJECT_MAGIC + len(encoded).to_bytes(8, 'little') + encoded)
+        for name, value in arrays:
+            out.seek(blocks[name]['offset'])
+            out.write(value.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+# --------------------------------------------------------------------
+# 2. Leitura
+# --------------------------------------------------------------------
+class ProjectFile:
+    """
+    Projeto aberto. `params`, `results`, `aedt_path`, `hfss_setup` e
+    `timings` vêm do manifesto; `frequencies`, `s_params_th` e `sim` são
+    mapeados do disco no primeiro acesso.
+    """
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.version = manifest.get('version', 1)
+        self.params = manifest['params']
+        self.aedt_path = manifest.get('aedt_path')
+        self.hfss_setup = manifest.get('hfss_setup')
+        self.timings = manifest.get('timings', {})
+        self._arrays = {}
+        self._results = None
+
+    def array(self, name):
+        """
+        Bloco `name` como `np.memmap` somente leitura (aberto uma vez).
+        """
+        if name not in self._arrays:
+            block = self.manifest['blocks'][name]
+            shape = tuple(block['shape'])
+            if not int(np.prod(shape)):
+                self._arrays[name] = np.empty(shape, dtype=block['dtype'])
+            else:
+                self._arrays[name] = np.memmap(self.path, dtype=block['dtype'], mode='r',
+                                               offset=block['offset'], shape=shape)
+        return self._arrays[name]
+
+    def close(self):
+        """
+        Solta os blocos mapeados por este objeto. Arrays já entregues
+        continuam mapeando o arquivo até serem liberados por quem os usa.
+        """
+        self._arrays.clear()
+
+    @property
+    def results(self):
+        if self._results is None:
+            self._results = dict(self.manifest.get('results', {}))
+            for key, name in self.manifest.get('result_blocks', {}).items():
+                self._results[key] = self.array(name).tolist()
+        return self._results
+
+    @property
+    def frequencies(self):
+        name = self.manifest.get('frequencies')
+        return self.array(name) if name else None
+
+    @property
+    def s_params_th(self):
+        return {k: self.array(name) for k, name in self.manifest.get('s_params_th', {}).items()} or None
+
+    @property
+    def sim(self):
+        """
+        (f em Hz, S (freq, porta, porta), z0) da rede simulada, ou None.
+        """
+        sim = self.manifest.get('sim')
+        if not sim:
+            return None
+        return self.array(sim['f']), self.array(sim['s']), np.asarray(sim['z0'])
+
+
+def load_project_file(path):
+    """
+    Abre um projeto do formato 2 ou 1 (JSON só com os parâmetros; nesse
+    caso `results` fica vazio e não há blocos).
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(PROJECT_MAGIC))
+        if magic == PROJECT_MAGIC:
+            size = int.from_bytes(f.read(8), 'little')
+            manifest = json.loads(f.read(size))
+            if manifest.get('version', PROJECT_VERSION) > PROJECT_VERSION:
+                raise ValueError(f"{path}: projeto na versão {manifest['version']}, mais nova que esta ferramenta.")
+            return ProjectFile(path, manifest)
+        f.seek(0)
+        params = json.load(f)
+    return ProjectFile(path, {'version': 1, 'params': params, 'blocks': {}})
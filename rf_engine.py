@@ -0,0 +1,589 @@
+"""
+Motor analítico do divisor coaxial (NumPy puro, sem GUI).
+
+Calcula a cascata de seções de impedância escalonada como produtos de
+matrizes ABCD 2x2 vetorizados sobre todo o eixo de frequência, sem criar
+objetos `Network` intermediários do scikit-rf.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# --------------------------------------------------------------------
+# 1. Materiais e constantes da linha
+# --------------------------------------------------------------------
+SUBSTRATE_MATERIALS = {
+    "Ar": (1.0006, 0.0),
+    "Teflon (PTFE)": (2.1, 0.0002),
+    "FR-4": (4.4, 0.02),
+    "Rogers RO4003C": (3.55, 0.0027),
+}
+
+C_MM_MHZ = 299792.458
+C_M_S = 299792458
+
+# Valores padrão de L e C do `skrf.media.DistributedCircuit`, usados pelo
+# modelo original da interface (`loaded_divider_s11`); o motor os reproduz
+# para devolver exatamente o mesmo S11 daquela cascata.
+DC_L = 2.8e-7
+DC_C = 9e-11
+
+
+# --------------------------------------------------------------------
+# 2. Cascata ABCD
+# --------------------------------------------------------------------
+def phase_constant(freqs_hz, L=DC_L, C=DC_C):
+    """
+    Constante de fase β = ω√(LC) de uma linha sem perdas (γ = jβ).
+    """
+    return 2 * np.pi * np.asarray(freqs_hz, dtype=float) * np.sqrt(L * C)
+
+
+def coax_phase_constant(freqs_hz, er):
+    """
+    Constante de fase física β = ω√εr/c da linha coaxial TEM.
+    """
+    return 2 * np.pi * np.asarray(freqs_hz, dtype=float) * np.sqrt(np.asarray(er, dtype=float)) / C_M_S
+
+
+def cascade_abcd(z_sects, sec_len_m, freqs_hz, er=None):
+    """
+    Retorna (A, B, C, D) da cascata de linhas de transmissão sem perdas.
+
+    `z_sects` tem forma (..., n_sections); `sec_len_m` é escalar, (..., 1)
+    para um comprimento por projeto, ou broadcastable para a forma de
+    `z_sects` (comprimento 0 equivale a uma seção identidade). `freqs_hz`
+    tem forma (n_freqs,) ou (..., n_freqs). Cada elemento retornado tem
+    forma (..., n_freqs). Sem `er` a fase usa `phase_constant` (modelo do
+    scikit-rf); com `er` (escalar ou (..., 1)), a fase física da coaxial.
+
+    Numa linha sem perdas A e D são reais e B e C imaginários puros, então o
+    produto é feito só com aritmética real (B = jb, C = jc).
+    """
+    z = np.asarray(z_sects, dtype=float)
+    beta = phase_constant(freqs_hz) if er is None else coax_phase_constant(freqs_hz, er)
+    lengths = np.asarray(sec_len_m, dtype=float)
+
+    if lengths.ndim == 0 or lengths.shape[-1] == 1:
+        # Seções de mesmo comprimento: cos/sin calculados uma única vez
+        theta = lengths * beta
+        cos_t, sin_t = np.cos(theta), np.sin(theta)
+        trig = lambda k: (cos_t, sin_t)
+    else:
+        lengths = np.broadcast_to(lengths, z.shape)
+        trig = lambda k: (np.cos(lengths[..., k, None] * beta), np.sin(lengths[..., k, None] * beta))
+
+    lead = np.broadcast_shapes(z.shape[:-1] + (1,), beta.shape)
+    A = np.ones(lead)
+    b = np.zeros(lead)
+    c = np.zeros(lead)
+    D = np.ones(lead)
+
+    for k in range(z.shape[-1]):
+        zk = z[..., k, None]
+        cos_k, sin_k = trig(k)
+        zs, sz = zk * sin_k, sin_k / zk
+        A, b, c, D = A * cos_k - b * sz, A * zs + b * cos_k, c * cos_k + D * sz, D * cos_k - c * zs
+
+    return A, 1j * b, 1j * c, D
+
+
+def abcd_to_s11(A, B, C, D, z1, z2):
+    """
+    S11 de uma rede ABCD com impedâncias de referência reais z1 (porta 1)
+    e z2 (porta 2).
+    """
+    z1 = np.asarray(z1, dtype=float)
+    z2 = np.asarray(z2, dtype=float)
+    num = A * z2 + B - C * z1 * z2 - D * z1
+    den = A * z2 + B + C * z1 * z2 + D * z1
+    return num / den
+
+
+def abcd_to_s21(A, B, C, D, z1, z2):
+    """
+    S21 de uma rede ABCD com impedâncias de referência reais z1 e z2.
+    """
+    z1 = np.asarray(z1, dtype=float)
+    z2 = np.asarray(z2, dtype=float)
+    den = A * z2 + B + C * z1 * z2 + D * z1
+    return 2 * np.sqrt(z1 * z2) / den
+
+
+def chebyshev_impedances(n_sections, n_outputs, z0=50.0):
+    """
+    Impedâncias das seções pela fórmula de expoente fechado do divisor.
+    """
+    z_eff = z0 / n_outputs
+    i = np.arange(1, n_sections + 1)
+    return z0 * (z_eff / z0) ** ((2 * i - 1) / (2 * n_sections))
+
+
+def stepped_line_s11(z_sects, sec_len_m, freqs_hz):
+    """
+    S11 da cascata de seções referenciada à primeira seção, com a porta 2
+    casada na impedância da última seção (modelo de `theoretical_return_loss`).
+    """
+    z = np.asarray(z_sects, dtype=float)
+    A, B, C, D = cascade_abcd(z, sec_len_m, freqs_hz)
+    return abcd_to_s11(A, B, C, D, z[..., :1], z[..., -1:])
+
+
+def loaded_divider_s11(z_sects, sec_len_m, freqs_hz, n_outputs, z0=50.0):
+    """
+    S11 em referência z0 da cascata seguida do resistor série N·z0 e da
+    porta 2 terminada em z0 (modelo de `calculate_s_parameters`).
+    """
+    A, B, C, D = cascade_abcd(z_sects, sec_len_m, freqs_hz)
+    r_load = np.asarray(n_outputs, dtype=float)[..., None] * z0
+    A, B, C, D = A, A * r_load + B, C, C * r_load + D
+    return abcd_to_s11(A, B, C, D, z0, z0)
+
+
+def transformer_s11(z_sects, sec_len_m, freqs_hz, n_outputs, er, z0=50.0):
+    """
+    S11 em referência z0 do transformador terminado nas N saídas em
+    paralelo (z0/N), com a fase física da coaxial. É o modelo do divisor
+    em toda parte: curvas da interface, varredura, rendimento e otimização.
+    """
+    er = np.asarray(er, dtype=float)[..., None]
+    A, B, C, D = cascade_abcd(z_sects, sec_len_m, freqs_hz, er=er)
+    z_load = z0 / np.asarray(n_outputs, dtype=float)[..., None]
+    return abcd_to_s11(A, B, C, D, z0, z_load)
+
+
+def divider_s21(s11, n_outputs, len_inner_m, er, freqs_hz):
+    """
+    S21 teórico de cada saída: perda de descasamento + divisão ideal 1/N,
+    com a fase da linha física de comprimento `len_inner_m`.
+    """
+    n_outputs, len_inner_m, er = (np.asarray(x, dtype=float)[..., None] for x in (n_outputs, len_inner_m, er))
+    mismatch_loss_db = -10 * np.log10(1 - np.abs(s11) ** 2)
+    ideal_split_loss_db = 10 * np.log10(n_outputs)
+    s21_db = -(mismatch_loss_db + ideal_split_loss_db)
+
+    phase_velocity = C_M_S / np.sqrt(er)
+    electrical_length = 2 * np.pi * freqs_hz * len_inner_m / phase_velocity
+    return 10 ** (s21_db / 20) * np.exp(-1j * electrical_length)
+
+
+def _cascade_s11_gradient(z_sects, sec_len_m, beta, z0, z_load):
+    """
+    S11 em referência z0 da cascata terminada em `z_load` e suas derivadas
+    analíticas em relação à impedância e ao comprimento (m) de cada seção.
+
+    Usa a forma adjunta da cascata: S11 = x·M1···Mn·y, então cada derivada
+    é (x·M1···Mk-1)·dMk·(Mk+1···Mn·y). Os vetores à esquerda e à direita
+    saem de uma varredura para frente e outra para trás, e o custo total
+    fica na ordem de uma avaliação direta.
+    """
+    z = np.asarray(z_sects, dtype=float)
+    lengths = np.broadcast_to(np.asarray(sec_len_m, dtype=float), z.shape)
+    n = z.size
+
+    theta = lengths[:, None] * beta
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    zc = z[:, None]
+    # Mk = [[c, j·z·s], [j·s/z, c]]
+    m01, m10 = 1j * zc * sin_t, 1j * sin_t / zc
+
+    # Vetores à esquerda: linha 0 -> numerador, linha 1 -> denominador de S11
+    l0 = np.ones((2, beta.size), dtype=complex)
+    l1 = np.array([[-z0], [z0]], dtype=complex) * np.ones(beta.size)
+    left = np.empty((n, 2, 2, beta.size), dtype=complex)  # (seção, componente, linha, freq)
+    for k in range(n):
+        left[k] = l0, l1
+        l0, l1 = l0 * cos_t[k] + l1 * m10[k], l0 * m01[k] + l1 * cos_t[k]
+
+    # Vetores à direita: Mk+1···Mn·y com y = [z_load, 1]
+    r0 = np.full(beta.size, z_load, dtype=complex)
+    r1 = np.ones(beta.size, dtype=complex)
+    right = np.empty((n, 2, beta.size), dtype=complex)
+    for k in range(n - 1, -1, -1):
+        right[k] = r0, r1
+        r0, r1 = cos_t[k] * r0 + m01[k] * r1, m10[k] * r0 + cos_t[k] * r1
+
+    num, den = l0 * right[-1, 0] + l1 * right[-1, 1]
+    s11 = num / den
+
+    def ds(d00, d01, d10, d11):
+        x0, x1 = right[:, None, 0], right[:, None, 1]
+        d_num, d_den = (left[:, 0] * (d00[:, None] * x0 + d01[:, None] * x1)
+                        + left[:, 1] * (d10[:, None] * x0 + d11[:, None] * x1)).swapaxes(0, 1)
+        return (d_num * den - num * d_den) / den ** 2
+
+    zero = np.zeros_like(cos_t)
+    ds_dz = ds(zero, 1j * sin_t, -1j * sin_t / zc ** 2, zero)
+    ds_dl = ds(-beta * sin_t, 1j * beta * zc * cos_t, 1j * beta * cos_t / zc, -beta * sin_t)
+    return s11, ds_dz, ds_dl
+
+
+def loaded_divider_s11_gradient(z_sects, sec_len_m, freqs_hz, n_outputs, z0=50.0):
+    """
+    S11 de `loaded_divider_s11` (um projeto) e suas derivadas analíticas em
+    relação à impedância e ao comprimento (m) de cada seção: a cascata
+    seguida do resistor série N·z0 e de z0 equivale à carga (N + 1)·z0.
+
+    Retorna (s11 (n_freqs,), dS/dz (n, n_freqs), dS/dl (n, n_freqs)).
+    """
+    return _cascade_s11_gradient(z_sects, sec_len_m, phase_constant(freqs_hz), z0, z0 + n_outputs * z0)
+
+
+def transformer_s11_gradient(z_sects, sec_len_m, freqs_hz, n_outputs, er, z0=50.0):
+    """
+    S11 de `transformer_s11` (um projeto) e suas derivadas analíticas, no
+    mesmo formato de `loaded_divider_s11_gradient`.
+    """
+    return _cascade_s11_gradient(z_sects, sec_len_m, coax_phase_constant(freqs_hz, er), z0, z0 / n_outputs)
+
+
+def coax_impedance(d_outer, d_inner, er):
+    """
+    Impedância característica da linha coaxial (inversa da fórmula dos diâmetros).
+    """
+    return 59.952 / np.sqrt(er) * np.log(np.asarray(d_outer, dtype=float) / np.asarray(d_inner, dtype=float))
+
+
+def divider_sensitivity(main_diams, sec_len_mm, d_int_tube, er, n_outputs, freqs_mhz, metric='worst'):
+    """
+    Métrica de perda de retorno na banda e seu gradiente analítico em
+    relação à geometria usinada.
+
+    metric='worst': pior |S11| em dB (gradiente na frequência do pior caso);
+    metric='mean_square': média de |S11|² na banda (suave em toda parte).
+
+    `sec_len_mm` é escalar ou um comprimento por seção. Retorna um dict com
+    'value', os gradientes por mm 'main_diams' (n,), 'sec_len_mm' (n,) e
+    'd_int_tube' (escalar), e 'frequency_mhz' (frequência do pior caso).
+    """
+    d = np.asarray(main_diams, dtype=float)
+    k_coax = 59.952 / np.sqrt(er)
+    z = coax_impedance(d_int_tube, d, er)
+    freqs_mhz = np.asarray(freqs_mhz, dtype=float)
+    s11, ds_dz, ds_dl = transformer_s11_gradient(
+        z, np.broadcast_to(np.asarray(sec_len_mm, dtype=float), d.shape) / 1000.0, freqs_mhz * 1e6, n_outputs, er)
+
+    mag2 = np.abs(s11) ** 2
+    i_worst = int(np.argmax(mag2))
+    if metric == 'worst':
+        value = 10 * np.log10(mag2[i_worst])
+        scale = 20 / np.log(10) / mag2[i_worst]
+        g_z = scale * np.real(np.conj(s11[i_worst]) * ds_dz[:, i_worst])
+        g_l = scale * np.real(np.conj(s11[i_worst]) * ds_dl[:, i_worst])
+    elif metric == 'mean_square':
+        value = mag2.mean()
+        g_z = 2 * np.real(np.conj(s11) * ds_dz).mean(axis=-1)
+        g_l = 2 * np.real(np.conj(s11) * ds_dl).mean(axis=-1)
+    else:
+        raise ValueError(f"Métrica desconhecida: {metric}")
+
+    # z_k = K·ln(D/d_k): dz_k/dd_k = -K/d_k, dz_k/dD = K/D
+    return {
+        'value': float(value),
+        'main_diams': g_z * (-k_coax / d),
+        'sec_len_mm': g_l / 1000.0,
+        'd_int_tube': float(np.sum(g_z) * k_coax / d_int_tube),
+        'frequency_mhz': float(freqs_mhz[i_worst]),
+    }
+
+
+# --------------------------------------------------------------------
+# 3. Avaliação em lote (projetos x frequências)
+# --------------------------------------------------------------------
+def material_permittivity(material):
+    """
+    εr de cada nome de material de `SUBSTRATE_MATERIALS` (escalar ou array).
+    """
+    names = np.asarray(material, dtype=object)
+    er = [SUBSTRATE_MATERIALS[m][0] for m in names.ravel()]
+    return np.array(er, dtype=float).reshape(names.shape)
+
+
+def coaxial_geometry(f_start, f_stop, d_ext, wall_thick, n_sections, n_outputs, er, z0=50.0):
+    """
+    Versão vetorizada de `CoaxialCalculator.calculate` para arrays de projetos.
+
+    Retorna um dict com as mesmas chaves de `results`; `z_sects` e
+    `main_diams` têm forma (n_designs, max(n_sections)) preenchida com NaN
+    além da última seção de cada projeto.
+    """
+    f_start, f_stop, d_ext, wall_thick, er = (np.asarray(x, dtype=float)
+                                              for x in (f_start, f_stop, d_ext, wall_thick, er))
+    n_sections = np.asarray(n_sections, dtype=int)
+    n_outputs = np.asarray(n_outputs, dtype=int)
+
+    f0 = (f_start + f_stop) / 2
+    sec_len = C_MM_MHZ / (f0 * np.sqrt(er)) / 4
+    len_inner = n_sections * sec_len
+    len_outer = len_inner * 1.05
+    d_int_tube = d_ext - 2 * wall_thick
+    d_out_50 = d_int_tube / np.exp(50 * np.sqrt(er) / 59.952)
+
+    i = np.arange(1, n_sections.max(initial=1) + 1)
+    ns = n_sections[..., None]
+    z_eff = z0 / n_outputs[..., None]
+    z_sects = np.where(i <= ns, z0 * (z_eff / z0) ** ((2 * i - 1) / (2 * ns)), np.nan)
+    main_diams = d_int_tube[..., None] / np.exp(z_sects * np.sqrt(er)[..., None] / 59.952)
+
+    return {
+        'sec_len_mm': sec_len,
+        'len_inner_mm': len_inner,
+        'len_outer_mm': len_outer,
+        'd_int_tube': d_int_tube,
+        'main_diams': main_diams,
+        'd_out_50ohm': d_out_50,
+        'z_sects': z_sects
+    }
+
+
+def evaluate_designs(f_start, f_stop, d_ext, wall_thick, n_sections, n_outputs, material, n_freqs=201):
+    """
+    Avalia milhares de projetos de uma vez.
+
+    Todos os argumentos são escalares ou arrays 1D do mesmo tamanho (um
+    elemento por projeto); `material` são chaves de `SUBSTRATE_MATERIALS`.
+    Retorna a geometria de `coaxial_geometry` mais 'frequencies' (MHz),
+    'S11' e 'S21' com forma (n_designs, n_freqs). Projetos com o mesmo
+    `n_sections` são avaliados juntos num único produto ABCD (grupos
+    irregulares, sem preenchimento).
+    """
+    f_start, f_stop, d_ext, wall_thick, n_sections, n_outputs, material = np.broadcast_arrays(
+        *(np.atleast_1d(x) for x in (f_start, f_stop, d_ext, wall_thick, n_sections, n_outputs,
+                                     np.asarray(material, dtype=object))))
+    n_sections = n_sections.astype(int)
+    n_outputs = n_outputs.astype(int)
+    er = material_permittivity(material)
+
+    out = coaxial_geometry(f_start, f_stop, d_ext, wall_thick, n_sections, n_outputs, er)
+    frequencies = np.linspace(f_start.astype(float), f_stop.astype(float), n_freqs, axis=-1)
+    freqs_hz = frequencies * 1e6
+
+    s11 = np.empty(frequencies.shape, dtype=complex)
+    for n in np.unique(n_sections):
+        idx = np.flatnonzero(n_sections == n)
+        s11[idx] = transformer_s11(out['z_sects'][idx, :n], out['sec_len_mm'][idx, None] / 1000.0,
+                                   freqs_hz[idx], n_outputs[idx], er[idx])
+
+    out['frequencies'] = frequencies
+    out['S11'] = s11
+    out['S21'] = divider_s21(s11, n_outputs, out['len_inner_mm'] / 1000.0, er, freqs_hz)
+    return out
+
+
+# --------------------------------------------------------------------
+# 4. Grade de frequência adaptativa
+# --------------------------------------------------------------------
+def adaptive_frequency_grid(func, f_start, f_stop, tol=1e-3, n_initial=17, max_points=4001):
+    """
+    Amostra `func` (f_MHz -> S complexo, forma (..., n_freqs)) entre f_start e
+    f_stop refinando só onde a curva pede.
+
+    Começa numa grade uniforme grosseira e avalia o ponto médio de cada
+    intervalo ainda ativo; se o S no ponto médio difere da interpolação
+    linear dos extremos por mais que `tol` (em módulo, em algum traço; `tol`
+    é escalar ou um valor por traço), o intervalo é dividido e continua
+    ativo. Assim a curvatura e os picos de
+    ondulação Chebyshev recebem pontos e os trechos suaves não. Para ao
+    atingir `tol` em todos os intervalos ou `max_points`.
+
+    Retorna (freqs_mhz, s), com todos os pontos avaliados (nenhuma avaliação
+    é descartada).
+    """
+    f = np.linspace(f_start, f_stop, n_initial)
+    s = np.asarray(func(f))
+    # Estado do intervalo que começa em cada ponto (o último ponto não abre intervalo)
+    active = np.ones(f.size, dtype=bool)
+    active[-1] = False
+
+    while active.any() and f.size < max_points:
+        idx = np.flatnonzero(active)[:max_points - f.size]
+
+        f_mid = (f[idx] + f[idx + 1]) / 2
+        s_mid = np.asarray(func(f_mid))
+        err = np.abs(s_mid - (s[..., idx] + s[..., idx + 1]) / 2)
+        refine = (err > np.asarray(tol)[..., None]).reshape(-1, idx.size).any(axis=0)
+
+        # As duas metades de um intervalo dividido herdam o mesmo estado
+        active[idx] = refine
+        f = np.concatenate([f, f_mid])
+        s = np.concatenate([s, s_mid], axis=-1)
+        active = np.concatenate([active, refine])
+
+        order = np.argsort(f, kind='stable')
+        f, s, active = f[order], s[..., order], active[order]
+    return f, s
+
+
+# --------------------------------------------------------------------
+# 5. Cache de redes teóricas
+# --------------------------------------------------------------------
+def _canonical(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Tipo não serializável para a chave do cache: {type(obj).__name__}")
+
+
+def canonical_key(*parts, frequencies=None):
+    """
+    Hash SHA-1 canônico de dicts/valores de parâmetros (ordem das chaves
+    irrelevante) mais os bytes da grade de frequências.
+    """
+    h = hashlib.sha1(json.dumps(parts, sort_keys=True, default=_canonical).encode())
+    if frequencies is not None:
+        h.update(np.ascontiguousarray(frequencies, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+class NetworkCache:
+    """
+    Cache LRU com limite de tamanho, compartilhado pelo processo inteiro.
+
+    Guarda redes teóricas e arrays derivados; arrays NumPy são marcados como
+    somente leitura e redes (objetos com `copy`, como `skrf.Network`) e
+    dicts saem como cópia, para que nenhum chamador altere uma entrada
+    compartilhada.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._share(self._data[key])
+            self.misses += 1
+
+        value = compute()
+        self._freeze(value)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return self._share(value)
+
+    @staticmethod
+    def _share(value):
+        if isinstance(value, dict):
+            return dict(value)
+        if isinstance(value, np.ndarray) or not hasattr(value, 'copy'):
+            return value
+        return value.copy()
+
+    @staticmethod
+    def _freeze(value):
+        values = value.values() if isinstance(value, dict) else [value]
+        for v in values:
+            if isinstance(v, np.ndarray):
+                v.setflags(write=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
+    def __len__(self):
+        return len(self._data)
+
+
+NETWORK_CACHE = NetworkCache()
+
+
+# --------------------------------------------------------------------
+# 6. Reconstrução a partir do modelo de setor (simetria 1/N)
+# --------------------------------------------------------------------
+def sector_mode_count(n_outputs):
+    """
+    Modos azimutais distintos de um divisor com N saídas: m = 0..N//2
+    (m e N-m têm a mesma reflexão por simetria de espelho).
+    """
+    return n_outputs // 2 + 1
+
+
+def sector_to_full_smatrix(mode_s, n_outputs):
+    """
+    Matriz S completa (F, N+1, N+1) a partir das soluções de um setor 360/N.
+
+    `mode_s` tem forma (N//2 + 1, F, 2, 2): porta 1 é a fatia da entrada
+    (referenciada a N·Z0) e porta 2 é a saída do setor, para cada modo
+    azimutal m com defasagem 2πm/N entre as paredes do setor. Só o modo
+    m = 0 acopla à entrada TEM; as reflexões Γm dos demais modos formam a
+    matriz circulante entre as saídas, S_kl = (1/N) Σm Γm e^{j2πm(k-l)/N}.
+    """
+    mode_s = np.asarray(mode_s, dtype=complex)
+    n = n_outputs
+    if mode_s.shape[0] != sector_mode_count(n):
+        raise ValueError(f"Esperados {sector_mode_count(n)} modos para {n} saídas, recebidos {mode_s.shape[0]}.")
+    n_freq = mode_s.shape[1]
+
+    m = np.arange(n)
+    gamma = mode_s[np.minimum(m, n - m), :, 1, 1]
+    circ = np.fft.ifft(gamma, axis=0)  # circ[d] = (1/N) Σm Γm e^{j2πmd/N}
+
+    s = np.empty((n_freq, n + 1, n + 1), dtype=complex)
+    s[:, 0, 0] = mode_s[0, :, 0, 0]
+    s[:, 1:, 0] = (mode_s[0, :, 1, 0] / np.sqrt(n))[:, None]
+    s[:, 0, 1:] = (mode_s[0, :, 0, 1] / np.sqrt(n))[:, None]
+    k = np.arange(n)
+    s[:, 1:, 1:] = np.moveaxis(circ[(k[:, None] - k[None, :]) % n], -1, 0)
+    return s
+
+
+# --------------------------------------------------------------------
+# 7. Parâmetros S teóricos do divisor completo
+# --------------------------------------------------------------------
+ISOLATION_DB = -6
+
+
+def divider_s_parameters(z_sects, sec_len_m, len_inner_m, er, n_outputs, freqs_hz, s11=None):
+    """
+    Traços teóricos do divisor em `freqs_hz`: {'S11', 'S21'..'S{N+1}1',
+    'S22', 'S32'} (todos os S_i1 são o mesmo array). `s11` já avaliado em
+    `freqs_hz` (por exemplo, pela grade adaptativa) não é recalculado.
+    """
+    freqs_hz = np.asarray(freqs_hz, dtype=float)
+    if s11 is None:
+        s11 = transformer_s11(z_sects, sec_len_m, freqs_hz, n_outputs, er)
+    s21 = divider_s21(s11, n_outputs, len_inner_m, er, freqs_hz)
+
+    s_params = {f'S{i + 2}1': s21 for i in range(n_outputs)}
+    s_params['S11'] = s11
+    s_params['S22'] = s11
+    s_params['S32'] = 10 ** (ISOLATION_DB / 20) * np.ones(len(freqs_hz))
+    return s_params
+
+
+def divider_s_matrix(s_params, n_outputs, n_freq):
+    """
+    Matriz S (freq, N+1, N+1) a partir dos traços de `divider_s_parameters`
+    e a máscara (N+1, N+1) das entradas que o modelo define; as demais
+    ficam em zero.
+    """
+    n_ports = n_outputs + 1
+    s = np.zeros((n_freq, n_ports, n_ports), dtype=complex)
+    defined = np.zeros((n_ports, n_ports), dtype=bool)
+
+    entries = [('S11', 0, 0), ('S22', 1, 1)] + ([('S32', 2, 1)] if n_outputs > 1 else [])
+    entries += [(f'S{i + 2}1', i + 1, 0) for i in range(n_outputs)]
+    entries += [(f'S{i + 2}1', 0, i + 1) for i in range(n_outputs)]
+    for key, row, col in entries:
+        if key in s_params:
+            s[:, row, col] = s_params[key]
+            defined[row, col] = True
+    return s, defined
@@ -0,0 +1,62 @@
+"""
+Pool de processos com saída em memória compartilhada.
+
+`run_chunked` divide [0, n) em blocos, roda cada bloco num processo e
+monta o resultado num único array compartilhado: cada processo escreve só
+a sua fatia e nada de resultados grandes atravessa o pickle. Usado pela
+varredura do espaço de projeto (`design_space`) e pela importação de
+Touchstones (`touchstone_io`); depende só do NumPy.
+
+Em Windows os chamadores devem estar sob `if __name__ == "__main__":`,
+como em qualquer uso de `ProcessPoolExecutor`.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_worker = {}
+
+
+def _attach_shared(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=float, buffer=shm.buf)
+
+
+def _init_worker(shm_name, shape, context):
+    _worker['shm'], _worker['out'] = _attach_shared(shm_name, shape)
+    _worker.update(context)
+
+
+def run_chunked(task, n_items, context, n_outputs_cols, workers=None, chunk_size=8192):
+    """
+    Executa `task(start, stop, context) -> array (stop-start, n_outputs_cols)`
+    sobre [0, n_items) em blocos, num pool de processos, e devolve o array
+    (n_items, n_outputs_cols) montado em memória compartilhada (cada processo
+    escreve só a sua fatia; nada de resultados grandes atravessa o pickle).
+    """
+    shape = (n_items, n_outputs_cols)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+    try:
+        out = np.ndarray(shape, dtype=float, buffer=shm.buf)
+        out[:] = np.nan
+        chunks = [(start, min(start + chunk_size, n_items)) for start in range(0, n_items, chunk_size)]
+        workers = workers or os.cpu_count() or 1
+
+        if workers == 1:
+            for start, stop in chunks:
+                out[start:stop] = task(start, stop, context)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shm.name, shape, context)) as pool:
+                for future in [pool.submit(_run_task, task, start, stop) for start, stop in chunks]:
+                    future.result()
+        return out.copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _run_task(task, start, stop):
+    _worker['out'][start:stop] = task(start, stop, _worker)
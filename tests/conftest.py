@@ -0,0 +1,39 @@
+"""
+Os módulos do projeto ficam na raiz do repositório, sem pacote.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Projeto padrão da interface: 800–1200 MHz, 4 seções, 4 saídas, ar
+DEFAULT_PARAMS = {'f_start': 800.0, 'f_stop': 1200.0, 'd_ext': 20.0, 'wall_thick': 1.5, 'n_sections': 4,
+                  'n_outputs': 4, 'diel_material': "Ar"}
+
+
+@pytest.fixture
+def geometry():
+    from Calc_Div_EFTX import CoaxialCalculator
+
+    calc = CoaxialCalculator(dict(DEFAULT_PARAMS))
+    calc.calculate()
+    return calc.get_geometry_for_viewer()
+
+
+@pytest.fixture
+def mock_session(tmp_path, monkeypatch):
+    """
+    Sessão AEDT sobre o backend simulado, com os projetos e o cache do
+    usuário (índice, fila, soluções) em `tmp_path`.
+    """
+    from hfss_automation import AedtSession
+    from mock_aedt import MockDesktop, MockHfss
+
+    monkeypatch.chdir(tmp_path)
+    for var in ("XDG_CACHE_HOME", "LOCALAPPDATA"):
+        monkeypatch.setenv(var, str(tmp_path / "cache"))
+    session = AedtSession(desktop_cls=MockDesktop, hfss_cls=MockHfss.factory(latency_s=0.0))
+    yield session
+    session.close()
@@ -0,0 +1,129 @@
+import glob
+import os
+import shutil
+import threading
+
+import aedt_logs
+from aedt_logs import (DEFAULT_SETUP, BatchLogParser, ResultsIndex, advise_setup, crawl, parse_batch_log,
+                       shared_index, summarize_sessions)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_LOG = os.path.join(ROOT, "batch.log")
+PROJECTS = os.path.join(ROOT, "HFSS_Projects")
+
+
+def test_incremental_parse_matches_full_parse(tmp_path):
+    full = parse_batch_log(BATCH_LOG)
+    data = open(BATCH_LOG, 'rb').read()
+    # Corta no meio de uma sessão: ela só sai na segunda leitura
+    cut = (full[20]['offset'] + full[21]['offset']) // 2
+    log = tmp_path / "batch.log"
+    log.write_bytes(data[:cut])
+
+    parser = BatchLogParser(str(log))
+    first = list(parser.sessions())
+    assert parser.offset <= cut
+    with open(log, 'ab') as f:
+        f.write(data[cut:])
+    second = list(parser.sessions())
+    assert first + second == full
+
+
+def test_summary_of_the_sample_log():
+    sessions = parse_batch_log(BATCH_LOG)
+    summary = summarize_sessions(sessions)
+    assert summary['sessions'] == len(sessions)
+    assert summary['failed'] == sum(s['failed'] for s in sessions) > 0
+    assert summary['unterminated'] == sum(s['stop'] is None for s in sessions)
+    # Toda falha com quadro Python aponta o script e a função que falharam
+    failed = [s for s in sessions if s['failed_frame']]
+    assert sum(summary['failed_in'].values()) == len(failed)
+    assert all(k.endswith(":generate_hfss_model") for k in summary['failed_in'])
+    assert summary['stages_s']['aedt file load']['count'] > 0
+
+
+def test_crawl_skips_unchanged_projects(tmp_path):
+    db = str(tmp_path / "index.sqlite")
+    n_projects = len(glob.glob(os.path.join(PROJECTS, "*.aedt")))
+    first = crawl(PROJECTS, db_path=db, workers=1)
+    assert (first['scanned'], first['skipped']) == (n_projects, 0)
+    second = crawl(PROJECTS, db_path=db, workers=1)
+    assert (second['scanned'], second['skipped'], second['removed']) == (0, n_projects, 0)
+
+    index = ResultsIndex(db)
+    try:
+        table = index.solve_table(['comp_total'])
+    finally:
+        index.close()
+    assert table
+    # Cada solve junta o setup do projeto, o custo e as variáveis da variação
+    solved = next(r for r in table if r['path'].endswith("Divisor_Coaxial_20250610_184252.aedt"))
+    assert solved['n_ports'] == 5 and solved['n_sections'] == 4
+    assert solved['elapsed_s'] > 0 and solved['final_tets'] >= solved['first_tets'] > 0
+    assert solved['comp_total'] > 0
+
+
+def test_crawl_rescans_modified_and_forgets_removed(tmp_path):
+    folder = tmp_path / "projects"
+    folder.mkdir()
+    for name in ("Divisor_Coaxial_20250610_184252.aedt", "Divisor_Coaxial_20250610_093613.aedt"):
+        shutil.copy(os.path.join(PROJECTS, name), folder / name)
+    db = str(tmp_path / "index.sqlite")
+    assert crawl(str(folder), db_path=db, workers=1)['scanned'] == 2
+
+    touched = folder / "Divisor_Coaxial_20250610_184252.aedt"
+    os.utime(touched, (touched.stat().st_atime, touched.stat().st_mtime + 10))
+    assert crawl(str(folder), db_path=db, workers=1)['scanned'] == 1
+
+    touched.unlink()
+    report = crawl(str(folder), db_path=db, workers=1)
+    assert (report['scanned'], report['skipped'], report['removed']) == (0, 1, 1)
+
+
+def _solved_design(db):
+    names = ['comp_total', 'dia_int_tubo'] + [f"dia_sc{i + 1}" for i in range(4)]
+    index = ResultsIndex(db)
+    try:
+        row = next(r for r in index.solve_table(names) if r['n_ports'] == 5 and r['n_sections'] == 4)
+    finally:
+        index.close()
+    return row, {k: row[k] for k in names}
+
+
+def test_advise_setup_without_history_returns_default(tmp_path):
+    variables = {'dia_int_tubo': 20.0, 'comp_total': 300.0, 'dia_sc1': 8.0, 'dia_sc2': 6.0}
+    assert advise_setup(str(tmp_path / "missing.sqlite"), variables, 5, 1e9) == dict(DEFAULT_SETUP, basis=[])
+
+
+def test_advise_setup_uses_similar_solves(tmp_path):
+    db = str(tmp_path / "index.sqlite")
+    crawl(PROJECTS, db_path=db, workers=1)
+    row, variables = _solved_design(db)
+    advice = advise_setup(db, variables, 5, row['adapt_freq_hz'])
+    assert row['path'] in advice['basis']
+    assert aedt_logs.MIN_PASSES <= advice['MaximumPasses'] <= aedt_logs.MAX_PASSES
+    assert advice['MaxDeltaS'] == DEFAULT_SETUP['MaxDeltaS']
+
+
+def test_advise_setup_reuses_one_connection(tmp_path, monkeypatch):
+    db = str(tmp_path / "index.sqlite")
+    crawl(PROJECTS, db_path=db, workers=1)
+    row, variables = _solved_design(db)
+    opened = []
+    original = aedt_logs.ResultsIndex
+
+    class CountingIndex(original):
+        def __init__(self, *args, **kwargs):
+            opened.append(args)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(aedt_logs, "ResultsIndex", CountingIndex)
+    first = advise_setup(db, variables, 5, row['adapt_freq_hz'])
+    # Exportações rodam em threads de trabalho: a mesma conexão serve a todas
+    results = []
+    worker = threading.Thread(target=lambda: results.append(advise_setup(db, variables, 5, row['adapt_freq_hz'])))
+    worker.start()
+    worker.join()
+    assert results == [first]
+    assert len(opened) == 1
+    assert shared_index(db) is shared_index(db)
@@ -0,0 +1,118 @@
+import queue
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from skrf import Frequency, Network
+
+import Calc_Div_EFTX
+import rf_engine
+from Calc_Div_EFTX import App, CoaxialCalculator, simulation_key
+from project_file import load_project_file, save_project_file
+
+PARAMS = {'f_start': 800.0, 'f_stop': 1200.0, 'd_ext': 20.0, 'wall_thick': 1.5, 'n_sections': 4,
+          'n_outputs': 4, 'diel_material': "Ar"}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    rf_engine.NETWORK_CACHE.clear()
+    yield
+    rf_engine.NETWORK_CACHE.clear()
+
+
+def test_adaptive_grid_samples_are_reused(monkeypatch):
+    calls = []
+    model = rf_engine.transformer_s11
+    monkeypatch.setattr(rf_engine, "transformer_s11", lambda *a, **k: calls.append(a) or model(*a, **k))
+
+    calc = CoaxialCalculator({**PARAMS, 'adaptive_grid': True})
+    calc.calculate()
+    assert not calls
+    assert len(calc.frequencies) < 201
+    er = rf_engine.SUBSTRATE_MATERIALS["Ar"][0]
+    expected = model(calc.results['z_sects'], calc.results['sec_len_mm'] / 1000.0, calc.frequencies * 1e6, 4, er)
+    np.testing.assert_allclose(calc.s_params_th['S11'], expected, atol=1e-14)
+
+    # Resultados alterados depois da grade: o S11 é recalculado
+    calc.results = {**calc.results, 'sec_len_mm': calc.results['sec_len_mm'] * 1.1}
+    calc.calculate_s_parameters()
+    assert len(calls) == 1
+
+
+def test_simulation_uses_the_exported_model_parameters():
+    exported = CoaxialCalculator({**PARAMS, 'sector_model': True})
+    exported.calculate()
+    hfss_params = exported.get_geometry_for_viewer()
+    # Recalculado depois da exportação, sem o modelo de setor
+    current = CoaxialCalculator(dict(PARAMS))
+    current.calculate()
+
+    submitted = []
+    app = SimpleNamespace(project_path="div.aedt", hfss_params=hfss_params, calc=current, queue=queue.Queue(),
+                          simulation_queue=lambda: SimpleNamespace(submit=lambda project, meta: submitted.append(meta)))
+    App.run_simulation(app)
+    assert submitted == [{'sector_outputs': 4, 'cache_key': simulation_key(hfss_params)}]
+
+
+def test_restored_project_stays_mapped_until_saved_over(tmp_path, monkeypatch):
+    calc = CoaxialCalculator(dict(PARAMS))
+    calc.calculate()
+    path = str(tmp_path / "div.coaxproj")
+    save_project_file(path, calc.params, calc.results, calc.frequencies, calc.s_params_th)
+
+    app = SimpleNamespace(open_project=None, queue=queue.Queue(), project_path=None, hfss_params=None, timings={},
+                          result_frame=SimpleNamespace(display_results=lambda c, comparison=None: None),
+                          update_button_states=lambda: None)
+    app._release_open_project = lambda filepath: App._release_open_project(app, filepath)
+    app._comparison_summary = lambda: App._comparison_summary(app)
+    App.restore_project(app, load_project_file(path))
+    assert isinstance(app.calc.frequencies, np.memmap)
+    assert all(isinstance(v, np.memmap) for v in app.calc.s_params_th.values())
+
+    # Salvar em outro arquivo não copia nada
+    other = str(tmp_path / "copia.coaxproj")
+    monkeypatch.setattr(Calc_Div_EFTX.fd, "asksaveasfilename", lambda **kw: other)
+    App.save_project(app)
+    assert load_project_file(other).params == calc.params
+    assert isinstance(app.calc.frequencies, np.memmap) and app.open_project is not None
+
+    # Sobre o próprio arquivo: os blocos vêm para a memória antes do os.replace
+    monkeypatch.setattr(Calc_Div_EFTX.fd, "asksaveasfilename", lambda **kw: path)
+    App.save_project(app)
+    assert app.open_project is None
+    assert not isinstance(app.calc.frequencies, np.memmap)
+    assert not any(isinstance(v, np.memmap) for v in app.calc.s_params_th.values())
+    np.testing.assert_array_equal(load_project_file(path).s_params_th['S11'], calc.s_params_th['S11'])
+
+
+def _import(tmp_path, n_ports):
+    calc = CoaxialCalculator(dict(PARAMS))
+    calc.calculate()
+    path = str(tmp_path / f"div.s{n_ports}p")
+    s = np.full((51, n_ports, n_ports), 0.1 + 0.05j)
+    Network(frequency=Frequency(800, 1200, 51, unit='MHz'), s=s).write_touchstone(path)
+    shown = []
+    app = SimpleNamespace(calc=calc, project_path=None, cached_touchstone=path, timings={}, queue=queue.Queue(),
+                          result_frame=SimpleNamespace(display_results=lambda c, comparison=None: shown.append(
+                              comparison)))
+    app._comparison_summary = lambda: App._comparison_summary(app)
+    App.import_hfss_results(app)
+    messages = []
+    while not app.queue.empty():
+        messages.append(app.queue.get())
+    return calc, shown, messages
+
+
+def test_import_with_other_port_count_skips_the_comparison(tmp_path):
+    calc, shown, messages = _import(tmp_path, 2)
+    assert calc.s_params_sim.nports == 2
+    # A importação e os gráficos seguem; só a comparação fica de fora
+    assert shown == [None]
+    assert any("Comparação ignorada" in m for m in messages)
+
+
+def test_comparison_summary_goes_to_the_results_panel(tmp_path):
+    _, shown, messages = _import(tmp_path, PARAMS['n_outputs'] + 1)
+    assert len(shown) == 1 and "MHz" in shown[0] and "S11" in shown[0]
+    assert not any("\n" in str(m) for m in messages)
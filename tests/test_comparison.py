@@ -0,0 +1,26 @@
+import numpy as np
+
+from comparison import compare_arrays, interpolated_theory
+
+
+def test_streaming_metrics_match_whole_array():
+    rng = np.random.default_rng(0)
+    f = np.linspace(0.8e9, 1.2e9, 1001)
+    th = 0.3 * (rng.normal(size=(1001, 3, 3)) + 1j * rng.normal(size=(1001, 3, 3)))
+    sim = th + 0.01 * (rng.normal(size=th.shape) + 1j * rng.normal(size=th.shape))
+    theory, defined = interpolated_theory(f, th)
+    bands = [(0.9e9, 1.1e9)]
+
+    streamed = compare_arrays(f, sim, theory, defined, bands, chunk_points=37)
+    whole = compare_arrays(f, sim, theory, defined, bands, chunk_points=len(f))
+
+    dev = np.abs(sim - th)
+    np.testing.assert_allclose(streamed['deviation']['max_abs'], dev.max(axis=0))
+    np.testing.assert_allclose(streamed['deviation']['rms_abs'], np.sqrt((dev ** 2).mean(axis=0)))
+    inside = (f >= 0.9e9) & (f <= 1.1e9)
+    worst = np.abs(np.diagonal(sim[inside], axis1=1, axis2=2)).max(axis=0)
+    np.testing.assert_allclose(streamed['bands'][0]['worst_rl_db'], -20 * np.log10(worst))
+    assert streamed['bands'][0]['points'] == inside.sum()
+    for key in ('amplitude_imbalance_db', 'phase_imbalance_deg'):
+        for stat in ('max', 'rms'):
+            np.testing.assert_allclose(streamed['bands'][0][key][stat], whole['bands'][0][key][stat])
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from design_space import design_space_sweep, monte_carlo_yield, optimize_profile, pareto_front
+from rf_engine import SUBSTRATE_MATERIALS, coaxial_geometry, transformer_s11
+
+# Projeto padrão da interface: 800–1200 MHz, 4 seções, 4 saídas, ar
+PARAMS = {'f_start': 800.0, 'f_stop': 1200.0, 'd_ext': 20.0, 'wall_thick': 1.5, 'n_sections': 4,
+          'n_outputs': 4, 'diel_material': "Ar"}
+
+
+@pytest.fixture
+def nominal():
+    er = SUBSTRATE_MATERIALS[PARAMS['diel_material']][0]
+    geo = coaxial_geometry(PARAMS['f_start'], PARAMS['f_stop'], PARAMS['d_ext'], PARAMS['wall_thick'],
+                           PARAMS['n_sections'], PARAMS['n_outputs'], er)
+    return {k: np.asarray(v).tolist() for k, v in geo.items()}
+
+
+def worst_db(z_sects, sec_len_mm, n_outputs=PARAMS['n_outputs']):
+    er = SUBSTRATE_MATERIALS[PARAMS['diel_material']][0]
+    f_hz = np.linspace(PARAMS['f_start'], PARAMS['f_stop'], 201) * 1e6
+    return 20 * np.log10(np.abs(transformer_s11(z_sects, sec_len_mm / 1000.0, f_hz, n_outputs, er)).max())
+
+
+def test_optimum_beats_nominal_on_true_load(nominal):
+    design = optimize_profile(PARAMS, nominal, n_starts=4, workers=1)
+
+    nominal_db = worst_db(nominal['z_sects'], nominal['sec_len_mm'])
+    optimum_db = worst_db(design['z_sects'], design['sec_len_mm'])
+    assert optimum_db == pytest.approx(design['worst_s11_db'])
+    assert optimum_db < nominal_db - 10
+
+
+def test_optimum_profile_is_a_monotone_transformer(nominal):
+    design = optimize_profile(PARAMS, nominal, n_starts=4, workers=1)
+
+    z = np.asarray(design['z_sects'])
+    assert np.all(np.diff(z) < 0)
+    assert z[0] <= 50.0 and z[-1] >= 50.0 / PARAMS['n_outputs']
+    assert 0.9 < design['sec_len_mm'] / nominal['sec_len_mm'] < 1.1
+
+
+def test_nominal_design_passes_default_spec(nominal):
+    assert worst_db(nominal['z_sects'], nominal['sec_len_mm']) < -20.0
+
+    tight = monte_carlo_yield(PARAMS, nominal, {'main_diams': ('normal', 0.01)}, n_samples=4096, workers=1)
+    assert tight['yield'] > 0.99
+    assert tight['ci_low'] <= tight['yield'] <= tight['ci_high']
+
+
+def test_yield_drops_with_looser_tolerances(nominal):
+    tolerances = {'main_diams': ('normal', 0.2), 'sec_len_mm': ('uniform', 0.2)}
+    loose = monte_carlo_yield(PARAMS, nominal, tolerances, n_samples=4096, workers=1)
+    assert 0.0 < loose['yield'] < 0.9
+    assert loose['n_samples'] == 4096 and loose['n_invalid'] == 0
+
+
+def test_displayed_curves_reproduce_the_optimum():
+    from Calc_Div_EFTX import CoaxialCalculator
+
+    calc = CoaxialCalculator(dict(PARAMS))
+    calc.calculate()
+    design = optimize_profile(PARAMS, calc.results, n_starts=2, freqs_mhz=calc.frequencies, workers=1)
+    calc.results = design
+    calc.calculate_s_parameters()
+    for s11 in (calc.theoretical_return_loss(), calc.s_params_th['S11']):
+        assert 20 * np.log10(np.abs(s11).max()) == pytest.approx(design['worst_s11_db'])
+
+
+def _brute_force_front(costs):
+    ok = ~np.isnan(costs).any(axis=1)
+    return [i for i in np.flatnonzero(ok)
+            if not any(np.all(costs[j] <= costs[i]) and np.any(costs[j] < costs[i]) for j in np.flatnonzero(ok))]
+
+
+def test_pareto_front_matches_brute_force():
+    rng = np.random.default_rng(3)
+    costs = rng.integers(0, 6, size=(300, 3)).astype(float)   # muitos empates
+    costs[rng.choice(300, 20, replace=False), rng.integers(0, 3, 20)] = np.nan
+    assert pareto_front(costs).tolist() == _brute_force_front(costs)
+
+
+def test_design_space_sweep_parallel_matches_serial_and_direct():
+    args = (800.0, 1200.0, [2, 4], [2, 4], [10.0, 20.0], [1.5, 6.0], ["Ar", "Teflon (PTFE)"])
+    serial = design_space_sweep(*args, n_freqs=201, workers=1, chunk_size=5)
+    parallel = design_space_sweep(*args, n_freqs=201, workers=2, chunk_size=5)
+    np.testing.assert_array_equal(serial['worst_s11_db'], parallel['worst_s11_db'])
+    assert serial['pareto'].tolist() == parallel['pareto'].tolist()
+
+    # Parede de 6 mm num tubo de 10 mm: geometria inválida, fora da frente
+    invalid = (serial['d_ext'] == 10.0) & (serial['wall_thick'] == 6.0)
+    assert np.isnan(serial['worst_s11_db'][invalid]).all()
+    assert not invalid[serial['pareto']].any()
+    costs = np.column_stack([serial['worst_s11_db'], serial['len_outer_mm'], serial['d_ext']])
+    assert serial['pareto'].tolist() == _brute_force_front(costs)
+
+    # O candidato do projeto padrão tem a mesma métrica da avaliação direta
+    i = np.flatnonzero((serial['n_sections'] == 4) & (serial['n_outputs'] == 4) & (serial['d_ext'] == 20.0)
+                       & (serial['wall_thick'] == 1.5) & (serial['diel_material'] == "Ar"))[0]
+    er = SUBSTRATE_MATERIALS["Ar"][0]
+    geo = coaxial_geometry(800.0, 1200.0, 20.0, 1.5, 4, 4, er)
+    assert serial['worst_s11_db'][i] == pytest.approx(worst_db(geo['z_sects'], geo['sec_len_mm']), abs=1e-9)
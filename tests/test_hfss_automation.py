@@ -0,0 +1,291 @@
+import math
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from Calc_Div_EFTX import generate_hfss_model
+from hfss_automation import (AedtSession, FaceIndex, JobQueue, MockSolver, ResultStore, StageJournal,
+                             clean_stale_locks, incomplete_projects, recovery_file)
+from mock_aedt import MockDesktop, MockHfss
+
+
+@pytest.fixture
+def state(tmp_path):
+    return str(tmp_path / "queue.json")
+
+
+def test_oversized_job_is_clamped_and_runs(state):
+    q = JobQueue(state, solver=MockSolver(work_s=0.0), max_concurrent=2, cores_per_solve=4, total_cores=8)
+    job_id = q.submit("big.aedt", cores=32)
+    assert q.jobs[job_id]['cores'] == 8
+
+    worker = threading.Thread(target=q.run, kwargs={'poll_s': 0.01})
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert q.jobs[job_id]['status'] == 'done'
+
+
+def test_forever_mode_picks_up_late_submissions(state):
+    done = threading.Event()
+
+    def solver(project, cores):
+        assert q.running_job(project)['meta'] == {'kind': "full"}
+        done.set()
+
+    q = JobQueue(state, solver=solver)
+    threading.Thread(target=q.run, kwargs={'poll_s': 0.01, 'forever': True}, daemon=True).start()
+    q.submit("late.aedt", meta={'kind': "full"})
+    assert done.wait(timeout=5)
+
+
+class Recorder:
+    """
+    Solver que registra ordem de início e o pico de jobs/núcleos simultâneos.
+    """
+
+    def __init__(self, work_s=0.02, fail=()):
+        self.work_s = work_s
+        self.fail = set(fail)
+        self.order = []
+        self.active = self.peak = self.cores = self.peak_cores = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, project, cores):
+        with self.lock:
+            self.order.append(os.path.basename(project))
+            self.active += 1
+            self.cores += cores
+            self.peak = max(self.peak, self.active)
+            self.peak_cores = max(self.peak_cores, self.cores)
+        time.sleep(self.work_s)
+        with self.lock:
+            self.active -= 1
+            self.cores -= cores
+        if os.path.basename(project) in self.fail:
+            raise RuntimeError("falhou")
+
+
+def test_priority_then_submission_order(state):
+    solver = Recorder()
+    q = JobQueue(state, solver=solver, max_concurrent=1)
+    for name, priority in [("c.aedt", 1), ("a.aedt", 0), ("d.aedt", 1), ("b.aedt", 0)]:
+        q.submit(name, priority=priority)
+    q.submit("a.aedt")  # já na fila: ignorado
+    q.run(poll_s=0.01)
+    assert solver.order == ["a.aedt", "b.aedt", "c.aedt", "d.aedt"]
+
+
+def test_concurrency_and_core_budget(state):
+    solver = Recorder()
+    q = JobQueue(state, solver=solver, max_concurrent=3, cores_per_solve=2, total_cores=6)
+    for i in range(6):
+        q.submit(f"p{i}.aedt")
+    q.run(poll_s=0.01)
+    assert solver.peak == 3
+
+    solver = Recorder()
+    q = JobQueue(state + "2", solver=solver, max_concurrent=3, cores_per_solve=2, total_cores=6)
+    q.submit("big.aedt", cores=5)
+    for i in range(3):
+        q.submit(f"p{i}.aedt")
+    q.run(poll_s=0.01)
+    assert solver.peak_cores <= 6
+    assert q.stats()['counts'] == {'done': 4}
+
+
+def test_license_retry_and_failures(state):
+    q = JobQueue(state, solver=MockSolver(work_s=0.0, license_failures=2), license_retry_s=0.0, max_attempts=1)
+    job_id = q.submit("lic.aedt")
+    q.run(poll_s=0.01)
+    # Falta de licença não conta como tentativa
+    assert q.jobs[job_id]['status'] == 'done'
+    assert q.jobs[job_id]['attempts'] == 1
+
+    solver = Recorder(work_s=0.0, fail={"bad.aedt"})
+    q = JobQueue(state + "2", solver=solver, max_attempts=2)
+    bad, good = q.submit("bad.aedt"), q.submit("good.aedt")
+    q.run(poll_s=0.01)
+    assert solver.order.count("bad.aedt") == 2
+    assert (q.jobs[bad]['status'], q.jobs[good]['status']) == ('failed', 'done')
+
+
+def test_interrupted_jobs_are_requeued(state):
+    q = JobQueue(state, solver=Recorder())
+    job_id = q.submit("p.aedt")
+    q.jobs[job_id]['status'] = 'running'
+    q._save()
+
+    solver = Recorder(work_s=0.0)
+    restarted = JobQueue(state, solver=solver)
+    assert restarted.jobs[job_id]['status'] == 'queued'
+    restarted.run(poll_s=0.01)
+    assert solver.order == ["p.aedt"]
+    assert restarted.jobs[job_id]['status'] == 'done'
+
+
+def test_face_index_estimate_matches_measured_naive_loop(mock_session, geometry):
+    project = generate_hfss_model(geometry, queue.Queue(), session=mock_session)
+    with mock_session.design(project, "DivisorCoaxial") as hfss:
+        diel = hfss.modeler["Volume_Diel"]
+        r, z = geometry['len_inner_mm'] * 0.1, geometry['len_inner_mm']
+        points = [[r * math.cos(a), r * math.sin(a), z]
+                  for a in np.radians(360 * np.arange(geometry['n_outputs']) / geometry['n_outputs'])]
+        points.append([1e3, 1e3, 1e3])  # nenhuma face confere
+
+        # Laço original por face, medido pelo gravador de chamadas do backend
+        start = len(hfss.calls)
+        naive = []
+        for point in points:
+            for face in diel.faces:
+                center = face.center
+                if center and np.linalg.norm(np.array(center) - np.array(point)) < 1e-3:
+                    naive.append(face.id)
+                    break
+        measured = sum(name in ("object.faces", "face.center") for name, _, _ in hfss.calls[start:])
+
+        start = len(hfss.calls)
+        index = FaceIndex(diel.faces)
+        found = [index.nearest(point) for point in points]
+        rep = index.report()
+
+    assert [f.id for f in found if f is not None] == naive and found[-1] is None
+    assert len(naive) == geometry['n_outputs']
+    assert rep['naive_api_calls_estimate'] == measured
+    assert rep['api_calls'] == len(hfss.calls) - start == rep['faces'] + 1
+
+
+def test_result_store_round_trip(tmp_path):
+    src = tmp_path / "div.s5p"
+    src.write_text("# Hz S RI R 50\n1e9 0 0\n")
+    store = ResultStore(str(tmp_path / "store"))
+    assert store.lookup("ab12") is None
+
+    stored = store.put("ab12", str(src), {'project': "div.aedt"})
+    assert store.lookup("ab12") == stored
+    dest = store.materialize("ab12", str(tmp_path / "novo"))
+    assert dest == str(tmp_path / "novo.s5p") and open(dest).read() == src.read_text()
+    assert store.materialize("cd34", str(tmp_path / "outro")) is None
+    assert (store.hits, store.misses) == (2, 2)
+
+
+def test_interrupted_materialize_leaves_no_touchstone(tmp_path, monkeypatch):
+    src = tmp_path / "div.s5p"
+    src.write_text("# Hz S RI R 50\n" + "1e9 0 0\n" * 1000)
+    store = ResultStore(str(tmp_path / "store"))
+    store.put("ab12", str(src))
+
+    def killed(a, b):
+        with open(a, 'rb') as fa, open(b, 'wb') as fb:
+            fb.write(fa.read(100))
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(shutil, "copyfile", killed)
+    with pytest.raises(KeyboardInterrupt):
+        store.materialize("ab12", str(tmp_path / "novo"))
+    assert sorted(os.listdir(tmp_path)) == ["div.s5p", "store"]
+    monkeypatch.undo()
+
+    dest = store.materialize("ab12", str(tmp_path / "novo"))
+    assert open(dest).read() == src.read_text()
+    assert store.stats() == {'entries': 1, 'hits': 2, 'misses': 0}
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_stale_lock_removed_only_for_a_dead_owner(tmp_path):
+    project = str(tmp_path / "div.aedt")
+    for suffix in (".lock", ".auto"):
+        open(project + suffix, 'w').close()
+
+    # Sem dono registrado (pode estar aberto em outro AEDT) ou dono vivo: nada muda
+    assert clean_stale_locks(project) == []
+    assert clean_stale_locks(project, os.getpid()) == []
+    assert os.path.exists(project + ".lock")
+
+    assert clean_stale_locks(project, _dead_pid()) == [project + ".lock"]
+    assert not os.path.exists(project + ".lock")
+    assert recovery_file(project) == project + ".auto"
+
+
+def test_stage_journal_resumes_and_resets_on_new_key(tmp_path):
+    project = str(tmp_path / "div.aedt")
+    journal = StageJournal(project, key="k1")
+    journal.claim()
+    journal.complete("geometry")
+    journal.complete("materials")
+
+    again = StageJournal(project, key="k1")
+    assert again.state['owner_pid'] == os.getpid()
+    assert again.done("materials") and not again.done("ports")
+    assert again.last_stage == "materials" and not again.finished
+    assert incomplete_projects(str(tmp_path)) == [project]
+
+    again.reset("materials")
+    assert StageJournal(project).last_stage == "geometry"
+    assert StageJournal(project, key="k2").last_stage is None
+
+
+def test_session_reuses_desktop_and_open_projects(mock_session):
+    with mock_session.design("a.aedt", "D1") as first:
+        pass
+    with mock_session.design("a.aedt", "D1") as again:
+        assert again is first
+    with mock_session.design("b.aedt", "D1") as other:
+        assert other is not first
+    assert mock_session.stats() == {'startups': 1, 'reconnects': 0, 'open_projects': 2, 'alive': True}
+
+
+def test_session_closes_least_recently_used_project():
+    session = AedtSession(max_open_projects=2, desktop_cls=MockDesktop, hfss_cls=MockHfss)
+    try:
+        apps = {}
+        for name in ("a.aedt", "b.aedt", "a.aedt", "c.aedt"):
+            with session.design(name) as app:
+                apps.setdefault(name, app)
+        # "b" foi o menos usado: fechado (salvando) e reaberto do zero
+        assert apps["b.aedt"].call_counts().get("close_project") == 1
+        assert "close_project" not in apps["a.aedt"].call_counts()
+        with session.design("b.aedt") as app:
+            assert app is not apps["b.aedt"]
+    finally:
+        session.close()
+
+
+def test_session_reattaches_after_desktop_crash(mock_session):
+    with mock_session.design("a.aedt") as before:
+        pass
+    mock_session._desktop.kill()
+    with mock_session.design("a.aedt") as after:
+        # Apps do desktop morto não são reaproveitados
+        assert after is not before
+    assert (mock_session.startups, mock_session.reconnects) == (1, 1)
+    assert mock_session.is_alive()
+
+
+def test_session_starts_new_desktop_when_reattach_fails():
+    def desktop(new_desktop=True, **kwargs):
+        if not new_desktop:
+            raise RuntimeError("porta gRPC não responde")
+        return MockDesktop(new_desktop=new_desktop, **kwargs)
+
+    session = AedtSession(desktop_cls=desktop, hfss_cls=MockHfss)
+    try:
+        session.ensure_alive()
+        session._desktop.kill()
+        session.ensure_alive()
+        assert (session.startups, session.reconnects) == (2, 1)
+        assert session.is_alive()
+    finally:
+        session.close()
@@ -0,0 +1,47 @@
+import queue
+
+import numpy as np
+import pytest
+
+from Calc_Div_EFTX import generate_hfss_model
+from hfss_automation import AedtSession
+from mock_aedt import MockDesktop, MockHfss, benchmark_pipeline
+from touchstone_io import load_network
+
+PARAMS = {'f_start': 800.0, 'f_stop': 1200.0, 'd_ext': 20.0, 'wall_thick': 1.5, 'n_sections': 4,
+          'n_outputs': 4, 'diel_material': "Ar"}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for var in ("XDG_CACHE_HOME", "LOCALAPPDATA"):
+        monkeypatch.setenv(var, str(tmp_path / "cache"))
+    return tmp_path
+
+
+def test_benchmark_pipeline_reproduces_the_theory(workdir):
+    result = benchmark_pipeline(PARAMS, workdir=str(workdir), latency_s=0.0)
+    assert result['max_s11_error'] < 1e-12
+    counts = result['call_counts']
+    assert counts['analyze_setup'] == counts['export_touchstone'] == 1
+    assert counts['wave_port'] == PARAMS['n_outputs'] + 1
+    assert result['api_calls'] == sum(counts.values())
+    assert load_network(result['touchstone']).nports == PARAMS['n_outputs'] + 1
+
+
+def test_saved_project_reloads_like_aedt(workdir, geometry):
+    session = AedtSession(desktop_cls=MockDesktop, hfss_cls=MockHfss)
+    try:
+        project = generate_hfss_model(geometry, queue.Queue(), session=session)
+        built = next(iter(session._apps.values()))
+    finally:
+        session.close()
+
+    reopened = MockHfss(project=project)
+    # O estado vem do arquivo salvo: só o construtor foi chamado
+    assert list(reopened.call_counts()) == ["Hfss"]
+    assert reopened.variable_manager.variables == built.variable_manager.variables
+    assert sorted(reopened.modeler.object_names) == sorted(built.modeler.object_names)
+    assert reopened.ports == built.ports
+    np.testing.assert_allclose(reopened.synthetic_network().s, built.synthetic_network().s)
@@ -0,0 +1,68 @@
+"""
+Pipeline exportar → resolver → importar contra o backend simulado
+(`mock_aedt`), sem Ansys.
+"""
+import os
+import queue
+
+import numpy as np
+
+import Calc_Div_EFTX as app
+
+
+def test_simulation_key_ignores_the_advised_setup(geometry):
+    advised = {'MaximumPasses': 8, 'MaxDeltaS': 0.02, 'sweep_type': "Fast", 'basis': []}
+    key = app.simulation_key({**geometry, 'hfss_setup': advised})
+    assert app.simulation_key({**geometry, 'hfss_setup': {**advised, 'MaximumPasses': 12, 'basis': ["x"]}}) == key
+    assert app.simulation_key(geometry) == key
+
+    user = {'MaximumPasses': 12, 'MaxDeltaS': 0.01}
+    assert app.simulation_key({**geometry, 'hfss_setup': user}) != key
+    assert app.simulation_key({**geometry, 'sec_len_mm': geometry['sec_len_mm'] * 1.01}) != key
+
+
+def test_cached_solution_skips_the_solve(mock_session, geometry):
+    status = queue.Queue()
+    params = app.with_hfss_setup(geometry)
+    key = app.simulation_key(params)
+    assert app.cached_solution(params) is None
+
+    project = app.generate_hfss_model(params, status, session=mock_session)
+    solved = app.run_hfss_simulation(project, status, session=mock_session, cache_key=key)
+    stored = app.cached_solution(params)
+    assert stored and open(stored).read() == open(solved).read()
+
+    # Outro projeto com a mesma geometria: o Touchstone vem do cache, sem resolver
+    other = os.path.join(os.path.dirname(project), "outro.aedt")
+    hfss = next(iter(mock_session._apps.values()))
+    before = hfss.call_counts()['analyze_setup']
+    assert before == 1
+    touchstone = app.run_hfss_simulation(other, status, session=mock_session, cache_key=key)
+    assert touchstone == os.path.splitext(other)[0] + os.path.splitext(stored)[1]
+    assert hfss.call_counts()['analyze_setup'] == before
+    assert not os.path.exists(other)
+
+
+def test_interrupted_export_resumes_from_the_journal(mock_session, geometry, monkeypatch):
+    status = queue.Queue()
+    project = app._new_project_path()
+    build_ports = app._model_ports
+
+    def crash(*args):
+        raise RuntimeError("AEDT caiu")
+
+    monkeypatch.setattr(app, "_model_ports", crash)
+    assert app.generate_hfss_model(geometry, status, session=mock_session, project_path=project) is None
+    monkeypatch.setattr(app, "_model_ports", build_ports)
+    open(project + ".auto", 'w').close()
+
+    touchstone = app.resume_pipeline(project, geometry, status, session=mock_session)
+    messages = list(status.queue)
+    assert "Etapa 'geometry' já concluída; retomando." in messages
+    assert "Etapa 'materials' já concluída; retomando." in messages
+    assert any("recuperação" in m for m in messages)
+    assert os.path.exists(project + ".auto")
+
+    assert app.StageJournal(project).finished
+    assert touchstone == os.path.splitext(project)[0] + f".s{geometry['n_outputs'] + 1}p"
+    assert app.load_network(touchstone).s.shape[1:] == (5, 5)
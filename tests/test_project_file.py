@@ -0,0 +1,23 @@
+import numpy as np
+
+from project_file import load_project_file, save_project_file
+
+
+def test_round_trip_and_cached_results(tmp_path):
+    path = str(tmp_path / "div.coaxproj")
+    freqs = np.linspace(800, 1200, 401)
+    s11 = np.exp(-1j * freqs / 100) * 0.1
+    results = {'z_sects': list(np.linspace(45, 14, 4)), 'sec_len_mm': 74.9, 'profile': list(np.arange(300.0))}
+    save_project_file(path, {'f_start': 800}, results, freqs, {'S11': s11})
+
+    project = load_project_file(path)
+    assert project.results is project.results
+    assert project.results['sec_len_mm'] == 74.9
+    np.testing.assert_array_equal(project.results['profile'], results['profile'])
+    np.testing.assert_array_equal(project.frequencies, freqs)
+    np.testing.assert_array_equal(project.s_params_th['S11'], s11)
+
+    # Regravar por cima do arquivo aberto (os.replace) a partir de cópias
+    save_project_file(path, project.params, project.results, np.array(project.frequencies),
+                      {k: np.array(v) for k, v in project.s_params_th.items()})
+    np.testing.assert_array_equal(load_project_file(path).s_params_th['S11'], s11)
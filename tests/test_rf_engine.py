@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+from skrf import Frequency, Network
+from skrf.media import DefinedGammaZ0, DistributedCircuit
+
+from rf_engine import (SUBSTRATE_MATERIALS, NetworkCache, adaptive_frequency_grid, cascade_abcd,
+                       chebyshev_impedances, coax_phase_constant, evaluate_designs, loaded_divider_s11,
+                       loaded_divider_s11_gradient, sector_mode_count, sector_to_full_smatrix,
+                       transformer_s11, transformer_s11_gradient)
+
+FREQ = Frequency(0.8, 1.2, 41, unit='GHz')
+Z_SECTS = chebyshev_impedances(4, 4)
+SEC_LEN_M = 0.075
+
+
+def test_loaded_divider_matches_skrf_cascade():
+    # Modelo de `calculate_s_parameters`: linhas DistributedCircuit + resistor N·50
+    media = DistributedCircuit(frequency=FREQ, z0=50)
+    ntw = media.line(0, 'm')
+    for z in Z_SECTS:
+        ntw = ntw ** DistributedCircuit(frequency=FREQ, z0=z).line(SEC_LEN_M, 'm')
+    ntw = ntw ** media.resistor(4 * 50)
+    np.testing.assert_allclose(loaded_divider_s11(Z_SECTS, SEC_LEN_M, FREQ.f, 4), ntw.s[:, 0, 0], atol=1e-12)
+
+
+def test_cascade_abcd_matches_skrf_with_physical_phase():
+    er = 2.1
+    lengths = np.array([0.07, 0.075, 0.08, 0.065])
+    gamma = 1j * coax_phase_constant(FREQ.f, er)
+    ntw = None
+    for z, length in zip(Z_SECTS, lengths):
+        line = DefinedGammaZ0(frequency=FREQ, gamma=gamma, z0=z).line(length, 'm')
+        ntw = line if ntw is None else ntw ** line
+    A, B, C, D = cascade_abcd(Z_SECTS, lengths, FREQ.f, er=er)
+    abcd = np.moveaxis(np.array([[A, B], [C, D]]), -1, 0)
+    np.testing.assert_allclose(abcd, ntw.a, rtol=1e-9, atol=1e-9)
+
+
+def test_cascade_abcd_batches_designs():
+    z = np.stack([Z_SECTS, Z_SECTS * 1.1, Z_SECTS[::-1]])
+    batched = cascade_abcd(z, SEC_LEN_M, FREQ.f)
+    for i, row in enumerate(z):
+        for got, want in zip(batched, cascade_abcd(row, SEC_LEN_M, FREQ.f)):
+            np.testing.assert_allclose(got[i], want, rtol=1e-12)
+
+
+@pytest.mark.parametrize("model", ["transformer", "loaded"])
+def test_adjoint_gradient_matches_finite_differences(model):
+    er, n_out = 1.0, 4
+    if model == "transformer":
+        s11 = lambda z, l: transformer_s11(z, l, FREQ.f, n_out, er)
+        s, ds_dz, ds_dl = transformer_s11_gradient(Z_SECTS, SEC_LEN_M, FREQ.f, n_out, er)
+    else:
+        s11 = lambda z, l: loaded_divider_s11(z, l, FREQ.f, n_out)
+        s, ds_dz, ds_dl = loaded_divider_s11_gradient(Z_SECTS, SEC_LEN_M, FREQ.f, n_out)
+    lengths = np.full(len(Z_SECTS), SEC_LEN_M)
+    np.testing.assert_allclose(s, s11(Z_SECTS, lengths), atol=1e-12)
+
+    for k in range(len(Z_SECTS)):
+        dz, dl = np.zeros_like(Z_SECTS), np.zeros_like(lengths)
+        dz[k], dl[k] = 1e-5, 1e-8
+        fd_z = (s11(Z_SECTS + dz, lengths) - s11(Z_SECTS - dz, lengths)) / 2e-5
+        fd_l = (s11(Z_SECTS, lengths + dl) - s11(Z_SECTS, lengths - dl)) / 2e-8
+        np.testing.assert_allclose(ds_dz[k], fd_z, rtol=1e-5, atol=1e-8)
+        np.testing.assert_allclose(ds_dl[k], fd_l, rtol=1e-5, atol=1e-6)
+
+
+def _symmetric_divider(n, n_freq, seed):
+    """
+    Matriz S de N+1 portas com simetria rotacional (entrada acoplada igual
+    a todas as saídas, bloco das saídas circulante e recíproco).
+    """
+    rng = np.random.default_rng(seed)
+    cplx = lambda *shape: rng.normal(size=shape) + 1j * rng.normal(size=shape)
+    c = cplx(n, n_freq) * 0.1
+    c = (c + c[(-np.arange(n)) % n]) / 2
+    s = np.empty((n_freq, n + 1, n + 1), dtype=complex)
+    s[:, 0, 0] = cplx(n_freq) * 0.1
+    s[:, 0, 1:] = s[:, 1:, 0] = (cplx(n_freq) * 0.3)[:, None]
+    k = np.arange(n)
+    s[:, 1:, 1:] = np.moveaxis(c[(k[:, None] - k[None, :]) % n], -1, 0)
+    return s, np.fft.fft(c, axis=0)
+
+
+@pytest.mark.parametrize("n", [2, 3, 4, 5, 8])
+def test_sector_modes_rebuild_full_smatrix(n):
+    full, gamma = _symmetric_divider(n, 7, seed=n)
+    modes = np.zeros((sector_mode_count(n), 7, 2, 2), dtype=complex)
+    modes[:, :, 0, 0] = 1.0  # modos m > 0 não acoplam à entrada TEM
+    modes[:, :, 1, 1] = gamma[:sector_mode_count(n)]
+    modes[0, :, 0, 0] = full[:, 0, 0]
+    modes[0, :, 1, 0] = modes[0, :, 0, 1] = np.sqrt(n) * full[:, 1, 0]
+    np.testing.assert_allclose(sector_to_full_smatrix(modes, n), full, atol=1e-12)
+
+
+def test_sector_mode_count_is_checked():
+    with pytest.raises(ValueError):
+        sector_to_full_smatrix(np.zeros((2, 5, 2, 2)), 8)
+
+
+def test_network_cache_hands_out_private_copies():
+    cache = NetworkCache(maxsize=2)
+    build = lambda: Network(frequency=FREQ, s=np.zeros((len(FREQ), 2, 2), dtype=complex), z0=50)
+    ntw = cache.get_or_compute("a", build)
+    ntw.s[:, 0, 0] = 1.0
+    ntw.renormalize(75)
+    again = cache.get_or_compute("a", build)
+    assert np.all(again.s == 0) and np.all(again.z0 == 50)
+
+    s11 = cache.get_or_compute("b", lambda: np.ones(3))
+    with pytest.raises(ValueError):
+        s11[0] = 0.0
+    cache.get_or_compute("c", lambda: {'S11': np.ones(3)})['S21'] = None
+    assert list(cache.get_or_compute("c", dict)) == ['S11']
+
+    # LRU: "a" foi o menos usado e saiu
+    assert cache.stats() == {'hits': 2, 'misses': 3, 'size': 2, 'maxsize': 2}
+    cache.get_or_compute("a", build)
+    assert cache.stats()['misses'] == 4
+
+
+def test_adaptive_grid_refines_only_where_needed():
+    # Ressonância estreita em 1000 MHz sobre um fundo suave
+    model = lambda f: 0.1 * f / 1000 + 0.5 / (1 + 1j * (f - 1000.0) / 2.0)
+    f, s = adaptive_frequency_grid(model, 800.0, 1200.0, tol=1e-3)
+    np.testing.assert_array_equal(s, model(f))
+    assert np.all(np.diff(f) > 0) and f[0] == 800.0 and f[-1] == 1200.0
+    assert len(f) < 1000
+
+    near = np.abs(f - 1000.0) < 20
+    assert near.sum() > (~near).sum()
+    dense = np.linspace(800.0, 1200.0, 40001)
+    interp = np.interp(dense, f, s.real) + 1j * np.interp(dense, f, s.imag)
+    assert np.abs(interp - model(dense)).max() < 1e-2
+
+
+def test_evaluate_designs_matches_one_design_at_a_time():
+    # Seções, saídas e dielétricos misturados: grupos irregulares por n_sections
+    designs = [(800, 1200, 20, 1.5, 4, 4, "Ar"), (1500, 2500, 15, 1.0, 2, 2, "Teflon (PTFE)"),
+               (700, 900, 30, 2.0, 3, 8, "FR-4"), (900, 1100, 20, 1.5, 4, 2, "Teflon (PTFE)")]
+    out = evaluate_designs(*(np.array(column) for column in zip(*designs)), n_freqs=51)
+    assert out['S11'].shape == out['S21'].shape == (len(designs), 51)
+    for i, (f_start, f_stop, _, _, n, n_out, material) in enumerate(designs):
+        er = SUBSTRATE_MATERIALS[material][0]
+        np.testing.assert_allclose(out['frequencies'][i], np.linspace(f_start, f_stop, 51))
+        s11 = transformer_s11(out['z_sects'][i, :n], out['sec_len_mm'][i] / 1000.0,
+                              out['frequencies'][i] * 1e6, n_out, er)
+        np.testing.assert_allclose(out['S11'][i], s11, rtol=0, atol=1e-12)
+        # Sem perdas: a potência refletida mais a das N saídas é a incidente
+        np.testing.assert_allclose(np.abs(out['S11'][i]) ** 2 + n_out * np.abs(out['S21'][i]) ** 2, 1.0,
+                                   rtol=1e-12)
@@ -0,0 +1,99 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+from skrf import Frequency, Network
+
+import touchstone_io
+from touchstone_io import (build_results_cube, iter_touchstone, read_header, read_touchstone,
+                           read_touchstone_cached, sector_mode_export)
+
+
+def _write(path, n_ports, seed=0):
+    rng = np.random.default_rng(seed)
+    s = rng.normal(size=(21, n_ports, n_ports)) + 1j * rng.normal(size=(21, n_ports, n_ports))
+    Network(frequency=Frequency(0.8, 1.2, 21, unit='GHz'), s=0.1 * s).write_touchstone(str(path))
+
+
+def _rows(path, rows):
+    with open(path, "w", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["*"] + list(rows[0]))
+        writer.writeheader()
+        writer.writerows({"*": i, **row} for i, row in enumerate(rows, start=1))
+
+
+@pytest.fixture
+def projects(tmp_path):
+    # Varredura paramétrica de dois designs completos de 3 portas
+    _rows(tmp_path / "div_variacoes.csv", [{"sec_len": "70mm"}, {"sec_len": "75mm"}])
+    for i in (1, 2):
+        _write(tmp_path / f"div_design{i:03d}.s3p", 3, seed=i)
+    # Modelo de setor: três modos de 2 portas e a matriz completa reconstruída
+    _rows(tmp_path / "setor_variacoes.csv", [{"fase_setor": f"{a}deg"} for a in (0, 90, 180)])
+    for i in (1, 2, 3):
+        _write(tmp_path / f"setor_design{i:03d}.s2p", 2, seed=10 + i)
+    _write(tmp_path / "setor.s3p", 3, seed=20)
+    return tmp_path
+
+
+def test_sector_modes_are_not_designs(projects):
+    assert sector_mode_export(str(projects / "setor_design002.s2p"))
+    assert not sector_mode_export(str(projects / "div_design002.s3p"))
+    assert not sector_mode_export(str(projects / "setor.s3p"))
+
+    cube = build_results_cube(str(projects), workers=1)
+    names = sorted(map(os.path.basename, cube.paths))
+    assert names == ["div_design001.s3p", "div_design002.s3p", "setor.s3p"]
+    assert cube.s.shape[2:] == (3, 3)
+    np.testing.assert_allclose(np.sort(cube.params['sec_len']), [70.0, 75.0, np.nan])
+
+
+def test_sidecar_restamped_after_hash_match(tmp_path, monkeypatch):
+    path = str(tmp_path / "div.s3p")
+    _write(path, 3)
+    f, s, _, cached = read_touchstone_cached(path)
+    assert not cached
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+
+    hashed = []
+    digest = touchstone_io._source_digest
+    monkeypatch.setattr(touchstone_io, "_source_digest", lambda p: hashed.append(p) or digest(p))
+    for _ in range(2):
+        f2, s2, _, cached = read_touchstone_cached(path)
+        assert cached
+        np.testing.assert_array_equal(s2, s)
+    assert len(hashed) == 1
+
+
+@pytest.mark.parametrize("form", ["ri", "ma", "db"])
+@pytest.mark.parametrize("n_ports", [1, 2, 3, 5])
+def test_iter_touchstone_matches_skrf(tmp_path, n_ports, form):
+    rng = np.random.default_rng(n_ports)
+    s = 0.5 * (rng.normal(size=(101, n_ports, n_ports)) + 1j * rng.normal(size=(101, n_ports, n_ports)))
+    path = str(tmp_path / f"div.s{n_ports}p")
+    Network(frequency=Frequency(0.8, 1.2, 101, unit='GHz'), s=s).write_touchstone(path, form=form)
+    ref = Network(path)
+
+    # Blocos pequenos: registros de várias linhas cortados no meio
+    chunks = list(iter_touchstone(path, chunk_bytes=97))
+    assert len(chunks) > 1
+    np.testing.assert_allclose(np.concatenate([c[0] for c in chunks]), ref.f)
+    np.testing.assert_allclose(np.concatenate([c[1] for c in chunks]), ref.s, rtol=1e-9, atol=1e-12)
+
+    f, s_read, header = read_touchstone(path)
+    assert header['n_ports'] == read_header(path)['n_ports'] == n_ports
+    np.testing.assert_allclose(f, ref.f)
+    np.testing.assert_allclose(s_read, ref.s, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(header['z0'], ref.z0[0])
+
+
+@pytest.mark.parametrize("chunk_bytes", [16, 1 << 20])
+def test_malformed_value_names_file_and_line(tmp_path, chunk_bytes):
+    path = tmp_path / "bad.s1p"
+    path.write_text("! comentário\n# GHZ S RI R 50\n"
+                    "0.8 0.1 0.2\n"
+                    "0.9 0.1 0.2abc ! truncado em silêncio pelo np.fromstring\n"
+                    "1.0 0.1 0.2\n")
+    with pytest.raises(ValueError, match=rf"bad\.s1p, linha 4: valor inválido '0\.2abc'"):
+        read_touchstone(str(path), chunk_bytes=chunk_bytes)
@@ -0,0 +1,572 @@
+"""
+Leitura rápida de arquivos Touchstone (.sNp) sem GUI.
+
+O cabeçalho (linha de opções, palavras-chave da versão 2 e comentários) é
+lido linha a linha; o corpo numérico é lido em blocos de bytes, os
+comentários são removidos por expressão regular e os números convertidos
+de uma vez pelo NumPy. Cada bloco vira um trecho (frequências, S) no mesmo
+formato do scikit-rf (freq, porta, porta), então arquivos maiores que a
+memória podem ser percorridos com `iter_touchstone`.
+
+Na primeira leitura com cache, um arquivo binário `<arquivo>.cache` é
+gravado ao lado do Touchstone (frequências e tensor S, por coluna); as
+aberturas seguintes apenas mapeiam esse arquivo em memória.
+
+`build_results_cube` importa todos os Touchstone de um diretório de
+projetos em processos paralelos e monta um único array (design, freq,
+porta, porta) indexado pelas variáveis de cada design.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from skrf.frequency import Frequency
+from skrf.network import Network
+
+from aedt_logs import parse_aedt_project, parse_quantity
+from shared_pool import run_chunked
+
+# --------------------------------------------------------------------
+# 1. Cabeçalho
+# --------------------------------------------------------------------
+FREQ_SCALE = {'HZ': 1.0, 'KHZ': 1e3, 'MHZ': 1e6, 'GHZ': 1e9}
+DATA_FORMATS = ('MA', 'DB', 'RI')
+CHUNK_BYTES = 1 << 24           # 16 MiB por leitura do corpo
+
+_PORTS_IN_NAME = re.compile(r"\.s(\d+)p$", re.I)
+_COMMENT = re.compile(rb"![^\n]*")
+
+
+def _option_line(header, text):
+    tokens = text[1:].upper().split()
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in FREQ_SCALE:
+            header['scale'] = FREQ_SCALE[token]
+        elif token in DATA_FORMATS:
+            header['format'] = token
+        elif token == 'R' and i + 1 < len(tokens):
+            header['z0'] = np.full(header['n_ports'] or 1, float(tokens[i + 1]))
+            i += 1
+        elif token in ('Y', 'Z', 'H', 'G'):
+            raise ValueError(f"Parâmetros {token} não suportados; só S.")
+        elif token != 'S':
+            raise ValueError(f"Linha de opções inválida: {text!r}")
+        i += 1
+
+
+def _keyword(header, name, value):
+    name = name.strip().lower()
+    if name == 'version':
+        header['version'] = float(value)
+    elif name == 'number of ports':
+        header['n_ports'] = int(value)
+        header['z0'] = np.full(header['n_ports'], header['z0'][0])
+    elif name == 'two-port data order':
+        header['two_port_order'] = value.strip()
+    elif name == 'number of frequencies':
+        header['n_freqs'] = int(value)
+    elif name == 'matrix format':
+        if value.strip().lower() != 'full':
+            raise ValueError(f"[Matrix Format] {value.strip()} não suportado; só Full.")
+    elif name == 'reference':
+        header['reference'] = value.split()
+    elif name != 'network data':
+        raise ValueError(f"Palavra-chave [{name}] não suportada.")
+
+
+def read_header(path):
+    """
+    Cabeçalho de um Touchstone: {'n_ports', 'scale' (Hz por unidade),
+    'format' (MA/DB/RI), 'z0' (por porta), 'version', 'two_port_order',
+    'n_freqs' (só v2), 'comments' e 'data_offset' (byte do primeiro dado)}.
+    """
+    m = _PORTS_IN_NAME.search(path)
+    header = {'n_ports': int(m.group(1)) if m else None, 'scale': 1e9, 'format': 'MA',
+              'z0': np.full(int(m.group(1)) if m else 1, 50.0), 'version': 1.0, 'two_port_order': '21_12',
+              'n_freqs': None, 'comments': [], 'data_offset': None}
+    pos = 0
+    with open(path, 'rb') as f:
+        for raw in iter(f.readline, b""):
+            line = raw.decode('latin-1')
+            text, _, comment = line.partition("!")
+            text = text.strip()
+            if comment.strip():
+                header['comments'].append(comment.strip())
+            if ('reference' in header and len(header['reference']) < (header['n_ports'] or 0)
+                    and text and not text.startswith("[")):
+                # [Reference] pode continuar nas linhas seguintes
+                header['reference'] += text.split()
+            elif text.startswith("#"):
+                _option_line(header, text)
+            elif text.startswith("["):
+                name, _, value = text[1:].partition("]")
+                _keyword(header, name, value)
+                if name.strip().lower() == 'network data':
+                    header['data_offset'] = pos + len(raw)
+                    break
+            elif text:
+                header['data_offset'] = pos
+                break
+            pos += len(raw)
+    if header['n_ports'] is None:
+        raise ValueError(f"{path}: número de portas desconhecido (nem .sNp nem [Number of Ports]).")
+    if header['data_offset'] is None:
+        raise ValueError(f"{path}: nenhum dado de rede.")
+    if 'reference' in header:
+        header['z0'] = np.asarray(header.pop('reference')[:header['n_ports']], dtype=float)
+    header['z0'] = np.broadcast_to(header['z0'], (header['n_ports'],)).copy()
+    return header
+
+
+# --------------------------------------------------------------------
+# 2. Corpo numérico
+# --------------------------------------------------------------------
+def _decode(rows, header):
+    """
+    Registros (freq + 2·N² números) → (f em Hz, S complexo (freq, N, N)).
+    """
+    n = header['n_ports']
+    a, b = rows[:, 1::2], rows[:, 2::2]
+    if header['format'] == 'RI':
+        s = a + 1j * b
+    else:
+        magnitude = a if header['format'] == 'MA' else 10.0 ** (a / 20.0)
+        s = magnitude * np.exp(1j * np.deg2rad(b))
+    s = s.reshape(-1, n, n)
+    if n == 2 and header['two_port_order'] == '21_12':
+        # 2 portas: S11 S21 S12 S22 (ordem por coluna)
+        s = s.transpose(0, 2, 1)
+    return rows[:, 0] * header['scale'], s
+
+
+def _parse_numbers(data, path, line_no):
+    """
+    Números de um trecho do corpo (sem comentários). Qualquer texto que não
+    seja número é erro, com o arquivo e a linha (`line_no` é a do início
+    do trecho).
+    """
+    try:
+        return np.array(data.split(), dtype=float)
+    except ValueError:
+        for offset, line in enumerate(data.split(b"\n")):
+            for token in line.split():
+                try:
+                    float(token)
+                except ValueError:
+                    raise ValueError(f"{path}, linha {line_no + offset}: valor inválido "
+                                     f"{token.decode('latin-1')!r}.") from None
+        raise
+
+
+def iter_touchstone(path, chunk_bytes=CHUNK_BYTES, header=None):
+    """
+    Gera trechos (f em Hz, S (freq, N, N)) de `path` lendo no máximo
+    `chunk_bytes` de texto por vez. Registros que atravessam o limite de um
+    bloco são completados no seguinte. Texto não numérico no corpo gera
+    ValueError com o arquivo e a linha.
+    """
+    header = header or read_header(path)
+    n = header['n_ports']
+    width = 1 + 2 * n * n
+    carry = np.empty(0)
+    tail = b""
+    with open(path, 'rb') as f:
+        line_no = f.read(header['data_offset']).count(b"\n") + 1
+        while True:
+            block = f.read(chunk_bytes)
+            last = not block
+            data = tail + block
+            if not last:
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    # Linha maior que o bloco: junta com o próximo
+                    tail = data
+                    continue
+                data, tail = data[:cut], data[cut:]
+            if b"!" in data:
+                data = _COMMENT.sub(b"", data)
+            keyword = data.find(b"[")
+            if keyword >= 0:
+                # v2: [End], [Noise Data]... encerram a matriz de rede
+                data, last = data[:keyword], True
+            values = _parse_numbers(data, path, line_no)
+            line_no += data.count(b"\n")
+            if carry.size:
+                values = np.concatenate([carry, values])
+            count = values.size // width
+            carry = values[count * width:]
+            if count:
+                yield _decode(values[:count * width].reshape(count, width), header)
+            if last:
+                break
+    if carry.size:
+        raise ValueError(f"{path}: último registro incompleto ({carry.size} de {width} números).")
+
+
+def read_touchstone(path, chunk_bytes=CHUNK_BYTES):
+    """
+    Arquivo inteiro: (f em Hz, S (freq, N, N), cabeçalho).
+    """
+    header = read_header(path)
+    chunks = list(iter_touchstone(path, chunk_bytes, header))
+    if not chunks:
+        raise ValueError(f"{path}: nenhum ponto de frequência.")
+    if len(chunks) == 1:
+        f, s = chunks[0]
+    else:
+        f = np.concatenate([c[0] for c in chunks])
+        s = np.concatenate([c[1] for c in chunks])
+    if header['n_freqs'] is not None and len(f) != header['n_freqs']:
+        raise ValueError(f"{path}: {len(f)} frequências, [Number of Frequencies] diz {header['n_freqs']}.")
+    return f, s, header
+
+
+# --------------------------------------------------------------------
+# 3. Cache binário ao lado do Touchstone
+# --------------------------------------------------------------------
+SIDECAR_MAGIC = b"TSCACHE1"
+SIDECAR_SUFFIX = ".cache"
+_ALIGN = 64
+
+
+def sidecar_path(path):
+    return path + SIDECAR_SUFFIX
+
+
+def _source_digest(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def write_sidecar(path, f, s, header):
+    """
+    Grava `<path>.cache`: cabeçalho JSON (origem, checksum SHA-1 do
+    Touchstone, portas, z0, deslocamentos) seguido das frequências
+    (float64) e de S (complex128) na ordem (porta, porta, freq), de modo
+    que cada parâmetro S_ij é contíguo. A gravação é atômica.
+    """
+    n_freqs, n = s.shape[0], s.shape[1]
+    meta = {
+        'source': os.path.basename(path), **_source_stamp(path), 'sha1': _source_digest(path),
+        'n_ports': n, 'n_freqs': n_freqs, 'z0': [float(z) for z in np.real(header['z0'])],
+    }
+    # Os deslocamentos dependem do tamanho do cabeçalho; reserva espaço fixo
+    head = len(SIDECAR_MAGIC) + 8 + len(json.dumps({**meta, 'f_offset': 0, 's_offset': 0})) + 64
+    meta['f_offset'] = -(-head // _ALIGN) * _ALIGN
+    meta['s_offset'] = meta['f_offset'] + -(-n_freqs * 8 // _ALIGN) * _ALIGN
+    encoded = json.dumps(meta).encode()
+    target = sidecar_path(path)
+    tmp = f"{target}.tmp"
+    with open(tmp, 'wb') as out:
+        out.write(SIDECAR_MAGIC + len(encoded).to_bytes(8, 'little') + encoded)
+        out.seek(meta['f_offset'])
+        out.write(np.ascontiguousarray(f, dtype='<f8').tobytes())
+        out.seek(meta['s_offset'])
+        out.write(np.ascontiguousarray(np.transpose(s, (1, 2, 0)), dtype='<c16').tobytes())
+    os.replace(tmp, target)
+    return target
+
+
+def _sidecar_meta(target):
+    with open(target, 'rb') as f:
+        if f.read(len(SIDECAR_MAGIC)) != SIDECAR_MAGIC:
+            return None
+        size = int.from_bytes(f.read(8), 'little')
+        return json.loads(f.read(size))
+
+
+def _restamp_sidecar(target, meta, stamp):
+    """
+    Atualiza o mtime guardado em `target` no próprio cabeçalho (o espaço
+    até `f_offset` é reservado), para que a próxima abertura não refaça o
+    SHA-1. Se não couber ou não der para escrever, fica como está.
+    """
+    encoded = json.dumps({**meta, 'mtime_ns': stamp['mtime_ns']}).encode()
+    if len(SIDECAR_MAGIC) + 8 + len(encoded) > meta['f_offset']:
+        return
+    try:
+        with open(target, 'r+b') as out:
+            out.seek(len(SIDECAR_MAGIC))
+            out.write(len(encoded).to_bytes(8, 'little') + encoded)
+    except OSError:
+        pass
+
+
+def open_sidecar(path, verify=False):
+    """
+    (f, S (freq, porta, porta), z0) mapeados em memória a partir de
+    `<path>.cache`, ou None se ele não existir ou não corresponder ao
+    Touchstone atual. Tamanho e mtime iguais bastam; se só o mtime mudou
+    (cópia, descompactação) ou com `verify`, o SHA-1 do Touchstone decide e,
+    conferindo, o novo mtime é gravado no cache.
+    """
+    target = sidecar_path(path)
+    if not os.path.exists(target) or not os.path.exists(path):
+        return None
+    try:
+        meta = _sidecar_meta(target)
+    except (OSError, ValueError):
+        return None
+    if meta is None:
+        return None
+    stamp = _source_stamp(path)
+    if stamp['size'] != meta['size']:
+        return None
+    if verify or stamp['mtime_ns'] != meta['mtime_ns']:
+        if _source_digest(path) != meta['sha1']:
+            return None
+        if stamp['mtime_ns'] != meta['mtime_ns']:
+            _restamp_sidecar(target, meta, stamp)
+    n, n_freqs = meta['n_ports'], meta['n_freqs']
+    if os.path.getsize(target) < meta['s_offset'] + n * n * n_freqs * 16:
+        return None
+    f = np.memmap(target, dtype='<f8', mode='r', offset=meta['f_offset'], shape=(n_freqs,))
+    s = np.memmap(target, dtype='<c16', mode='r', offset=meta['s_offset'], shape=(n, n, n_freqs))
+    return f, s.transpose(2, 0, 1), np.asarray(meta['z0'])
+
+
+def read_touchstone_cached(path, chunk_bytes=CHUNK_BYTES):
+    """
+    Como `read_touchstone`, mas usando `<path>.cache` quando válido e
+    criando-o quando não existe. Devolve (f, S, z0, veio_do_cache). Se o
+    diretório não aceitar escrita, o cache é apenas pulado.
+    """
+    cached = open_sidecar(path)
+    if cached is not None:
+        return cached + (True,)
+    f, s, header = read_touchstone(path, chunk_bytes)
+    try:
+        write_sidecar(path, f, s, header)
+    except OSError:
+        pass
+    return f, s, header['z0'], False
+
+
+def load_network(path, chunk_bytes=CHUNK_BYTES, cache=False):
+    """
+    `read_touchstone` empacotado num `Network` do scikit-rf, no lugar de
+    `Network(path)`. Com `cache` usa/cria o arquivo `<path>.cache`.
+    """
+    if cache:
+        f, s, z0, _ = read_touchstone_cached(path, chunk_bytes)
+    else:
+        f, s, header = read_touchstone(path, chunk_bytes)
+        z0 = header['z0']
+    name = os.path.splitext(os.path.basename(path))[0]
+    return Network(frequency=Frequency.from_f(np.asarray(f), unit='Hz'), s=np.asarray(s), z0=z0, name=name)
+
+
+# --------------------------------------------------------------------
+# 4. Cubo de resultados de vários projetos
+# --------------------------------------------------------------------
+SKIP_DIRS = ("sim_store",)      # cópias do cache de soluções (ResultStore)
+_DESIGN_SUFFIX = re.compile(r"^(.*)_design(\d+)$")
+SECTOR_VARIABLE = "fase_setor"  # variável dos modos azimutais do modelo de setor
+
+
+def find_touchstones(directory):
+    """
+    Touchstones exportados sob `directory`, sem descer em `.aedtresults` e
+    no cache de soluções.
+    """
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.endswith(".aedtresults")]
+        found += [os.path.join(root, name) for name in files if _PORTS_IN_NAME.search(name)]
+    return sorted(found)
+
+
+def design_parameters(touchstone):
+    """
+    (projeto .aedt ou None, {variável: valor em mm}) do design que gerou
+    `touchstone`. Exportações de varredura paramétrica
+    (`<projeto>_designNNN.sNp`) usam a linha NNN do CSV `<projeto>_variacoes.csv`
+    sobre as variáveis do `.aedt`; as demais, só as do `<projeto>.aedt`.
+    Expressões (`dia_int_tubo / 2`) ficam de fora.
+    """
+    stem = os.path.splitext(touchstone)[0]
+    m = _DESIGN_SUFFIX.match(stem)
+    project = (m.group(1) if m else stem) + ".aedt"
+    values = {}
+    if os.path.exists(project):
+        values.update(parse_aedt_project(project)['variables'])
+    else:
+        project = None
+    rows_path = m and m.group(1) + "_variacoes.csv"
+    if rows_path and os.path.exists(rows_path):
+        with open(rows_path, newline='') as f:
+            for row in csv.DictReader(f):
+                if row.get("*") == str(int(m.group(2))):
+                    values.update({k: v for k, v in row.items() if k != "*"})
+    numeric = {k: parse_quantity(v) for k, v in values.items()}
+    return project, {k: v for k, v in numeric.items() if v is not None}
+
+
+def sector_mode_export(touchstone):
+    """
+    True se `touchstone` é a exportação de um modo azimutal do modelo de
+    setor (`<projeto>_designNNN.s2p` da paramétrica "Modos", cujo CSV de
+    variações varre `fase_setor`): um passo intermediário da reconstrução,
+    não um design. O resultado do setor é o `<projeto>.s{N+1}p` completo.
+    """
+    m = _DESIGN_SUFFIX.match(os.path.splitext(touchstone)[0])
+    rows_path = m and m.group(1) + "_variacoes.csv"
+    if not rows_path or not os.path.exists(rows_path):
+        return False
+    with open(rows_path, newline='') as f:
+        return SECTOR_VARIABLE in (csv.DictReader(f).fieldnames or ())
+
+
+def _resample(f_src, s, f_dst):
+    if len(f_src) == len(f_dst) and np.allclose(f_src, f_dst, rtol=0, atol=1e-6):
+        return np.asarray(s)
+    flat = np.asarray(s).reshape(len(f_src), -1)
+    out = np.empty((len(f_dst), flat.shape[1]), dtype=complex)
+    for k in range(flat.shape[1]):
+        out[:, k] = np.interp(f_dst, f_src, flat[:, k].real) + 1j * np.interp(f_dst, f_src, flat[:, k].imag)
+    return out.reshape((len(f_dst),) + np.shape(s)[1:])
+
+
+def _cube_task(start, stop, ctx):
+    n, freqs = ctx['n_ports'], ctx['frequencies']
+    out = np.full((stop - start, len(freqs), n, n), np.nan, dtype=complex)
+    for i, path in enumerate(ctx['paths'][start:stop]):
+        try:
+            f, s, _, _ = read_touchstone_cached(path)
+        except (OSError, ValueError):
+            continue
+        # Fora da faixa do design não se extrapola: fica NaN
+        inside = (freqs >= f[0]) & (freqs <= f[-1])
+        out[i, inside] = _resample(np.asarray(f), s, freqs[inside])
+    return out.reshape(stop - start, -1).view(float)
+
+
+class ResultsCube:
+    """
+    Resultados de vários designs num só array.
+
+    `s` tem forma (design, freq, porta, porta) sobre a grade comum
+    `frequencies` (Hz); `params[nome]` é o vetor (design,) de cada variável
+    (NaN onde o design não a tem); `paths` e `projects` identificam a
+    origem de cada linha.
+    """
+
+    def __init__(self, frequencies, s, params, paths, projects):
+        self.frequencies = frequencies
+        self.s = s
+        self.params = params
+        self.paths = list(paths)
+        self.projects = list(projects)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def mask(self, **conditions):
+        """
+        Máscara booleana dos designs que satisfazem todas as condições:
+        `nome=valor` (igualdade com tolerância), `nome=(mín, máx)` (faixa
+        fechada; None = aberta) ou `nome=função(vetor) -> máscara`.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        for name, condition in conditions.items():
+            values = self.params.get(name, np.full(len(self), np.nan))
+            if callable(condition):
+                keep &= np.asarray(condition(values), dtype=bool)
+            elif isinstance(condition, tuple):
+                lo, hi = condition
+                keep &= (values >= (-np.inf if lo is None else lo)) & (values <= (np.inf if hi is None else hi))
+            else:
+                keep &= np.isclose(values, condition)
+        return keep
+
+    def select(self, **conditions):
+        """
+        Sub-cubo com os designs de `mask(**conditions)`.
+        """
+        keep = self.mask(**conditions)
+        idx = np.flatnonzero(keep)
+        return ResultsCube(self.frequencies, self.s[keep], {k: v[keep] for k, v in self.params.items()},
+                           [self.paths[i] for i in idx], [self.projects[i] for i in idx])
+
+    def save(self, path):
+        np.savez(path, frequencies=self.frequencies, s=self.s, paths=np.asarray(self.paths),
+                 projects=np.asarray([p or "" for p in self.projects]),
+                 param_names=np.asarray(list(self.params)),
+                 param_values=np.asarray([self.params[k] for k in self.params]).reshape(len(self.params), len(self)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            params = dict(zip(data['param_names'].tolist(), data['param_values']))
+            return cls(data['frequencies'], data['s'], params, data['paths'].tolist(),
+                       [p or None for p in data['projects'].tolist()])
+
+
+def build_results_cube(directory, n_ports=None, frequencies=None, workers=None):
+    """
+    Importa todos os Touchstone de `directory` (ver `find_touchstones`) com
+    `n_ports` portas (padrão: a contagem mais comum) num `ResultsCube`.
+    Os modos do modelo de setor (`sector_mode_export`) ficam de fora: só o
+    Touchstone completo reconstruído representa aquele design.
+
+    A grade comum é `frequencies` (Hz) ou a do primeiro arquivo; designs com
+    outra grade são interpolados nela. A leitura roda em `workers` processos
+    (`shared_pool.run_chunked`, S direto em memória compartilhada) e usa o
+    cache binário de cada arquivo. Arquivos ilegíveis ficam de fora.
+    """
+    paths = []
+    for path in find_touchstones(directory):
+        if sector_mode_export(path):
+            continue
+        try:
+            paths.append((path, read_header(path)['n_ports']))
+        except (OSError, ValueError):
+            continue
+    if not paths:
+        raise ValueError(f"Nenhum Touchstone em {directory}.")
+    n_ports = n_ports or Counter(n for _, n in paths).most_common(1)[0][0]
+    paths = [p for p, n in paths if n == n_ports]
+    if frequencies is None:
+        frequencies = np.asarray(read_touchstone_cached(paths[0])[0])
+    frequencies = np.asarray(frequencies, dtype=float)
+
+    context = {'paths': paths, 'n_ports': n_ports, 'frequencies': frequencies}
+    width = len(frequencies) * n_ports * n_ports * 2
+    flat = run_chunked(_cube_task, len(paths), context, width, workers=workers, chunk_size=1)
+    s = flat.view(complex).reshape(len(paths), len(frequencies), n_ports, n_ports)
+
+    if workers == 1:
+        matched = list(map(design_parameters, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            matched = list(pool.map(design_parameters, paths, chunksize=8))
+    readable = ~np.isnan(s).all(axis=(1, 2, 3))
+    names = sorted({name for _, values in matched for name in values})
+    params = {name: np.asarray([values.get(name, np.nan) for _, values in matched])[readable] for name in names}
+    return ResultsCube(frequencies, s[readable], params, [p for p, ok in zip(paths, readable) if ok],
+                       [project for (project, _), ok in zip(matched, readable) if ok])
+
+
+if __name__ == "__main__":
+    # python touchstone_io.py HFSS_Projects cubo.npz
+    cube = build_results_cube(sys.argv[1] if len(sys.argv) > 1 else "HFSS_Projects")
+    out = sys.argv[2] if len(sys.argv) > 2 else "results_cube.npz"
+    cube.save(out)
+    print(f"{len(cube)} designs, {len(cube.frequencies)} frequências, "
+          f"{cube.s.shape[2]} portas, {len(cube.params)} variáveis -> {out}")